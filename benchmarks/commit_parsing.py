@@ -0,0 +1,119 @@
+"""
+Compares the memory and the parsing time of the lazy Commit, the former eager one and
+the columnar parse_commits
+
+How To Use:
+  python -m benchmarks.commit_parsing [--commits 100000]
+
+"""
+
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from typing import Callable, List, Optional
+
+from changelog_generator.commit import (
+    Commit,
+    re_header_pattern,
+    re_jira_pattern,
+    re_revert_header_pattern,
+)
+from changelog_generator.commit_batch import parse_commits
+from changelog_generator.generator import get_commit_trees
+
+
+class EagerCommit:  # pylint: disable=too-few-public-methods
+    """The Commit class as it was, parsing everything in __init__"""
+
+    def __init__(self, hexsha: str, summary: str, message: str) -> None:
+        self.sha1 = hexsha
+        self.short = hexsha[:8]
+        self.message = message
+        self.summary = summary
+        self.revert: Optional[EagerCommit] = None
+
+        res = re_header_pattern.match(self.summary)
+        if res:
+            self.commit_type = res.group("type")
+            self.scope = res.group("scope")
+            self.subject = res.group("subject")
+        else:
+            self.commit_type, self.scope, self.subject = "unknown", "any", summary
+
+        res = re_revert_header_pattern.match(self.summary)
+        if res:
+            self.commit_type = "revert"
+            self.revert = EagerCommit("", res.group("summary"), res.group("summary"))
+            summary_res = re_header_pattern.match(res.group("summary"))
+            if summary_res:
+                self.scope = summary_res.group("scope")
+                self.subject = f"revert {summary_res.group('subject')}"
+            else:
+                self.scope = "any"
+                self.subject = f"revert {res.group('summary')}"
+
+        self.jiras: List[str] = []
+        for line in self.message.split("\n"):
+            self.jiras.extend(re_jira_pattern.findall(line))
+
+
+def make_messages(count: int) -> List[tuple]:
+    messages = []
+    for index in range(count):
+        summary = (
+            f'Revert "feat(scope{index % 7}): change {index}"'
+            if index % 20 == 0
+            else f"feat(scope{index % 7}): change number {index}"
+        )
+        body = "\n".join(f"line {line} of the body" for line in range(index % 12))
+        message = f"{summary}\n\n{body}\n\nRefs: ABC-{index}\n"
+        messages.append((f"{index:040x}", summary, message))
+    return messages
+
+
+def build(commit_class: Callable, messages: List[tuple], read: bool) -> list:
+    if commit_class is parse_commits:
+        parsed = parse_commits(messages)
+        if read:
+            get_commit_trees(parsed)
+        return [parsed]
+
+    commits = [commit_class(*message) for message in messages]
+    if read:
+        for commit in commits:
+            (commit.commit_type, commit.scope, commit.subject, commit.jiras)
+        get_commit_trees(commits)
+    return commits
+
+
+def measure(commit_class: Callable, messages: List[tuple], read: bool) -> tuple:
+    """times a run, then traces the memory of another: tracing slows the code down"""
+    start = time.perf_counter()
+    build(commit_class, messages, read)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    commits = build(commit_class, messages, read)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del commits
+    return duration, size
+
+
+def run():
+    parser = ArgumentParser()
+    parser.add_argument("--commits", type=int, default=100_000)
+    args = parser.parse_args()
+
+    messages = make_messages(args.commits)
+    for commit_class in (EagerCommit, Commit, parse_commits):
+        for read in (False, True):
+            duration, size = measure(commit_class, messages, read)
+            print(
+                f"{commit_class.__name__:<14} {'read' if read else 'build':<6} "
+                f"{duration:8.3f}s  {size / 2 ** 20:8.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,42 @@
+"""
+Compares the commit readers on an existing repository
+
+How To Use:
+  python -m benchmarks.commit_reader path_to_repository rev1..rev2 [filter_path1 ...]
+
+"""
+
+import time
+from argparse import ArgumentParser
+
+from git import Repo
+
+from changelog_generator.commit_reader import GitLogCommitReader, GitPythonCommitReader
+
+
+def run():
+    parser = ArgumentParser()
+    parser.add_argument("repository_path", help="The path to the repository")
+    parser.add_argument("revision", help="The revision to read the commits from")
+    parser.add_argument("filter_paths", nargs="*", help="The paths to filter on")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per reader")
+    args = parser.parse_args()
+
+    repository = Repo(args.repository_path)
+    for reader_class in (GitPythonCommitReader, GitLogCommitReader):
+        timings = []
+        for _ in range(args.repeat):
+            reader = reader_class(repository)
+            start = time.perf_counter()
+            count = sum(
+                1 for _ in reader.iter_commits(args.revision, args.filter_paths)
+            )
+            timings.append(time.perf_counter() - start)
+        print(
+            f"{reader_class.__name__:<24} {count:>8} commits "
+            f"best {min(timings):8.3f}s  mean {sum(timings) / len(timings):8.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,164 @@
+"""
+Times each stage of a changelog generation on a synthetic repository, records the
+timings and compares them to the ones of a previous run
+
+The stages are run in order on the last release of the repository: the tag listing,
+the commit reading, the parsing of the commit fields, their grouping by type, the diff
+and the rendering. The best time of the runs is kept for each stage.
+
+How To Use:
+  python -m benchmarks.stages [--commits 20000] [--prefix cms] [--output results.json]
+      [--compare previous_results.json] [--threshold 0.2]
+
+The command fails when a stage is slower than in the compared results by more than the
+threshold, and by more than a millisecond.
+"""
+
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from changelog_generator import __version__
+from changelog_generator.generator import get_commit_trees, render_changelog
+from changelog_generator.repository_manager import RepositoryManager
+from tests.synthetic_repository import RepositoryShape, build_synthetic_repository
+
+STAGES = ("tags", "read", "parse", "group", "diff", "render")
+MINIMAL_REGRESSION = 0.001
+
+
+def get_repository(shape: RepositoryShape) -> Path:
+    """Builds the repository of a shape once, in the temporary directory"""
+    key = "-".join(str(value).replace(" ", "") for value in shape)
+    path = Path(tempfile.gettempdir()) / "changelog_generator" / "benchmarks" / key
+    if not (path / ".git").exists():
+        build_synthetic_repository(path, shape)
+    return path
+
+
+def run_stages(
+    path: Path, prefix: Optional[str], filter_paths: Sequence[str]
+) -> Dict[str, float]:
+    """Runs the stages once, and returns the duration of each one"""
+    timings: Dict[str, float] = {}
+
+    def timed(stage: str, function: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = function()
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    manager = RepositoryManager(str(path), prefix, list(filter_paths))
+    current_tag, previous_tag = timed("tags", manager.tag_manager.get_release_tags)[:2]
+    revision = f"{previous_tag}..{current_tag}"
+    commits = timed(
+        "read",
+        lambda: list(manager.commit_reader.iter_commits(revision, filter_paths)),
+    )
+    timed(
+        "parse",
+        lambda: [
+            (commit.commit_type, commit.scope, commit.subject, commit.jiras)
+            for commit in commits
+        ],
+    )
+    commit_trees = timed("group", lambda: get_commit_trees(commits))
+    timed("diff", lambda: manager.repository.git.diff(revision, "--", *filter_paths))
+    timed(
+        "render",
+        lambda: render_changelog(
+            organization=manager.organization,
+            repository=manager.name,
+            previous_tag=previous_tag,
+            current_tag=current_tag,
+            commit_trees=commit_trees,
+            ai_summary=None,
+        ),
+    )
+    return timings
+
+
+def get_label() -> str:
+    """Names the results after the version and the commit of the generator"""
+    try:
+        revision = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return __version__
+    return f"{__version__}-{revision}"
+
+
+def compare(
+    timings: Dict[str, float], previous: Dict[str, float], threshold: float
+) -> List[Tuple[str, float, float]]:
+    """Lists the stages slower than the previous ones, beyond the threshold"""
+    return [
+        (stage, previous[stage], timings[stage])
+        for stage in STAGES
+        if stage in previous
+        and timings[stage] > previous[stage] * (1 + threshold)
+        and timings[stage] - previous[stage] > MINIMAL_REGRESSION
+    ]
+
+
+def run():
+    parser = ArgumentParser()
+    parser.add_argument("--commits", type=int, default=20_000)
+    parser.add_argument("--tag_every", type=int, default=2_000)
+    parser.add_argument("--diff_lines", type=int, default=20)
+    parser.add_argument("--prefix", help="Benchmarks the prefixed tags of a service")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of the stages")
+    parser.add_argument("--output", help="The JSON file to record the results in")
+    parser.add_argument("--compare", help="The JSON results to compare to")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    shape = RepositoryShape(
+        commits=args.commits, tag_every=args.tag_every, diff_lines=args.diff_lines
+    )
+    path = get_repository(shape)
+    filter_paths = [f"core/{args.prefix}", "core/common"] if args.prefix else []
+
+    runs = [run_stages(path, args.prefix, filter_paths) for _ in range(args.repeat)]
+    timings = {stage: min(run[stage] for run in runs) for stage in STAGES}
+    for stage in STAGES:
+        print(f"{stage:<8} {timings[stage] * 1000:10.2f} ms")
+
+    results = {
+        "label": get_label(),
+        "python": platform.python_version(),
+        # a JSON round trip, to compare it to the recorded shapes
+        "shape": json.loads(json.dumps(shape._asdict())),
+        "prefix": args.prefix,
+        "timings": timings,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        if previous["shape"] != results["shape"] or previous["prefix"] != args.prefix:
+            sys.exit("The compared results were measured on another repository")
+        regressions = compare(timings, previous["timings"], args.threshold)
+        for stage, before, after in regressions:
+            print(
+                f"regression on {stage}: {before * 1000:.2f} ms in "
+                f"{previous['label']}, {after * 1000:.2f} ms now"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
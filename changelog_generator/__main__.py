@@ -1,10 +1,88 @@
+"""
+The command line, which only imports the subsystems of the mode it runs: parsing the
+arguments, or printing the help, imports neither git, jinja nor the AI libraries.
+"""
+
 import os
-from argparse import ArgumentParser
+import sys
+from argparse import ArgumentParser, Namespace
+from typing import Any, Optional
+
+from . import profiling
+
+# pylint: disable=import-outside-toplevel
+
+# the values of an environment variable turning an option off
+FALSE_VALUES = ("0", "false", "no", "off")
+
+
+def parse_flag(value: Optional[str]) -> bool:
+    """an environment variable turning an option on, unless unset, empty or false"""
+    return value is not None and value.lower() not in ("", *FALSE_VALUES)
+
+
+def write_services(manifest: str, output_dir: Optional[str], **options: Any) -> None:
+    """Writes the changelogs of the services, generated with the options"""
+    from .services import generate_services, load_manifest
 
-from .generator import generate
+    changelogs = generate_services("./", load_manifest(manifest), **options)
+    for service, changelog in changelogs:
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            path = os.path.join(output_dir, f"{service.prefix}.md")
+            with open(path, "w", encoding="utf-8") as stream:
+                stream.write(changelog + "\n")
+        else:
+            sys.stdout.write(changelog + "\n\n")
+
+
+def check_options(parser: ArgumentParser, args: Namespace) -> None:
+    """Rejects the options the mode cannot honour"""
+    if args.manifest and (args.commit_cache is not None or args.commit_backend):
+        # the history of all the services is walked at once, without a commit reader
+        parser.error(
+            "--manifest cannot be used with --commit_cache nor --commit_backend"
+        )
 
 
 def main() -> None:
+    parser = ArgumentParser(add_help=False)
+    parser.add_argument("--profile", nargs="?", const="-")
+    parser.add_argument("--cprofile")
+    args, _ = parser.parse_known_args()
+    profile = (
+        args.profile
+        if args.profile is not None
+        else os.environ.get("CHANGELOG_PROFILE")
+    )
+    if profile is not None and profile.lower() in FALSE_VALUES:
+        profile = None
+    cprofile = args.cprofile or os.environ.get("CHANGELOG_CPROFILE")
+    if profile is None and not cprofile:
+        run()
+        return
+    if profile is not None and profile.lower() in ("", "1", "true", "yes", "on"):
+        profile = "-"
+
+    profiling.enable()
+    if cprofile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with profiling.span("total"):
+            run()
+    finally:
+        if cprofile:
+            profiler.disable()
+            profiler.dump_stats(cprofile)
+        report = profiling.disable()
+        if report is not None:
+            profiling.write_report(report, profile or "-")
+
+
+def run() -> None:
     parser = ArgumentParser()
     parser.add_argument(
         "-t",
@@ -23,18 +101,204 @@ def main() -> None:
         nargs="?",  # optional argument
         help="A rev1..rev2 string to be used to generate the commit list",
     )
+    parser.add_argument(
+        "--commit_cache",
+        nargs="?",  # optional argument
+        const="",
+        help="Cache the parsed commits in this SQLite file, in the .git directory if "
+        "no file is given. Note: also available as COMMIT_CACHE env var",
+    )
+    parser.add_argument(
+        "--commit_backend",
+        choices=["git", "native"],
+        help="Reads the commits with `git log`, the default, or out of the object "
+        "database with `native`. Note: also available as COMMIT_BACKEND env var",
+    )
+    parser.add_argument(
+        "--template",
+        nargs="?",  # optional argument
+        help="A jinja template to render the changelog with. "
+        "Note: also available as CHANGELOG_TEMPLATE env var",
+    )
+    parser.add_argument(
+        "--ai_timeout",
+        type=float,
+        help="Renders the changelog without the AI summary if it takes longer than "
+        "these seconds. Note: also available as VERTEX_TIMEOUT env var",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="A JSON list of services, each one with a prefix and path_filters, to "
+        "generate the changelogs of from a single history walk",
+    )
+    parser.add_argument(
+        "--output_dir",
+        help="With a manifest, writes the changelog of each service in a "
+        "<prefix>.md file of this directory instead of the standard output",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="With a manifest, renders the changelogs of the services with this "
+        "number of threads",
+    )
+    parser.add_argument(
+        "--incremental",
+        help="A state file to only read the commits added since the previous run from",
+    )
+    parser.add_argument(
+        "--changelog_file",
+        help="With --incremental, patches the section of the changelog in this file, "
+        "like a CHANGELOG.md, instead of writing it to the standard output",
+    )
+    parser.add_argument(
+        "--max_bytes",
+        type=int,
+        help="Renders at most these UTF-8 bytes, the commits beyond the share of each "
+        "section being collapsed in a link to the comparison of the tags. "
+        "Note: also available as CHANGELOG_MAX_BYTES env var",
+    )
+    parser.add_argument(
+        "--spool",
+        action="store_true",
+        help="Spools the commits to a temporary database, and renders the changelog "
+        "from it section by section, for a memory independent of the size of the "
+        "range. The native commit backend still lists the commits of the range "
+        "in memory before they are spooled, unlike the default git log one. "
+        "Note: also available as CHANGELOG_SPOOL env var",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["markdown", "json", "ndjson"],
+        help="Renders the markdown changelog, the default, or streams a record per "
+        "commit, then a summary record, as a JSON document or as JSON lines. "
+        "Note: also available as CHANGELOG_FORMAT env var",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="[HOST:]PORT",
+        help="Serves the changelogs over HTTP, on /changelog?target=&prefix=&"
+        "path_filters=&repository=, keeping the repositories warm between requests",
+    )
+    parser.add_argument(
+        "--repository",
+        action="append",
+        metavar="[NAME=]PATH",
+        help="With --serve, a repository to serve, the current directory by default",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        help="Writes the time of each stage, the git and AI calls and the peak memory "
+        "as JSON to this file, or to the standard error if no file is given. "
+        "Note: also available as CHANGELOG_PROFILE env var, set to 1 for the "
+        "standard error, or to 0 to turn it off",
+    )
+    parser.add_argument(
+        "--cprofile",
+        help="With --profile, also dumps the cProfile statistics to this file. "
+        "Note: also available as CHANGELOG_CPROFILE env var",
+    )
     args = parser.parse_args()
+    check_options(parser, args)
     #
     prefix = args.tag_prefix or os.environ.get("TAG_PREFIX")
     filter_paths = args.path_filters
+    commit_cache = (
+        args.commit_cache
+        if args.commit_cache is not None
+        else os.environ.get("COMMIT_CACHE")
+    )
+
+    max_bytes = args.max_bytes or os.environ.get("CHANGELOG_MAX_BYTES")
+    max_bytes = int(max_bytes) if max_bytes else None
+
+    ai_timeout = args.ai_timeout or os.environ.get("VERTEX_TIMEOUT")
+
+    if args.manifest:
+        write_services(
+            args.manifest,
+            args.output_dir,
+            jobs=args.jobs,
+            template=args.template or os.environ.get("CHANGELOG_TEMPLATE"),
+            max_bytes=max_bytes,
+            ai_timeout=float(ai_timeout) if ai_timeout else None,
+        )
+        return
+
+    if args.serve:
+        from .server import serve
+
+        serve(
+            args.serve,
+            args.repository,
+            commit_cache=commit_cache,
+            commit_backend=args.commit_backend or os.environ.get("COMMIT_BACKEND"),
+            template=args.template or os.environ.get("CHANGELOG_TEMPLATE"),
+            ai_timeout=float(ai_timeout) if ai_timeout else None,
+            max_bytes=max_bytes,
+        )
+        return
+
+    if args.incremental:
+        from .incremental import generate_incremental, write_changelog_file
+
+        target, changelog = generate_incremental(
+            repository_path="./",
+            state_path=args.incremental,
+            target=args.target,
+            prefix=prefix,
+            filter_paths=filter_paths,
+            commit_cache=commit_cache,
+            template=args.template or os.environ.get("CHANGELOG_TEMPLATE"),
+            ai_timeout=float(ai_timeout) if ai_timeout else None,
+            max_bytes=max_bytes,
+            commit_backend=args.commit_backend or os.environ.get("COMMIT_BACKEND"),
+        )
+        if args.changelog_file:
+            write_changelog_file(args.changelog_file, target, changelog)
+        else:
+            sys.stdout.write(changelog + "\n")
+        return
+
+    output_format = args.format or os.environ.get("CHANGELOG_FORMAT") or "markdown"
+    if output_format != "markdown":
+        from .structured import generate_structured
+
+        records = generate_structured(
+            repository_path="./",
+            output_format=output_format,
+            target=args.target,
+            prefix=prefix,
+            filter_paths=filter_paths,
+            commit_cache=commit_cache,
+            ai_timeout=float(ai_timeout) if ai_timeout else None,
+            commit_backend=args.commit_backend or os.environ.get("COMMIT_BACKEND"),
+        )
+        for record in records:
+            # the consumers read each record as soon as it is written
+            sys.stdout.write(record)
+            sys.stdout.flush()
+        return
+
+    from .generator import generate_stream
 
-    changelog = generate(
+    chunks = generate_stream(
         repository_path="./",
         prefix=prefix,
         filter_paths=filter_paths,
         target=args.target,
+        commit_cache=commit_cache,
+        template=args.template or os.environ.get("CHANGELOG_TEMPLATE"),
+        ai_timeout=float(ai_timeout) if ai_timeout else None,
+        max_bytes=max_bytes,
+        commit_backend=args.commit_backend or os.environ.get("COMMIT_BACKEND"),
+        spool=args.spool or parse_flag(os.environ.get("CHANGELOG_SPOOL")),
     )
-    print(changelog)
+    sys.stdout.writelines(chunks)
+    sys.stdout.write("\n")
 
 
 if __name__ == "__main__":
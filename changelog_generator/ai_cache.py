@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, where the file stores are not shared
+    fcntl = None  # type: ignore
+
+
+def atomic_write(path: str, content: str) -> None:
+    """Writes the file through a temporary one, a reader never sees it half written"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as stream:
+        stream.write(content)
+    os.replace(temporary, path)
+
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Holds an exclusive lock on the file, shared by the processes of the machine"""
+    with open(path, "a", encoding="utf-8") as stream:
+        if fcntl is not None:
+            fcntl.flock(stream, fcntl.LOCK_EX)
+        yield
+
+
+def read_answers(path: str) -> Dict[str, str]:
+    try:
+        with open(path, encoding="utf-8") as stream:
+            return json.load(stream)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        logging.warning("Ignoring the corrupted AI summary cache %s", path)
+        return {}
+
+
+class BaseSummaryStore(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """returns the stored answer, or None"""
+
+    @abstractmethod
+    def put(self, key: str, answer: str) -> None:
+        """stores the answer"""
+
+    def flush(self) -> None:
+        """saves the answers stored so far, if they are not yet"""
+
+
+class DirectorySummaryStore(BaseSummaryStore):
+    """Stores each answer in its own file, several processes can share the directory"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.md")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._file(key), encoding="utf-8") as stream:
+                return stream.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, answer: str) -> None:
+        atomic_write(self._file(key), answer)
+
+
+class FileSummaryStore(BaseSummaryStore):
+    """
+    Stores all the answers in a single JSON file, to be saved and restored as a whole,
+    like a CI cache. The new answers are kept in memory until flushed, then merged in
+    one write with the answers of the file, which other processes may have added: the
+    file is locked meanwhile.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.answers = read_answers(path)
+        self.pending: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return self.answers.get(key)
+
+    def put(self, key: str, answer: str) -> None:
+        with self.lock:
+            self.answers[key] = answer
+            self.pending[key] = answer
+
+    def flush(self) -> None:
+        with self.lock:
+            if not self.pending:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with locked(f"{self.path}.lock"):
+                answers = read_answers(self.path)
+                answers.update(self.pending)
+                atomic_write(self.path, json.dumps(answers))
+            self.answers.update(answers)
+            self.pending = {}
+
+
+@lru_cache()
+def get_store(path: str) -> BaseSummaryStore:
+    """
+    A path ending with `.json` is a single file store, any other a directory. The
+    store of a path is shared by all the summaries of the process.
+    """
+    if path.endswith(".json"):
+        return FileSummaryStore(path)
+    return DirectorySummaryStore(path)
@@ -1,9 +1,24 @@
+import hashlib
 import json
 import logging
 import os
-from google import genai
-from google.genai import types
-from google.oauth2 import service_account
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from itertools import chain
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Union
+
+from .ai_cache import BaseSummaryStore, get_store
+from .concurrency import ordered_map
+from .profiling import count
+
+if TYPE_CHECKING:
+    from google import genai
+
+# a rough estimation of the tokens of a diff, to pack the chunks without a tokenizer
+CHARS_PER_TOKEN = 4
+DEFAULT_CHUNK_TOKENS = 200_000
+DEFAULT_CONCURRENCY = 4
 
 
 def get_prompt(prefix: str) -> str:
@@ -25,77 +40,337 @@ Here's a `git diff` between two versions (represented as `git tags`). Write a **
 """
 
 
+def get_chunk_prompt(prefix: str) -> str:
+    return f"""
+Here's a part of a `git diff` between two versions (represented as `git tags`). Summarize the changes of this part **concisely and precisely**, as bullet points grouped by theme.
+ Prioritize the changes of files with this {prefix} over modifications in the common layer, and list the concrete risks of regressions.
+ Your summary will be merged with the ones of the other parts of the diff.
+"""
+
+
+def get_merge_prompt(prefix: str) -> str:
+    return f"""
+Here are the summaries of some parts of a `git diff` between two versions (represented as `git tags`). Merge them into a single summary, **concise and precise**, as bullet points grouped by theme.
+ Keep the priority of the changes of files with this {prefix} over modifications in the common layer, and keep the concrete risks of regressions.
+ Your summary will be merged with the ones of the other parts of the diff.
+"""
+
+
+def get_reduce_prompt(prompt: str) -> str:
+    """the prompt of the whole diff, asked about the summaries of its parts"""
+    return f"""{prompt}
+The diff was too large to be read at once: here are the summaries of its parts instead.
+"""
+
+
 SCOPES = [
     "https://www.googleapis.com/auth/generative-language",
     "https://www.googleapis.com/auth/cloud-platform",
 ]
 
 
-def generate_ai_summary(prefix: str| None, git_diff: str | None) -> str | None:
-    project = os.getenv("VERTEX_PROJECT")
-    location = os.getenv("VERTEX_LOCATION")
-    model = os.getenv("VERTEX_MODEL")
-    service_account_key = os.getenv("VERTEX_CREDENTIALS")
-    prompt = os.getenv("VERTEX_PROMPT", get_prompt(prefix or ""))
+GENERATION_SETTINGS = {
+    "temperature": 1,
+    "top_p": 0.95,
+    "max_output_tokens": 8192,
+}
 
-    if not project:
-        logging.error("Missing VERTEX_PROJECT environment variable")
-        return None
+SAFETY_SETTINGS = {
+    "HARM_CATEGORY_HATE_SPEECH": "OFF",
+    "HARM_CATEGORY_DANGEROUS_CONTENT": "OFF",
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "OFF",
+    "HARM_CATEGORY_HARASSMENT": "OFF",
+}
 
-    if not location:
-        logging.error("Missing VERTEX_LOCATION environment variable")
-        return None
 
-    if not model:
-        logging.error("Missing VERTEX_MODEL environment variable")
-        return None
+class BaseModel(ABC):
+    @property
+    def identity(self) -> str:
+        """what, besides the prompt, changes the answers of the model"""
+        return type(self).__name__
 
-    if not service_account_key:
-        logging.error("Missing VERTEX_CREDENTIALS environment variable")
-        return None
+    @abstractmethod
+    def generate(self, prompt: str) -> str:
+        """returns the answer of the model to the prompt"""
 
-    if not git_diff:
-        return "No changes were provided in the diff"
 
-    credentials = service_account.Credentials.from_service_account_info(
-        json.loads(service_account_key), scopes=SCOPES,
-    )
-    client = genai.Client(
-        vertexai=True,
-        project=project,
-        location=location,
-        credentials=credentials,
-    )
+class VertexModel(BaseModel):
+    """
+    A Gemini model on Vertex AI, its client is only built for the first prompt: the
+    Google libraries, slow to import, are not even imported before.
+    """
+
+    def __init__(
+        self, project: str, location: str, model: str, service_account_key: str
+    ) -> None:
+        self.project = project
+        self.location = location
+        self.model = model
+        self.service_account_key = service_account_key
+
+    @classmethod
+    def from_environment(cls) -> Optional["VertexModel"]:
+        project = os.getenv("VERTEX_PROJECT")
+        location = os.getenv("VERTEX_LOCATION")
+        model = os.getenv("VERTEX_MODEL")
+        service_account_key = os.getenv("VERTEX_CREDENTIALS")
+
+        if not project:
+            logging.error("Missing VERTEX_PROJECT environment variable")
+            return None
+
+        if not location:
+            logging.error("Missing VERTEX_LOCATION environment variable")
+            return None
+
+        if not model:
+            logging.error("Missing VERTEX_MODEL environment variable")
+            return None
+
+        if not service_account_key:
+            logging.error("Missing VERTEX_CREDENTIALS environment variable")
+            return None
+
+        return cls(project, location, model, service_account_key)
+
+    @property
+    def identity(self) -> str:
+        return json.dumps(
+            {
+                "model": self.model,
+                "settings": GENERATION_SETTINGS,
+                "safety": SAFETY_SETTINGS,
+            },
+            sort_keys=True,
+        )
+
+    @property
+    @lru_cache()
+    def client(self) -> "genai.Client":
+        # pylint: disable=import-outside-toplevel
+        from google import genai
+        from google.oauth2 import service_account
+
+        credentials = service_account.Credentials.from_service_account_info(
+            json.loads(self.service_account_key),
+            scopes=SCOPES,
+        )
+        return genai.Client(
+            vertexai=True,
+            project=self.project,
+            location=self.location,
+            credentials=credentials,
+        )
+
+    def generate(self, prompt: str) -> str:
+        from google.genai import types  # pylint: disable=import-outside-toplevel
+
+        contents = [
+            types.Content(
+                role="user",
+                parts=[types.Part.from_text(prompt)],
+            )
+        ]
+        generate_content_config = types.GenerateContentConfig(
+            **GENERATION_SETTINGS,
+            response_modalities=["TEXT"],
+            safety_settings=[
+                types.SafetySetting(category=category, threshold=threshold)
+                for category, threshold in SAFETY_SETTINGS.items()
+            ],
+        )
+
+        res = []
+        usage = None
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=generate_content_config,
+        ):
+            res.append(chunk.text.replace("`", "'"))
+            usage = chunk.usage_metadata or usage
+
+        count("ai.calls")
+        if usage is not None:
+            count("ai.tokens_in", usage.prompt_token_count or 0)
+            count("ai.tokens_out", usage.candidates_token_count or 0)
+
+        return "".join(res)
+
+
+class CachedModel(BaseModel):
+    """
+    Answers the prompts already asked to a model from a store, keyed by the hash of
+    the model, its generation and safety settings and the prompt, which includes the
+    diff.
+
+    The model is only called on a miss: a VertexModel does not even build its client
+    when all the prompts are hits.
+    """
+
+    def __init__(self, model: BaseModel, store: BaseSummaryStore) -> None:
+        self.model = model
+        self.store = store
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def identity(self) -> str:
+        return self.model.identity
+
+    def key(self, prompt: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.identity.encode())
+        digest.update(b"\0")
+        digest.update(prompt.encode())
+        return digest.hexdigest()
+
+    def generate(self, prompt: str) -> str:
+        key = self.key(prompt)
+        answer = self.store.get(key)
+        with self.lock:
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        count("ai.cache_misses" if answer is None else "ai.cache_hits")
+        if answer is None:
+            answer = self.model.generate(prompt)
+            self.store.put(key, answer)
+        return answer
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def split_file_diff(file_diff: str, max_chars: int) -> Iterator[str]:
+    """Cuts the diff of a file larger than a chunk at line boundaries"""
+    part: List[str] = []
+    size = 0
+    for line in file_diff.splitlines(keepends=True):
+        if part and size + len(line) > max_chars:
+            yield "".join(part)
+            part, size = [], 0
+        part.append(line)
+        size += len(line)
+    if part:
+        yield "".join(part)
 
-    contents = [
-        types.Content(
-            role="user",
-            parts=[types.Part.from_text(f"{prompt} {git_diff}")],
+
+def pack_chunks(file_diffs: Iterable[str], max_tokens: int) -> Iterator[str]:
+    """
+    Packs the diffs of consecutive files in chunks of at most `max_tokens` estimated
+    tokens. Only the chunk being packed is held in memory.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunk: List[str] = []
+    size = 0
+    for file_diff in file_diffs:
+        for part in split_file_diff(file_diff, max_chars):
+            if chunk and size + len(part) > max_chars:
+                yield "".join(chunk)
+                chunk, size = [], 0
+            chunk.append(part)
+            size += len(part)
+    if chunk:
+        yield "".join(chunk)
+
+
+def truncate(summary: str, max_chars: int) -> str:
+    """Cuts a summary at the last line boundary within `max_chars`"""
+    if len(summary) <= max_chars:
+        return summary
+    end = summary.rfind("\n", 0, max_chars)
+    return summary[: end + 1 if end > 0 else max_chars]
+
+
+def summarize(  # pylint: disable=too-many-arguments
+    model: BaseModel,
+    prompt: str,
+    file_diffs: Iterable[str],
+    prefix: str = "",
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    workers: int = DEFAULT_CONCURRENCY,
+) -> Optional[str]:
+    """
+    Summarizes a diff with a single prompt when it fits in a chunk. A larger diff is
+    packed in chunks summarized by `workers` concurrent requests, the chunk summaries
+    are then merged in several rounds until they fit in a chunk, and the prompt is
+    asked about them. Returns None for an empty diff.
+    """
+    chunks = pack_chunks(file_diffs, max_tokens)
+    first = next(chunks, None)
+    if first is None:
+        return None
+    second = next(chunks, None)
+    if second is None:
+        return model.generate(f"{prompt} {first}")
+
+    chunk_prompt = get_chunk_prompt(prefix)
+    summaries = list(
+        ordered_map(
+            lambda chunk: model.generate(f"{chunk_prompt} {chunk}"),
+            chain((first, second), chunks),
+            workers,
         )
-    ]
-    generate_content_config = types.GenerateContentConfig(
-        temperature=1,
-        top_p=0.95,
-        max_output_tokens=8192,
-        response_modalities=["TEXT"],
-        safety_settings=[
-            types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-            types.SafetySetting(
-                category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"
-            ),
-            types.SafetySetting(
-                category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"
-            ),
-            types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-        ],
     )
+    merge_prompt = get_merge_prompt(prefix)
+    while True:
+        parts = list(
+            pack_chunks((f"{summary}\n\n" for summary in summaries), max_tokens)
+        )
+        if len(parts) == 1:
+            return model.generate(f"{get_reduce_prompt(prompt)} {parts[0]}")
+        if len(parts) >= len(summaries):
+            # another round would not merge any summary: they are cut to half a chunk,
+            # so that the next one merges them at least by pairs
+            max_chars = max_tokens * CHARS_PER_TOKEN // 2 - 2
+            summaries = [truncate(summary, max_chars) for summary in summaries]
+            continue
+        summaries = list(
+            ordered_map(
+                lambda part: model.generate(f"{merge_prompt} {part}"), parts, workers
+            )
+        )
 
-    res = []
-    for chunk in client.models.generate_content_stream(
-        model=model,
-        contents=contents,
-        config=generate_content_config,
-    ):
-        res.append(chunk.text.replace("`", "'"))
 
-    return "".join(res)
+def generate_ai_summary(
+    prefix: str | None,
+    git_diff: Union[str, Iterable[str], None],
+    model: Optional[BaseModel] = None,
+) -> str | None:
+    """
+    The diff is either a string or the diffs of the files one by one: those are only
+    read if a model is configured. The answers of the model are cached in the
+    VERTEX_CACHE directory, or JSON file, if set.
+    """
+    prompt = os.getenv("VERTEX_PROMPT", get_prompt(prefix or ""))
+    model = model or VertexModel.from_environment()
+    if model is None:
+        return None
+
+    if git_diff is None:
+        return "No changes were provided in the diff"
+
+    cache_path = os.getenv("VERTEX_CACHE")
+    if cache_path:
+        model = CachedModel(model, get_store(cache_path))
+
+    try:
+        summary = summarize(
+            model,
+            prompt,
+            [git_diff] if isinstance(git_diff, str) else git_diff,
+            prefix=prefix or "",
+            max_tokens=int(os.getenv("VERTEX_CHUNK_TOKENS") or DEFAULT_CHUNK_TOKENS),
+            workers=int(os.getenv("VERTEX_CONCURRENCY") or DEFAULT_CONCURRENCY),
+        )
+    finally:
+        if isinstance(model, CachedModel):
+            model.store.flush()
+    if isinstance(model, CachedModel):
+        logging.info(
+            "AI summary cache: %(hits)d hits, %(misses)d misses", model.stats()
+        )
+    return summary if summary is not None else "No changes were provided in the diff"
@@ -1,5 +1,5 @@
 import re
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 re_header_pattern = re.compile(
     r"^(?P<type>[^\(]+)\((?P<scope>[^\)]+)\): (?P<subject>.+)$"
@@ -7,70 +7,132 @@ re_header_pattern = re.compile(
 re_jira_pattern = re.compile(r"\b([A-Z]{2,6}[0-9]{0,6}-[0-9]{1,6})\b")
 re_broke_pattern = re.compile(r"^BROKEN:$")
 re_revert_header_pattern = re.compile(r"^[R|r]evert:? (?P<summary>.*)$")
-re_revert_commit_pattern = re.compile(r"^This reverts commit ([a-f0-9]+)")
+re_revert_commit_pattern = re.compile(r"^This reverts commit ([a-f0-9]{40})", re.M)
 re_temp_header_pattern = re.compile(r"^(fixup!|squash!).*$")
 
 
+def get_reverted_sha1(message: str) -> Optional[str]:
+    """the commit a `git revert` message names, in its `This reverts commit` line"""
+    res = re_revert_commit_pattern.search(message)
+    return res.group(1) if res else None
+
+
+def unquote_summary(summary: str) -> str:
+    """the summary of `Revert "<summary>"`, as written by `git revert`"""
+    if len(summary) > 1 and summary[0] == summary[-1] == '"':
+        return summary[1:-1]
+    return summary
+
+
 class Commit:
+    """
+    A commit and its conventional commit fields.
+
+    The fields are parsed on their first access only: the header, revert and Jira
+    parsers do not run for the fields a template never reads.
+    """
+
+    __slots__ = ("sha1", "summary", "message", "_header", "_jiras")
+
     sha1: str
-    short: str
     summary: str
     message: str
 
-    revert: Optional["Commit"]
-    commit_type: Optional[str]
-    scope: Optional[str]
-    subject: Optional[str]
-    jiras: List[str]
+    # (commit_type, scope, subject, reverted summary), once parsed
+    _header: Optional[Tuple[str, str, str, Optional[str]]]
+    _jiras: Optional[List[str]]
 
     def get_header_data(self) -> None:
-        self.commit_type = None
-        self.scope = None
-        self.subject = None
-
         res = re_header_pattern.match(self.summary)
         if res:
-            self.commit_type = res.group("type")
-            self.scope = res.group("scope")
-            self.subject = res.group("subject")
+            self._header = (
+                res.group("type"),
+                res.group("scope"),
+                res.group("subject"),
+                None,
+            )
         else:
-            self.commit_type = "unknown"
-            self.scope = "any"
-            self.subject = self.summary
+            self._header = ("unknown", "any", self.summary, None)
 
     def get_revert_data(self) -> None:
-        self.revert = None
-
         res = re_revert_header_pattern.match(self.summary)
         if res:
-            self.commit_type = "revert"
-
-            self.revert = Commit(
-                hexsha="", summary=res.group("summary"), message=res.group("summary")
-            )
-
-            summary_res = re_header_pattern.match(res.group("summary"))
+            summary = res.group("summary")
+            summary_res = re_header_pattern.match(summary)
             if summary_res:
-                self.scope = summary_res.group("scope")
-                self.subject = f"revert {summary_res.group('subject')}"
+                self._header = (
+                    "revert",
+                    summary_res.group("scope"),
+                    f"revert {summary_res.group('subject')}",
+                    summary,
+                )
             else:
-                self.scope = "any"
-                self.subject = f"revert {res.group('summary')}"
+                self._header = ("revert", "any", f"revert {summary}", summary)
 
     def get_jira_data(self) -> None:
-        self.jiras = []
-
-        for line in self.message.split("\n"):
-            res = re_jira_pattern.findall(line)
-            if res:
-                self.jiras.extend(res)
+        # a reference never spans several lines, no need to split the message
+        self._jiras = re_jira_pattern.findall(self.message)
 
     def __init__(self, hexsha: str, summary: str, message: str) -> None:
         self.sha1 = hexsha
-        self.short = hexsha[:8]
         self.message = message
         self.summary = summary
+        self._header = None
+        self._jiras = None
+
+    @classmethod
+    def from_fields(  # pylint: disable=too-many-arguments
+        cls,
+        hexsha: str,
+        summary: str,
+        message: str,
+        commit_type: str,
+        scope: str,
+        subject: str,
+        revert_summary: Optional[str],
+        jiras: List[str],
+    ) -> "Commit":
+        """Builds a commit from already parsed fields, without running the parsers"""
+        commit = cls(hexsha, summary, message)
+        commit._header = (commit_type, scope, subject, revert_summary)
+        commit._jiras = jiras
+        return commit
+
+    @property
+    def header(self) -> Tuple[str, str, str, Optional[str]]:
+        if self._header is None:
+            self.get_header_data()
+            self.get_revert_data()
+        return self._header  # type: ignore[return-value]
+
+    @property
+    def short(self) -> str:
+        return self.sha1[:8]
+
+    @property
+    def commit_type(self) -> str:
+        return self.header[0]
+
+    @property
+    def scope(self) -> str:
+        return self.header[1]
+
+    @property
+    def subject(self) -> str:
+        return self.header[2]
+
+    @property
+    def revert_summary(self) -> Optional[str]:
+        return self.header[3]
+
+    @property
+    def revert(self) -> Optional["Commit"]:
+        """The reverted commit, as far as it can be told from the summary"""
+        summary = self.revert_summary
+        return None if summary is None else Commit("", summary, summary)
 
-        self.get_header_data()
-        self.get_revert_data()
-        self.get_jira_data()
+    @property
+    def jiras(self) -> List[str]:
+        if self._jiras is None:
+            self.get_jira_data()
+        return self._jiras  # type: ignore[return-value]
@@ -0,0 +1,198 @@
+import re
+from array import array
+from itertools import compress, repeat
+from operator import eq, ne
+from typing import (
+    AbstractSet,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# the Commit patterns, applied to all the lines of a buffer at once: a revert header
+# takes precedence over a conventional header, as in Commit.get_revert_data
+re_batch_header_pattern = re.compile(
+    r"^(?:[R|r]evert:? (?P<reverted>[^\n]*)"
+    r"|(?P<type>[^\(\n]+)\((?P<scope>[^\)\n]+)\): (?P<subject>[^\n]+))$",
+    re.MULTILINE,
+)
+re_batch_reverted_pattern = re.compile(
+    r"^(?:[^\(\n]+)\((?P<scope>[^\)\n]+)\): (?P<subject>[^\n]+)$", re.MULTILINE
+)
+# the messages are joined by NUL, which a commit message can not contain: each empty
+# match is the end of a message. The leading lookahead lets the regex engine skip the
+# other characters with a single test.
+re_batch_jira_pattern = re.compile(
+    r"(?=[\0A-Z])(?:\0|\b([A-Z]{2,6}[0-9]{0,6}-[0-9]{1,6})\b)"
+)
+
+UNKNOWN_TYPE = "unknown"
+
+
+def line_offsets(lines: Sequence[str]) -> Dict[int, int]:
+    """Maps the offset of each line, in the lines joined by new lines, to its index"""
+    offsets = {}
+    offset = 0
+    for index, line in enumerate(lines):
+        offsets[offset] = index
+        offset += len(line) + 1
+    return offsets
+
+
+class CommitRow:
+    """A read only view on a row of ParsedCommits, with the attributes of a Commit"""
+
+    __slots__ = ("parsed", "index")
+
+    def __init__(self, parsed: "ParsedCommits", index: int) -> None:
+        self.parsed = parsed
+        self.index = index
+
+    @property
+    def sha1(self) -> str:
+        return self.parsed.sha1s[self.index]
+
+    @property
+    def short(self) -> str:
+        return self.sha1[:8]
+
+    @property
+    def summary(self) -> str:
+        return self.parsed.summaries[self.index]
+
+    @property
+    def message(self) -> str:
+        return self.parsed.messages[self.index]
+
+    @property
+    def commit_type(self) -> str:
+        return self.parsed.commit_types[self.index]
+
+    @property
+    def scope(self) -> str:
+        return self.parsed.scopes[self.index]
+
+    @property
+    def subject(self) -> str:
+        return self.parsed.subjects[self.index]
+
+    @property
+    def revert_summary(self) -> Optional[str]:
+        return self.parsed.revert_summaries.get(self.index)
+
+    @property
+    def jiras(self) -> List[str]:
+        offsets = self.parsed.jira_offsets
+        return self.parsed.jiras[offsets[self.index] : offsets[self.index + 1]]
+
+
+class CommitRows(Sequence[CommitRow]):
+    """Some rows of ParsedCommits, in the given order"""
+
+    def __init__(self, parsed: "ParsedCommits", indices: Sequence[int]) -> None:
+        self.parsed = parsed
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, position):  # type: ignore[override]
+        if isinstance(position, slice):
+            return CommitRows(self.parsed, self.indices[position])
+        return CommitRow(self.parsed, self.indices[position])
+
+    def __iter__(self) -> Iterator[CommitRow]:
+        parsed = self.parsed
+        return (CommitRow(parsed, index) for index in self.indices)
+
+
+class ParsedCommits:  # pylint: disable=too-many-instance-attributes
+    """
+    The parsed fields of a batch of commits, one list per field.
+
+    The Jira references of all the commits are flattened in `jiras`: those of the
+    commit `i` are `jiras[jira_offsets[i]:jira_offsets[i + 1]]`.
+    """
+
+    def __init__(self, records: Iterable[Tuple[str, str, str]]) -> None:
+        self.sha1s: List[str] = []
+        self.summaries: List[str] = []
+        self.messages: List[str] = []
+        for sha1, summary, message in records:
+            self.sha1s.append(sha1)
+            self.summaries.append(summary)
+            self.messages.append(message)
+
+        self.commit_types: List[str] = [UNKNOWN_TYPE] * len(self.sha1s)
+        self.scopes: List[str] = ["any"] * len(self.sha1s)
+        self.subjects: List[str] = list(self.summaries)
+        self.reverts = bytearray(len(self.sha1s))
+        self.revert_summaries: Dict[int, str] = {}
+        self.jiras: List[str] = []
+        self.jira_offsets = array("L", [0])
+
+        self._parse_headers()
+        self._parse_jiras()
+
+    def _parse_headers(self) -> None:
+        offsets = line_offsets(self.summaries)
+        for res in re_batch_header_pattern.finditer("\n".join(self.summaries)):
+            index = offsets[res.start()]
+            if res.group("type") is not None:
+                self.commit_types[index] = res.group("type")
+                self.scopes[index] = res.group("scope")
+                self.subjects[index] = res.group("subject")
+                continue
+            self.commit_types[index] = "revert"
+            self.reverts[index] = 1
+            self.revert_summaries[index] = res.group("reverted")
+            self.subjects[index] = f"revert {res.group('reverted')}"
+
+        reverted = list(self.revert_summaries.items())
+        offsets = line_offsets([summary for _, summary in reverted])
+        joined = "\n".join(summary for _, summary in reverted)
+        for res in re_batch_reverted_pattern.finditer(joined):
+            index = reverted[offsets[res.start()]][0]
+            self.scopes[index] = res.group("scope")
+            self.subjects[index] = f"revert {res.group('subject')}"
+
+    def _parse_jiras(self) -> None:
+        offsets = self.jira_offsets
+        jiras = self.jiras
+        for jira in re_batch_jira_pattern.findall("\0".join(self.messages) + "\0"):
+            if jira:
+                jiras.append(jira)
+            else:
+                offsets.append(len(jiras))
+
+    def __len__(self) -> int:
+        return len(self.sha1s)
+
+    def __getitem__(self, index: int) -> CommitRow:
+        return CommitRow(self, index)
+
+    def rows(self, indices: Sequence[int]) -> CommitRows:
+        return CommitRows(self, indices)
+
+    def indices_of_types(
+        self, commit_types: AbstractSet[str], exclude: bool = False
+    ) -> List[int]:
+        """Lists the indices of the commits of some types, or of all the other ones"""
+        selected = map(commit_types.__contains__, self.commit_types)
+        return list(
+            compress(
+                range(len(self)), map(ne if exclude else eq, selected, repeat(True))
+            )
+        )
+
+
+def parse_commits(records: Iterable[Tuple[str, str, str]]) -> ParsedCommits:
+    """
+    Parses a batch of `(sha1, summary, message)` records, with one regular expression
+    pass over all the summaries and one over all the messages.
+    """
+    return ParsedCommits(records)
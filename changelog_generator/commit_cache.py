@@ -0,0 +1,268 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from git import Repo
+
+from .commit import Commit
+from .commit_reader import RECORD_FORMAT, BaseCommitReader, iter_log_commits
+
+SCHEMA_VERSION = 1
+DEFAULT_CACHE_NAME = "changelog_generator.sqlite"
+DEFAULT_MAX_ENTRIES = 500_000
+BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    sha1 TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    message TEXT NOT NULL,
+    commit_type TEXT,
+    scope TEXT,
+    subject TEXT,
+    revert_summary TEXT,
+    jiras TEXT NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commits_last_used ON commits (last_used);
+CREATE TABLE IF NOT EXISTS commit_paths (
+    paths TEXT NOT NULL,
+    sha1 TEXT NOT NULL,
+    PRIMARY KEY (paths, sha1)
+) WITHOUT ROWID;
+"""
+
+
+Item = TypeVar("Item")
+
+
+def batched(items: Iterable[Item], size: int = BATCH_SIZE) -> Iterator[List[Item]]:
+    batch: List[Item] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def commit_from_row(row: Tuple[Any, ...]) -> Commit:
+    """the commit of a row of its fields, from the sha1 to the JSON list of the jiras"""
+    return Commit.from_fields(
+        row[0], row[1], row[2], row[3], row[4], row[5], row[6], json.loads(row[7])
+    )
+
+
+def paths_key(paths: Sequence[str]) -> str:
+    return "\0".join(sorted(paths))
+
+
+class CommitCache:
+    """
+    Stores the parsed commits in a SQLite database, keyed by their sha1.
+
+    The database is in WAL mode so that several processes can share it: the readers
+    never wait for a writer, and the writers wait for each other up to `timeout`
+    seconds. The reads only select: the last use of the commits read is recorded with
+    the next write. When it holds more than `max_entries` commits, the least recently
+    used ones are evicted. A database written with another schema version is reset.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        timeout: float = 30.0,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # the commits read since the last write, whose last use is not recorded yet
+        self.used: Set[str] = set()
+        self.connection = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    @classmethod
+    def for_repository(cls, repository: Repo, **kwargs: Any) -> "CommitCache":
+        """Opens the cache stored in the `.git` directory of the repository"""
+        return cls(os.path.join(repository.git_dir, DEFAULT_CACHE_NAME), **kwargs)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Takes the write lock of the database at once, instead of upgrading a read
+        lock later on, which could fail on a concurrent write.
+        """
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def _migrate(self) -> None:
+        with self.transaction() as connection:
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+            if version != SCHEMA_VERSION:
+                connection.execute("DROP TABLE IF EXISTS commits")
+                connection.execute("DROP TABLE IF EXISTS commit_paths")
+            for statement in SCHEMA.split(";"):
+                connection.execute(statement)
+            connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self.flush()
+        self.connection.close()
+
+    def get_many(self, shas: Sequence[str]) -> Dict[str, Commit]:
+        """Returns the cached commits among the given ones, without a write"""
+        commits = {}
+        with self.lock:
+            for batch in batched(shas):
+                placeholders = ",".join("?" * len(batch))
+                rows = self.connection.execute(
+                    "SELECT sha1, summary, message, commit_type, scope, subject, "
+                    f"revert_summary, jiras FROM commits WHERE sha1 IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for row in rows:
+                    commits[row[0]] = commit_from_row(row)
+            self.used.update(commits)
+        return commits
+
+    def put_many(
+        self,
+        commits: Sequence[Commit],
+        paths: Sequence[str] = (),
+        shas: Sequence[str] = (),
+    ) -> None:
+        """
+        Stores the commits, records that the shas touched the given set of filter
+        paths, and the last use of the commits read, in a single transaction. Then
+        evicts the least recently used commits if needed.
+        """
+        now = int(time.time())
+        rows = [
+            (
+                commit.sha1,
+                commit.summary,
+                commit.message,
+                commit.commit_type,
+                commit.scope,
+                commit.subject,
+                commit.revert_summary,
+                json.dumps(commit.jiras),
+                now,
+            )
+            for commit in commits
+        ]
+        with self.transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if paths:
+                key = paths_key(paths)
+                connection.executemany(
+                    "INSERT OR IGNORE INTO commit_paths VALUES (?, ?)",
+                    ((key, sha) for sha in shas),
+                )
+            self._record_uses(connection, now)
+            self._evict(connection)
+
+    def flush(self) -> None:
+        """Records the last use of the commits read since the last write"""
+        if self.used:
+            with self.transaction() as connection:
+                self._record_uses(connection, int(time.time()))
+
+    def _record_uses(self, connection: sqlite3.Connection, now: int) -> None:
+        used, self.used = self.used, set()
+        for batch in batched(used):
+            connection.execute(
+                "UPDATE commits SET last_used=? "
+                f"WHERE sha1 IN ({','.join('?' * len(batch))})",
+                [now, *batch],
+            )
+
+    def get_paths(self, sha: str) -> List[Tuple[str, ...]]:
+        """Lists the sets of filter paths the commit is known to touch"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT paths FROM commit_paths WHERE sha1=?", (sha,)
+            ).fetchall()
+        return [tuple(key.split("\0")) for (key,) in rows]
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Removes the least recently used commits when the cache is full"""
+        (count,) = connection.execute("SELECT COUNT(*) FROM commits").fetchone()
+        if count <= self.max_entries:
+            return
+        connection.execute(
+            "DELETE FROM commits WHERE sha1 IN "
+            "(SELECT sha1 FROM commits ORDER BY last_used LIMIT ?)",
+            (count - self.max_entries,),
+        )
+        connection.execute(
+            "DELETE FROM commit_paths WHERE sha1 NOT IN (SELECT sha1 FROM commits)"
+        )
+
+
+class CachedCommitReader(BaseCommitReader):
+    """
+    Lists the commits of a revision with `git rev-list`, takes the known ones from the
+    cache, and reads and parses only the others, with a single `git log` per batch.
+    """
+
+    def __init__(self, repository: Repo, cache: CommitCache) -> None:
+        super().__init__(repository)
+        self.cache = cache
+
+    def _read_commits(self, shas: Sequence[str]) -> Dict[str, Commit]:
+        arguments = ["--no-walk=unsorted", "-z", RECORD_FORMAT, *shas, "--"]
+        return {
+            commit.sha1: commit
+            for commit in iter_log_commits(self.repository, arguments)
+        }
+
+    def iter_commits(
+        self, revision: Union[str, Sequence[str]], paths: Sequence[str] = ()
+    ) -> Iterator[Commit]:
+        revisions = [revision] if isinstance(revision, str) else list(revision)
+        process = self.repository.git.rev_list(
+            "--no-merges", *revisions, "--", *paths, as_process=True
+        )
+        for batch in batched(line.decode().strip() for line in process.stdout):
+            commits = self.cache.get_many(batch)
+            missing = [sha for sha in batch if sha not in commits]
+            read = self._read_commits(missing) if missing else {}
+            if read or paths:
+                # a single write per batch, when there is something to write
+                self.cache.put_many(list(read.values()), paths, batch)
+            commits.update(read)
+            for sha in batch:
+                yield commits[sha]
+        process.wait()
+        self.cache.flush()
@@ -0,0 +1,183 @@
+from abc import ABC, abstractmethod
+from tempfile import TemporaryFile
+from typing import IO, Iterator, List, NamedTuple, Sequence, Tuple, Union
+
+from git import Repo
+
+from .commit import Commit
+
+RECORD_FORMAT = "--format=%H%x00%B"
+# the changed files follow the message of the commit, a record starts with \x01
+CHANGES_FORMAT = "--format=%x01%H%x00%P%x00%B"
+READ_SIZE = 1 << 16
+
+
+def iter_nul_fields(stream: IO[bytes]) -> Iterator[bytes]:
+    """
+    Yields the NUL terminated fields of a binary stream, reading it by blocks.
+    """
+    pending = b""
+    while True:
+        block = stream.read(READ_SIZE)
+        if not block:
+            break
+        fields = (pending + block).split(b"\0")
+        pending = fields.pop()
+        yield from fields
+    if pending:
+        yield pending
+
+
+def iter_log_commits(repository: Repo, arguments: Sequence[str]) -> Iterator[Commit]:
+    """Runs `git log` with the `RECORD_FORMAT` and parses its output as it comes"""
+    process = repository.git.log(*arguments, as_process=True)
+    fields = iter_nul_fields(process.stdout)
+    for hexsha in fields:
+        message = next(fields, b"").decode("utf-8", "replace")
+        yield Commit(
+            hexsha=hexsha.decode("ascii"),
+            summary=message.split("\n", 1)[0],
+            message=message,
+        )
+    process.wait()
+
+
+class ChangedCommit(NamedTuple):
+    commit: Commit
+    parents: List[str]
+    files: List[str]
+
+
+def iter_log_changes(
+    repository: Repo, revisions: Sequence[str]
+) -> Iterator[ChangedCommit]:
+    """
+    Streams the commits of the revisions, the merges included, with their parents and
+    the files they change, out of a single `git log --name-only` call.
+    """
+    process = repository.git.log(
+        "-z",
+        "--name-only",
+        "--no-renames",
+        CHANGES_FORMAT,
+        *revisions,
+        "--",
+        as_process=True,
+    )
+    record: List[bytes] = []
+    for field in iter_nul_fields(process.stdout):
+        if field.startswith(b"\x01") and len(record) >= 3:
+            yield parse_changes(record)
+            record = []
+        record.append(field)
+    if record:
+        yield parse_changes(record)
+    process.wait()
+
+
+def parse_changes(record: List[bytes]) -> ChangedCommit:
+    hexsha, parents, message, *files = record
+    text = message.decode("utf-8", "replace")
+    commit = Commit(
+        hexsha=hexsha[1:].decode("ascii"),
+        summary=text.split("\n", 1)[0],
+        message=text,
+    )
+    return ChangedCommit(
+        commit,
+        parents.decode("ascii").split(),
+        [name.decode("utf-8", "replace").lstrip("\n") for name in files],
+    )
+
+
+def iter_merge_changes(
+    repository: Repo, merges: Sequence[Tuple[str, Sequence[str]]]
+) -> Iterator[List[str]]:
+    """
+    Streams the files each merge changes against each of its parents, in their order,
+    out of a single `git diff-tree --stdin` call fed with a `merge parent` line per pair.
+    """
+    with TemporaryFile() as pairs:
+        for sha, parents in merges:
+            pairs.writelines(f"{sha} {parent}\n".encode("ascii") for parent in parents)
+        pairs.seek(0)
+        process = repository.git.diff_tree(
+            "--stdin",
+            "-r",
+            "-z",
+            "--name-only",
+            "--no-renames",
+            "--always",
+            "--format=%x01",
+            istream=pairs,
+            as_process=True,
+        )
+        files: List[str] = []
+        started = False
+        for field in iter_nul_fields(process.stdout):
+            name = field.lstrip(b"\n")
+            if name.startswith(b"\x01"):
+                if started:
+                    yield files
+                files, started = [], True
+                name = name[1:].lstrip(b"\n")
+            if name:
+                files.append(name.decode("utf-8", "replace"))
+        if started:
+            yield files
+        process.wait()
+
+
+class BaseCommitReader(ABC):
+    def __init__(self, repository: Repo) -> None:
+        self.repository = repository
+
+    @abstractmethod
+    def iter_commits(
+        self, revision: Union[str, Sequence[str]], paths: Sequence[str] = ()
+    ) -> Iterator[Commit]:
+        """
+        lists the non merge commits of a revision, in the `git log` order
+
+        The revision can also be a list of revisions, like `["v2", "v3", "^v1"]`.
+        """
+
+
+class GitPythonCommitReader(BaseCommitReader):
+    """
+    Reads the commits through the GitPython object database, one object per commit.
+    """
+
+    def iter_commits(
+        self, revision: Union[str, Sequence[str]], paths: Sequence[str] = ()
+    ) -> Iterator[Commit]:
+        options = {"no_merges": True}
+        if paths:
+            options["paths"] = paths
+        for commit in self.repository.iter_commits(revision, **options):
+            yield Commit(
+                hexsha=commit.hexsha, summary=commit.summary, message=commit.message
+            )
+
+
+class GitLogCommitReader(BaseCommitReader):
+    """
+    Streams a whole revision out of a single `git log` call.
+
+    Each commit is emitted as a `sha NUL message NUL` record: a commit message can not
+    contain a NUL byte, so the stream can be split without any escaping.
+    """
+
+    def log_arguments(
+        self, revision: Union[str, Sequence[str]], paths: Sequence[str]
+    ) -> List[str]:
+        arguments = ["--no-merges", "-z", RECORD_FORMAT]
+        arguments.extend([revision] if isinstance(revision, str) else revision)
+        arguments.append("--")
+        arguments.extend(paths)
+        return arguments
+
+    def iter_commits(
+        self, revision: Union[str, Sequence[str]], paths: Sequence[str] = ()
+    ) -> Iterator[Commit]:
+        return iter_log_commits(self.repository, self.log_arguments(revision, paths))
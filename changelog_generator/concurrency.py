@@ -0,0 +1,49 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, TypeVar
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+
+def ordered_map(
+    function: Callable[[Item], Result], items: Iterable[Item], workers: int = 1
+) -> Iterator[Result]:
+    """
+    Maps the items in a pool of threads and yields the results in the items order.
+
+    The items are consumed lazily: at most two results per worker are pending at any
+    time, so a slow consumer does not pile up the results.
+    """
+    if workers <= 1:
+        yield from map(function, items)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run_in_background(function: Callable[..., Result], *args: Any) -> "Future[Result]":
+    """
+    Runs the function in a daemon thread: unlike in an executor, a call still running
+    when its result is given up on does not delay the exit of the process.
+    """
+    future: "Future[Result]" = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(function(*args))
+        except BaseException as error:  # pylint: disable=broad-except
+            future.set_exception(error)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
@@ -0,0 +1,190 @@
+"""
+Prunes and ranks the diff sent to the AI model
+
+The files of the diff are listed first, without their content: the files matching the
+excluded pathspecs, like lockfiles, generated code or vendored trees, are left out, and
+their blobs are never fetched in a partial clone. The line counts of the other ones are
+read with `git diff --numstat -w`, which also leaves out the whitespace-only changes and
+tells the binary files. The files are then ranked, those of the service of the prefix
+before the common layer, and kept while their diff fits in the token budget.
+
+Only the kept files are diffed, the files of the service first, and the files left out
+are listed after the diff.
+"""
+
+import codecs
+import os
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from git import Repo
+
+from .ai_generator import CHARS_PER_TOKEN
+from .commit_cache import batched
+from .path_filter import PathFilter
+
+# the lockfiles, generated code and vendored trees of the usual ecosystems
+DEFAULT_EXCLUDED = (
+    "*.lock",
+    "*-lock.json",
+    "*-lock.yaml",
+    "*/go.sum",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*.snap",
+    "*_pb2.py",
+    "*_pb2_grpc.py",
+    "*.pb.go",
+    "*/__generated__/*",
+    "*/generated/*",
+    "vendor/",
+    "*/vendor/*",
+    "node_modules/",
+    "*/node_modules/*",
+    "dist/",
+)
+# a rough estimation of the characters of a changed line in a diff, with its context
+# lines, and of the header of the diff of a file
+LINE_SIZE = 60
+HEADER_SIZE = 150
+MAX_LISTED_FILES = 50
+
+
+class DiffPruning(NamedTuple):
+    excluded: Tuple[str, ...] = DEFAULT_EXCLUDED
+    max_tokens: Optional[int] = None
+
+    @classmethod
+    def from_environment(cls) -> "DiffPruning":
+        """
+        VERTEX_DIFF_EXCLUDE is a comma separated list of pathspecs replacing the default
+        ones, empty to exclude nothing, and VERTEX_DIFF_MAX_TOKENS the budget of the diff
+        """
+        excluded = os.getenv("VERTEX_DIFF_EXCLUDE")
+        max_tokens = os.getenv("VERTEX_DIFF_MAX_TOKENS")
+        return cls(
+            excluded=(
+                DEFAULT_EXCLUDED
+                if excluded is None
+                else tuple(filter(None, excluded.split(",")))
+            ),
+            max_tokens=int(max_tokens) if max_tokens else None,
+        )
+
+    @property
+    def max_size(self) -> Optional[int]:
+        """the budget in characters"""
+        return None if self.max_tokens is None else self.max_tokens * CHARS_PER_TOKEN
+
+
+class FileChange(NamedTuple):
+    path: str
+    # None for a binary file
+    added: Optional[int] = None
+    deleted: Optional[int] = None
+    # why the file is left out of the diff, if it is
+    reason: str = ""
+
+    @property
+    def binary(self) -> bool:
+        return self.added is None
+
+    @property
+    def estimated_size(self) -> int:
+        return HEADER_SIZE + LINE_SIZE * ((self.added or 0) + (self.deleted or 0))
+
+    def describe(self) -> str:
+        counts = "" if self.binary else f" (+{self.added} -{self.deleted})"
+        return f"- {self.path}{counts}: {self.reason}\n"
+
+
+def literal(paths: Sequence[str]) -> List[str]:
+    """the pathspecs matching exactly the paths, whatever their characters"""
+    return [f":(literal){path}" for path in paths]
+
+
+def diff_path(header: bytes) -> str:
+    """
+    The path of a `diff --git a/path b/path` header, without renames: both names are
+    the same, and quoted the same way when the path has special characters
+    """
+    names = header[len(b"diff --git ") :].rstrip(b"\n")
+    name = names[len(names) // 2 + 1 :]
+    if name.startswith(b'"'):
+        name = codecs.escape_decode(name[1:-1])[0]
+    return name[len(b"b/") :].decode("utf-8", "replace")
+
+
+def list_changed_paths(
+    repository: Repo, revision: str, paths: Sequence[str]
+) -> List[str]:
+    """lists the files of a diff without reading their content"""
+    output = repository.git.diff(
+        "--name-only", "-z", "--no-renames", revision, "--", *paths
+    )
+    return [path for path in output.split("\0") if path]
+
+
+def read_numstat(
+    repository: Repo, revision: str, paths: Sequence[str]
+) -> Iterator[FileChange]:
+    """
+    Reads the lines added and deleted in the files, the whitespace changes aside: the
+    files only changing whitespaces are not listed
+    """
+    for batch in batched(paths):
+        output = repository.git.diff(
+            "--numstat", "-w", "-z", "--no-renames", revision, "--", *literal(batch)
+        )
+        for record in output.split("\0"):
+            if not record:
+                continue
+            added, deleted, path = record.split("\t", 2)
+            if added == "-":
+                yield FileChange(path, reason="binary")
+            else:
+                yield FileChange(path, int(added), int(deleted))
+
+
+def select_changes(
+    changes: Sequence[FileChange], prefix: Optional[str], max_size: Optional[int]
+) -> Tuple[List[List[FileChange]], List[FileChange]]:
+    """
+    Ranks the files with a component named after the prefix before the other ones, then
+    the smallest changes first, and keeps them while their estimated diff fits in the
+    budget. Returns the files kept in two groups, those of the service and the other
+    ones, in the order of the paths, and the files left out.
+    """
+    own_paths = PathFilter([f"{prefix}/*", f"*/{prefix}/*"]) if prefix else None
+
+    def is_own(change: FileChange) -> bool:
+        return own_paths is not None and own_paths.match(change.path)
+
+    own: List[FileChange] = []
+    common: List[FileChange] = []
+    left_out: List[FileChange] = []
+    remaining = max_size
+    for change in sorted(
+        changes, key=lambda change: (not is_own(change), change.estimated_size)
+    ):
+        if change.reason:
+            left_out.append(change)
+        elif remaining is not None and change.estimated_size > remaining:
+            left_out.append(change._replace(reason="over the budget"))
+        else:
+            if remaining is not None:
+                remaining -= change.estimated_size
+            (own if is_own(change) else common).append(change)
+    groups = [sorted(group, key=lambda change: change.path) for group in (own, common)]
+    return groups, left_out
+
+
+def describe_left_out(left_out: Sequence[FileChange]) -> str:
+    listed = "".join(change.describe() for change in left_out[:MAX_LISTED_FILES])
+    more = len(left_out) - MAX_LISTED_FILES
+    return (
+        "\nFiles left out of this diff:\n"
+        + listed
+        + (f"- and {more} more files\n" if more > 0 else "")
+    )
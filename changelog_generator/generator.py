@@ -1,87 +1,406 @@
+import logging
+import math
 import os
-from typing import List, NamedTuple, Optional, Sequence
-
-from jinja2 import Environment, FileSystemLoader
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
+from .ai_generator import generate_ai_summary
 from .commit import Commit
+from .commit_batch import CommitRow
+from .concurrency import ordered_map, run_in_background
+from .profiling import profile_stream, span
 from .repository_manager import RepositoryManager
-from .ai_generator import generate_ai_summary
+from .sections import CommitTree, get_commit_trees
+
+if TYPE_CHECKING:
+    from jinja2 import Environment, Template
+
+
+# the indentation and the new line around an entry
+ENTRY_OVERHEAD = 3
+
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(__file__), "changelog_template.jinja")
+
+
+@lru_cache()
+def get_environment(directory: str) -> "Environment":
+    """
+    Builds a single environment per template directory, with a bytecode cache shared
+    between the processes: a template is only compiled once per version.
+    """
+    # pylint: disable=import-outside-toplevel
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    return Environment(
+        loader=FileSystemLoader(searchpath=directory),
+        bytecode_cache=FileSystemBytecodeCache(),
+    )
 
 
-class CommitTree(NamedTuple):
-    commit_type: str
-    commits: Sequence[Commit]
+def get_template(template_path: Optional[str] = None) -> "Template":
+    """
+    The environment keeps the compiled template, and reloads it once its file changes
+    """
+    path = os.path.abspath(template_path or DEFAULT_TEMPLATE)
+    return get_environment(os.path.dirname(path)).get_template(os.path.basename(path))
 
 
-def render_changelog(
+def stream_changelog(  # pylint: disable=too-many-arguments
     organization: str,
     repository: str,
     previous_tag: str,
     current_tag: str,
     commit_trees: Sequence[CommitTree],
     ai_summary: str | None,
-) -> str:
-    template_loader = FileSystemLoader(searchpath=os.path.dirname(__file__))
-    template_environment = Environment(loader=template_loader)
-    template = template_environment.get_template("changelog_template.jinja")
+    template: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Renders the changelog chunk by chunk, with the default or a custom template. With
+    `max_bytes`, only the entries fitting in that many UTF-8 bytes are rendered.
+    """
+    context = {
+        "organization": organization,
+        "repository": repository,
+        "previous_tag": previous_tag,
+        "current_tag": current_tag,
+        "ai_summary": ai_summary,
+    }
+    if max_bytes is None:
+        return get_template(template).generate(commit_trees=commit_trees, **context)
 
-    return template.render(
-        organization=organization,
-        repository=repository,
-        previous_tag=previous_tag,
-        current_tag=current_tag,
-        commit_trees=commit_trees,
-        ai_summary=ai_summary,
+    def rendered_bytes(trees: Sequence[CommitTree]) -> int:
+        return len(
+            "".join(
+                get_template(template).generate(commit_trees=trees, **context)
+            ).encode()
+        )
+
+    overhead = rendered_bytes([tree._replace(commits=[]) for tree in commit_trees])
+    collapsed = rendered_bytes(
+        [tree._replace(commits=[], more=len(tree.commits)) for tree in commit_trees]
+    )
+    fitted = fit_commit_trees(
+        commit_trees,
+        max_bytes - overhead,
+        math.ceil((collapsed - overhead) / max(len(commit_trees), 1)),
+        organization,
+        repository,
+    )
+    return limit_bytes(
+        get_template(template).generate(commit_trees=fitted, **context), max_bytes
     )
 
 
-def get_commit_trees(commits: Sequence[Commit]) -> List[CommitTree]:
-    types = {"docs", "feat", "fix", "revert"}
-    titles = {
-        "docs": ":notebook_with_decorative_cover: Documentation",
-        "feat": ":rocket: Features",
-        "fix": ":bug: Fixes",
-        "revert": ":scream: Revert",
-        "others": ":nut_and_bolt: Others",
-    }
-    commit_by_type = {}
-    for commit in commits:
-        if commit.commit_type in types:
-            commit_by_type.setdefault(commit.commit_type, []).append(commit)
-        else:
-            commit_by_type.setdefault("others", []).append(commit)
+def entry_size(
+    commit: Union[Commit, CommitRow], organization: str, repository: str
+) -> int:
+    """The bytes of the entry of a commit in the default template, give or take"""
+    jiras = commit.jiras
+    return (
+        len(f"* **{commit.scope}**: {commit.subject}".encode())
+        + len(
+            f" ([{commit.short}](https://github.com/{organization}/{repository}"
+            f"/commit/{commit.sha1}))".encode()
+        )
+        + sum(
+            len(f" [{jira}](https://{organization}.atlassian.net/browse/{jira})")
+            for jira in jiras
+        )
+        + (len(", references:") if jiras else 0)
+        + ENTRY_OVERHEAD
+    )
+
+
+def fit_commit_trees(
+    commit_trees: Sequence[CommitTree],
+    budget: int,
+    more_size: int,
+    organization: str,
+    repository: str,
+) -> List[CommitTree]:
+    """
+    Shares the budget of the entries between the sections: the smallest sections are
+    rendered in full, and the rest of the budget is split evenly between the others,
+    which keep their first entries and a line of `more_size` bytes for the rest. A
+    section does not give the unused part of its share away.
+    """
+    sizes = [
+        [entry_size(commit, organization, repository) for commit in tree.commits]
+        for tree in commit_trees
+    ]
+    kept = [0] * len(commit_trees)
+    remaining = max(budget, 0)
+    order = sorted(range(len(commit_trees)), key=lambda index: sum(sizes[index]))
+    for position, index in enumerate(order):
+        share = remaining // (len(order) - position)
+        if sum(sizes[index]) <= share:
+            kept[index] = len(sizes[index])
+            remaining -= sum(sizes[index])
+            continue
+        used = more_size
+        for size in sizes[index]:
+            if used + size > share:
+                break
+            used += size
+            kept[index] += 1
+        remaining -= min(used, share)
 
     return [
-        CommitTree(commit_type=title, commits=commit_by_type[commit_type])
-        for commit_type, title in titles.items()
-        if commit_type in commit_by_type
+        tree._replace(
+            commits=tree.commits[: kept[index]],
+            more=tree.more + len(tree.commits) - kept[index],
+        )
+        for index, tree in enumerate(commit_trees)
     ]
 
 
-def generate(
+def limit_bytes(chunks: Iterable[str], max_bytes: int) -> Iterator[str]:
+    """
+    Stops the stream at `max_bytes`, at the end of the last full line, in case a custom
+    template renders more than the entries were budgeted for
+    """
+    for chunk in chunks:
+        encoded = chunk.encode()
+        if len(encoded) <= max_bytes:
+            max_bytes -= len(encoded)
+            yield chunk
+            continue
+        head = encoded[:max_bytes].decode(errors="ignore")
+        yield head[: head.rfind("\n") + 1]
+        return
+
+
+def render_changelog(  # pylint: disable=too-many-arguments
+    organization: str,
+    repository: str,
+    previous_tag: str,
+    current_tag: str,
+    commit_trees: Sequence[CommitTree],
+    ai_summary: str | None,
+    template: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> str:
+    return "".join(
+        stream_changelog(
+            organization=organization,
+            repository=repository,
+            previous_tag=previous_tag,
+            current_tag=current_tag,
+            commit_trees=commit_trees,
+            ai_summary=ai_summary,
+            template=template,
+            max_bytes=max_bytes,
+        )
+    )
+
+
+def generate_stream(  # pylint: disable=too-many-arguments
     repository_path: str,
     target: Optional[str] = None,
     prefix: Optional[str] = None,
     filter_paths: Optional[str] = None,
-) -> str:
-    repository = RepositoryManager(
-        uri=repository_path, prefix=prefix, filter_paths=filter_paths
+    commit_cache: Optional[str] = None,
+    template: Optional[str] = None,
+    ai_timeout: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+    commit_backend: Optional[str] = None,
+    spool: bool = False,
+) -> Iterator[str]:
+    """
+    The AI summary is generated in the background while the commits are read and
+    grouped. If it is not ready `ai_timeout` seconds later, the changelog is rendered
+    without it. With `max_bytes`, the entries of each section beyond its share of the
+    budget are collapsed in a line linking to the comparison of the tags.
+
+    With `spool`, the commits are streamed to a temporary database and read back section
+    by section while rendering, for a memory independent of the size of the range with
+    the default commit backend: the native one lists the commits before they are spooled.
+    """
+    with span("repository"):
+        repository = RepositoryManager(
+            uri=repository_path,
+            prefix=prefix,
+            filter_paths=filter_paths,
+            commit_cache=commit_cache,
+            commit_backend=commit_backend,
+        )
+    return stream_repository(
+        repository,
+        target=target,
+        template=template,
+        ai_timeout=ai_timeout,
+        max_bytes=max_bytes,
+        spool=spool,
     )
+
+
+def resolve_target(
+    repository: RepositoryManager, target: Optional[str]
+) -> Tuple[str, str, Optional[Iterator[str]]]:
+    """The tags of the target, or of the last release with its diff for the AI summary"""
     if target:
-        commits = repository.from_target(target)
         previous_tag, current_tag = target.split("..")
-        diff = None
+        return previous_tag, current_tag, None
+    return (
+        repository.previous_tag,
+        repository.current_tag,
+        repository.iter_diff_since_last_tag(),
+    )
+
+
+def stream_repository(  # pylint: disable=too-many-arguments
+    repository: RepositoryManager,
+    target: Optional[str] = None,
+    template: Optional[str] = None,
+    ai_timeout: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+    spool: bool = False,
+) -> Iterator[str]:
+    """generate_stream, with a repository manager already opened"""
+    with span("tags"):
+        previous_tag, current_tag, diff = resolve_target(repository, target)
+    ai_summary = run_in_background(profiled_ai_summary, repository.prefix, diff)
+
+    if spool:
+        from .spool import CommitSpool  # pylint: disable=import-outside-toplevel
+
+        commit_spool = CommitSpool()
+        with span("commits"):
+            commit_spool.add(repository.iter_commits(target))
+        with span("grouping"):
+            commit_trees = commit_spool.get_commit_trees()
     else:
-        commits = repository.commits_since_last_tag
-        previous_tag, current_tag = repository.previous_tag, repository.current_tag
-        diff = repository.get_diff_since_last_tag
+        with span("commits"):
+            if target:
+                commits = repository.from_target(target)
+            else:
+                commits = repository.commits_since_last_tag
+        with span("grouping"):
+            commit_trees = get_commit_trees(commits)
+    with span("ai_wait"):
+        summary = wait_ai_summary(ai_summary, ai_timeout)
 
-    changelog = render_changelog(
+    chunks = stream_changelog(
         organization=repository.organization,
         repository=repository.name,
         previous_tag=previous_tag,
         current_tag=current_tag,
-        commit_trees=get_commit_trees(commits),
-        ai_summary=generate_ai_summary(prefix, diff),
+        commit_trees=commit_trees,
+        ai_summary=summary,
+        template=template,
+        max_bytes=max_bytes,
+    )
+    chunks = commit_spool.stream(chunks) if spool else chunks
+    return iter(profile_stream("render", chunks))
+
+
+def profiled_ai_summary(
+    prefix: Optional[str], diff: Union[str, Iterable[str], None]
+) -> Optional[str]:
+    with span("ai_summary"):
+        return generate_ai_summary(prefix, diff)
+
+
+def wait_ai_summary(
+    ai_summary: "Future[Optional[str]]", timeout: Optional[float]
+) -> Optional[str]:
+    try:
+        return ai_summary.result(timeout=timeout)
+    except TimeoutError:
+        logging.warning("No AI summary after %s seconds, rendering without it", timeout)
+        return None
+
+
+def generate(  # pylint: disable=too-many-arguments
+    repository_path: str,
+    target: Optional[str] = None,
+    prefix: Optional[str] = None,
+    filter_paths: Optional[str] = None,
+    commit_cache: Optional[str] = None,
+    template: Optional[str] = None,
+    ai_timeout: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+    commit_backend: Optional[str] = None,
+    spool: bool = False,
+) -> str:
+    return "".join(
+        generate_stream(
+            repository_path,
+            target=target,
+            prefix=prefix,
+            filter_paths=filter_paths,
+            commit_cache=commit_cache,
+            template=template,
+            ai_timeout=ai_timeout,
+            max_bytes=max_bytes,
+            commit_backend=commit_backend,
+            spool=spool,
+        )
     )
-    return changelog
+
+
+def generate_all(  # pylint: disable=too-many-arguments
+    repository_path: str,
+    tags: Sequence[str],
+    filter_paths: Optional[Sequence[str]] = None,
+    jobs: int = 1,
+    commit_cache: Optional[str] = None,
+    template: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    commit_backend: Optional[str] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Generates the changelog of every pair of consecutive tags, given from the oldest to
+    the newest, and yields them as `(target, changelog)` in the same order.
+
+    The history is read once for all the pairs, the output is the same as calling
+    `generate` with each `previous..current` target. The changelogs are rendered by
+    `jobs` threads.
+    """
+    repository = RepositoryManager(
+        uri=repository_path,
+        filter_paths=filter_paths,
+        commit_cache=commit_cache,
+        commit_backend=commit_backend,
+    )
+    intervals = repository.commits_by_interval(tags)
+
+    def generate_interval(
+        interval: Tuple[str, str, Optional[Sequence[Commit]]],
+    ) -> Tuple[str, str]:
+        previous_tag, current_tag, commits = interval
+        target = f"{previous_tag}..{current_tag}"
+        if commits is None:
+            return target, generate(
+                repository_path,
+                target=target,
+                filter_paths=filter_paths,
+                commit_cache=commit_cache,
+                template=template,
+                max_bytes=max_bytes,
+                commit_backend=commit_backend,
+            )
+
+        return target, render_changelog(
+            organization=repository.organization,
+            repository=repository.name,
+            previous_tag=previous_tag,
+            current_tag=current_tag,
+            commit_trees=get_commit_trees(commits),
+            ai_summary=generate_ai_summary(None, None),
+            template=template,
+            max_bytes=max_bytes,
+        )
+
+    yield from ordered_map(generate_interval, zip(tags, tags[1:], intervals), jobs)
@@ -0,0 +1,214 @@
+"""
+Generates a changelog incrementally, from the state of the previous run
+
+The state file records the target of the changelog, the commits its previous tag and
+its last processed commit (the watermark) resolved to, and the parsed entries. A run on
+the same target only reads the commits after the watermark. The whole target is read
+again when the state is for another target or other path filters, when the previous
+tag moved, or when the history was rewritten and the watermark is no longer an ancestor
+of the current revision.
+
+The changelog can be patched in a file: each target is rendered in a section between
+two markers, replaced in place by the next runs, and a new target is prepended.
+"""
+
+import json
+import logging
+import os
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from git import GitCommandError
+
+from .ai_cache import atomic_write
+from .ai_generator import generate_ai_summary
+from .commit import Commit
+from .concurrency import run_in_background
+from .generator import (
+    get_commit_trees,
+    render_changelog,
+    resolve_target,
+    wait_ai_summary,
+)
+from .repository_manager import RepositoryManager
+
+STATE_VERSION = 1
+SECTION_START = "<!-- changelog-generator {target} -->"
+SECTION_END = "<!-- /changelog-generator {target} -->"
+
+
+class ChangelogState(NamedTuple):
+    target: str
+    # the commits the previous tag and the last processed one resolved to
+    base: str
+    watermark: str
+    filter_paths: List[str]
+    entries: List[Commit]
+
+
+def load_state(path: str) -> Optional[ChangelogState]:
+    try:
+        with open(path, encoding="utf-8") as stream:
+            data = json.load(stream)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logging.warning("Ignoring the corrupted changelog state %s", path)
+        return None
+    if data.get("version") != STATE_VERSION:
+        return None
+    return ChangelogState(
+        data["target"],
+        data["base"],
+        data["watermark"],
+        data["filter_paths"],
+        [Commit.from_fields(*entry) for entry in data["entries"]],
+    )
+
+
+def save_state(path: str, state: ChangelogState) -> None:
+    entries = [
+        (
+            commit.sha1,
+            commit.summary,
+            commit.message,
+            commit.commit_type,
+            commit.scope,
+            commit.subject,
+            commit.revert_summary,
+            commit.jiras,
+        )
+        for commit in state.entries
+    ]
+    data = {"version": STATE_VERSION, **state._asdict(), "entries": entries}
+    atomic_write(path, json.dumps(data))
+
+
+def is_ancestor(repository: RepositoryManager, ancestor: str, revision: str) -> bool:
+    """an unknown ancestor, gone with a rewritten history, is not one"""
+    try:
+        repository.repository.git.merge_base("--is-ancestor", ancestor, revision)
+    except GitCommandError:
+        return False
+    return True
+
+
+def read_incremental(
+    repository: RepositoryManager,
+    previous_tag: str,
+    current_tag: str,
+    state: Optional[ChangelogState],
+) -> Tuple[List[Commit], ChangelogState]:
+    """Reads the commits of the target, only the new ones if the state is still valid"""
+    git = repository.repository.git
+    head = git.rev_parse(f"{current_tag}^{{commit}}")
+    base = git.rev_parse(f"{previous_tag}^{{commit}}") if previous_tag else ""
+    target = f"{previous_tag}..{current_tag}"
+    filter_paths = list(repository.filter_paths)
+    excluded = [f"^{base}"] if base else []
+
+    if (
+        state is not None
+        and (state.target, state.base, state.filter_paths)
+        == (target, base, filter_paths)
+        and is_ancestor(repository, state.watermark, head)
+    ):
+        revisions = [head, f"^{state.watermark}", *excluded]
+        commits = [
+            *repository.commit_reader.iter_commits(revisions, filter_paths),
+            *state.entries,
+        ]
+    else:
+        if state is not None and state.target == target:
+            logging.warning("The history of %s was rewritten, rebuilding it", target)
+        commits = list(
+            repository.commit_reader.iter_commits([head, *excluded], filter_paths)
+        )
+    return commits, ChangelogState(target, base, head, filter_paths, commits)
+
+
+def patch_changelog(text: str, target: str, section: str) -> str:
+    """Replaces the section of the target in the changelog, or prepends it"""
+    start = SECTION_START.format(target=target)
+    end = SECTION_END.format(target=target)
+    block = f"{start}\n{section.strip()}\n{end}\n"
+    start_index = text.find(start)
+    end_index = text.find(end, start_index)
+    if start_index < 0 or end_index < 0:
+        return f"{block}\n{text}" if text else block
+    rest = text[end_index + len(end) :]
+    return text[:start_index] + block + (rest[1:] if rest.startswith("\n") else rest)
+
+
+def update_state(
+    repository: RepositoryManager, state_path: str, previous_tag: str, current_tag: str
+) -> List[Commit]:
+    """Reads the commits of the target from the state file, and saves the new state"""
+    commits, state = read_incremental(
+        repository, previous_tag, current_tag, load_state(state_path)
+    )
+    save_state(state_path, state)
+    return commits
+
+
+def generate_incremental(  # pylint: disable=too-many-arguments
+    repository_path: str,
+    state_path: str,
+    target: Optional[str] = None,
+    prefix: Optional[str] = None,
+    filter_paths: Optional[Sequence[str]] = None,
+    commit_cache: Optional[str] = None,
+    template: Optional[str] = None,
+    ai_timeout: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+    commit_backend: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    Generates the changelog as `generate` does, from the state of the previous run,
+    and returns its target and the changelog.
+    """
+    repository = RepositoryManager(
+        uri=repository_path,
+        prefix=prefix,
+        filter_paths=filter_paths,
+        commit_cache=commit_cache,
+        commit_backend=commit_backend,
+    )
+    return render_incremental(
+        repository,
+        state_path,
+        target,
+        ai_timeout,
+        template=template,
+        max_bytes=max_bytes,
+    )
+
+
+def render_incremental(
+    repository: RepositoryManager,
+    state_path: str,
+    target: Optional[str],
+    ai_timeout: Optional[float],
+    **options: Any,
+) -> Tuple[str, str]:
+    """generate_incremental, with a repository manager already opened"""
+    previous_tag, current_tag, diff = resolve_target(repository, target)
+    ai_summary = run_in_background(generate_ai_summary, repository.prefix, diff)
+    commits = update_state(repository, state_path, previous_tag, current_tag)
+
+    return f"{previous_tag}..{current_tag}", render_changelog(
+        organization=repository.organization,
+        repository=repository.name,
+        previous_tag=previous_tag,
+        current_tag=current_tag,
+        commit_trees=get_commit_trees(commits),
+        ai_summary=wait_ai_summary(ai_summary, ai_timeout),
+        **options,
+    )
+
+
+def write_changelog_file(path: str, target: str, changelog: str) -> None:
+    text = ""
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as stream:
+            text = stream.read()
+    atomic_write(path, patch_changelog(text, target, changelog))
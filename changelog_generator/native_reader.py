@@ -0,0 +1,573 @@
+"""
+Reads the commits straight from the object database, without running git
+
+The pack files and their indexes are memory mapped, the loose objects are inflated on
+demand, and the ancestry comes from the commit-graph file when there is one: only the
+commits to list are inflated, for their message. The walk mimics the default order of
+`git log`, by commit date, the commits of a revision being popped from a priority queue
+and the excluded ones marking their ancestors uninteresting.
+
+Anything else, like path filters, revisions other than names and `a..b` ranges, shallow
+clones, grafts, replace refs, alternates, split commit-graphs or non UTF-8 messages, is
+not supported: the reader then falls back to `git log`.
+"""
+
+import heapq
+import mmap
+import os
+import re
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from git import Repo
+
+from .commit import Commit
+from .commit_reader import BaseCommitReader, GitLogCommitReader
+
+OBJECT_TYPES = {1: b"commit", 2: b"tree", 3: b"blob", 4: b"tag"}
+OFS_DELTA = 6
+REF_DELTA = 7
+INFLATE_SIZE = 1 << 12
+GRAPH_NO_PARENT = 0x70000000
+GRAPH_EXTRA_EDGES = 0x80000000
+GRAPH_LAST_EDGE = 0x80000000
+HEXSHA_RE = re.compile(r"^[0-9a-f]{40}$")
+REF_RULES = (
+    "{}",
+    "refs/{}",
+    "refs/tags/{}",
+    "refs/heads/{}",
+    "refs/remotes/{}",
+    "refs/remotes/{}/HEAD",
+)
+
+
+class NativeReaderError(Exception):
+    """The repository or the revision is not supported by the native reader"""
+
+
+def open_mmap(path: str) -> mmap.mmap:
+    with open(path, "rb") as stream:
+        return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def inflate(data: memoryview, position: int, size: int) -> bytes:
+    """Inflates the zlib stream at the position, reading only as much as it takes"""
+    decompressor = zlib.decompressobj()
+    parts = []
+    step = size + INFLATE_SIZE
+    while not decompressor.eof:
+        block = data[position : position + step]
+        if not block:
+            raise NativeReaderError("truncated zlib stream")
+        parts.append(decompressor.decompress(block))
+        position += step
+    return b"".join(parts)
+
+
+def read_varint(data: memoryview, position: int) -> Tuple[int, int]:
+    """Reads a little endian base 128 size, as in the delta headers"""
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def read_copy(data: memoryview, command: int, position: int) -> Tuple[int, int, int]:
+    """
+    Reads the offset and the size of a delta copy command, of which only the bytes
+    flagged by the command follow it, and returns them with the next position
+    """
+    offset = size = 0
+    for bit in range(4):
+        if command & (1 << bit):
+            offset |= data[position] << (8 * bit)
+            position += 1
+    for bit in range(3):
+        if command & (0x10 << bit):
+            size |= data[position] << (8 * bit)
+            position += 1
+    return offset, size or 0x10000, position
+
+
+def apply_command(
+    base: bytes, delta: memoryview, position: int, target: bytearray
+) -> int:
+    """
+    Appends the bytes of the delta command at the position to the target, copied from
+    the base or inserted from the delta, and returns the position of the next command
+    """
+    command = delta[position]
+    position += 1
+    if command & 0x80:
+        offset, size, position = read_copy(delta, command, position)
+        target += base[offset : offset + size]
+        return position
+    if not command:
+        raise NativeReaderError("invalid delta command")
+    target += delta[position : position + command]
+    return position + command
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    view = memoryview(delta)
+    source_size, position = read_varint(view, 0)
+    target_size, position = read_varint(view, position)
+    if source_size != len(base):
+        raise NativeReaderError("delta base size mismatch")
+    target = bytearray()
+    while position < len(view):
+        position = apply_command(base, view, position, target)
+    if len(target) != target_size:
+        raise NativeReaderError("delta target size mismatch")
+    return bytes(target)
+
+
+def search_sha(table: memoryview, start: int, end: int, sha: bytes) -> int:
+    """Finds the position of a sha in a sorted table of 20 byte shas, or -1"""
+    while start < end:
+        middle = (start + end) // 2
+        found = table[middle * 20 : middle * 20 + 20].tobytes()
+        if found == sha:
+            return middle
+        if found < sha:
+            start = middle + 1
+        else:
+            end = middle
+    return -1
+
+
+class PackIndex:
+    """A version 2 pack index: the fanout, the sorted shas and their offsets"""
+
+    def __init__(self, path: str) -> None:
+        self.data = memoryview(open_mmap(path))
+        if self.data[:8].tobytes() != b"\xfftOc\x00\x00\x00\x02":
+            raise NativeReaderError(f"unsupported pack index {path}")
+        self.fanout = struct.unpack_from(">256I", self.data, 8)
+        self.count = self.fanout[255]
+        self.shas = self.data[8 + 1024 : 8 + 1024 + 20 * self.count]
+        self.offsets = 8 + 1024 + 24 * self.count
+        self.large_offsets = self.offsets + 4 * self.count
+
+    def offset(self, sha: bytes) -> Optional[int]:
+        start = self.fanout[sha[0] - 1] if sha[0] else 0
+        position = search_sha(self.shas, start, self.fanout[sha[0]], sha)
+        if position < 0:
+            return None
+        (offset,) = struct.unpack_from(">I", self.data, self.offsets + 4 * position)
+        if offset & 0x80000000:
+            (offset,) = struct.unpack_from(
+                ">Q", self.data, self.large_offsets + 8 * (offset & 0x7FFFFFFF)
+            )
+        return offset
+
+
+def read_object_header(data: memoryview, offset: int) -> Tuple[int, int, int]:
+    """Reads the type and the size of the pack object at the offset, and its position"""
+    byte = data[offset]
+    object_type = (byte >> 4) & 7
+    size = byte & 0x0F
+    shift = 4
+    position = offset + 1
+    while byte & 0x80:
+        byte = data[position]
+        position += 1
+        size |= (byte & 0x7F) << shift
+        shift += 7
+    return object_type, size, position
+
+
+def read_base_distance(data: memoryview, position: int) -> Tuple[int, int]:
+    """Reads how far back the base of an offset delta is, and the next position"""
+    byte = data[position]
+    position += 1
+    distance = byte & 0x7F
+    while byte & 0x80:
+        byte = data[position]
+        position += 1
+        distance = ((distance + 1) << 7) | (byte & 0x7F)
+    return distance, position
+
+
+class Pack:
+    def __init__(self, path: str) -> None:
+        self.index = PackIndex(path[: -len(".pack")] + ".idx")
+        self.data = memoryview(open_mmap(path))
+
+    def read(self, offset: int, store: "ObjectStore") -> Tuple[bytes, bytes]:
+        """returns the type and the content of the object at the offset"""
+        object_type, size, position = read_object_header(self.data, offset)
+        if object_type in OBJECT_TYPES:
+            return OBJECT_TYPES[object_type], inflate(self.data, position, size)
+        if object_type == OFS_DELTA:
+            distance, position = read_base_distance(self.data, position)
+            base_type, base = self.read(offset - distance, store)
+        elif object_type == REF_DELTA:
+            base_type, base = store.read(self.data[position : position + 20].tobytes())
+            position += 20
+        else:
+            raise NativeReaderError(f"unsupported pack object type {object_type}")
+        return base_type, apply_delta(base, inflate(self.data, position, size))
+
+
+class CommitGraph:
+    """The parents and the commit time of the commits, out of a single graph file"""
+
+    def __init__(self, path: str) -> None:
+        self.data = memoryview(open_mmap(path))
+        signature, version, hash_version, chunk_count = struct.unpack_from(
+            ">4sBBB", self.data
+        )
+        if (signature, version, hash_version) != (b"CGPH", 1, 1):
+            raise NativeReaderError(f"unsupported commit-graph {path}")
+        chunks = {}
+        for position in range(chunk_count):
+            chunk_id, offset = struct.unpack_from(">4sQ", self.data, 8 + 12 * position)
+            chunks[chunk_id] = offset
+        self.fanout = struct.unpack_from(">256I", self.data, chunks[b"OIDF"])
+        self.count = self.fanout[255]
+        self.shas = self.data[chunks[b"OIDL"] : chunks[b"OIDL"] + 20 * self.count]
+        self.commit_data = chunks[b"CDAT"]
+        self.edges = chunks.get(b"EDGE")
+
+    def position(self, sha: bytes) -> int:
+        start = self.fanout[sha[0] - 1] if sha[0] else 0
+        return search_sha(self.shas, start, self.fanout[sha[0]], sha)
+
+    def sha(self, position: int) -> bytes:
+        return self.shas[position * 20 : position * 20 + 20].tobytes()
+
+    def parents_and_time(self, position: int) -> Tuple[List[bytes], int]:
+        first, second, high, low = struct.unpack_from(
+            ">IIII", self.data, self.commit_data + 36 * position + 20
+        )
+        parents = []
+        if first != GRAPH_NO_PARENT:
+            parents.append(self.sha(first))
+        if second & GRAPH_EXTRA_EDGES:
+            parents.extend(self.extra_parents(second & ~GRAPH_EXTRA_EDGES))
+        elif second != GRAPH_NO_PARENT:
+            parents.append(self.sha(second))
+        return parents, ((high & 3) << 32) | low
+
+    def extra_parents(self, index: int) -> Iterator[bytes]:
+        """the parents of an octopus merge after the first one, from the edge list"""
+        if self.edges is None:
+            raise NativeReaderError("commit-graph without extra edges")
+        edge = self.edges + 4 * index
+        while True:
+            (value,) = struct.unpack_from(">I", self.data, edge)
+            yield self.sha(value & ~GRAPH_LAST_EDGE)
+            if value & GRAPH_LAST_EDGE:
+                return
+            edge += 4
+
+
+class ParsedCommit:
+    __slots__ = ("parents", "time", "raw", "message_start")
+
+    def __init__(self, raw: bytes) -> None:
+        self.raw = raw
+        header_end = raw.find(b"\n\n")
+        self.message_start = len(raw) if header_end < 0 else header_end + 2
+        self.parents: List[bytes] = []
+        self.time = 0
+        for line in raw[: max(header_end, 0)].split(b"\n"):
+            if line.startswith(b"parent "):
+                self.parents.append(bytes.fromhex(line[7:47].decode("ascii")))
+            elif line.startswith(b"committer "):
+                self.time = int(line.rsplit(b" ", 2)[-2])
+            elif line.startswith(b"encoding ") and line[9:].lower() not in (
+                b"utf-8",
+                b"utf8",
+            ):
+                raise NativeReaderError("non UTF-8 commit message")
+
+    @property
+    def message(self) -> str:
+        return str(memoryview(self.raw)[self.message_start :], "utf-8", "replace")
+
+
+class ObjectStore:
+    def __init__(self, git_dir: str, common_dir: str) -> None:
+        self.git_dir = git_dir
+        self.common_dir = common_dir
+        self.objects = os.path.join(common_dir, "objects")
+        for unsupported in (
+            os.path.join(common_dir, "shallow"),
+            os.path.join(common_dir, "info", "grafts"),
+            os.path.join(self.objects, "info", "alternates"),
+            os.path.join(common_dir, "refs", "replace"),
+            os.path.join(common_dir, "reftable"),
+        ):
+            if os.path.exists(unsupported):
+                raise NativeReaderError(f"unsupported {unsupported}")
+        self.packs: List[Pack] = []
+        self.pack_paths: set = set()
+        self.load_packs()
+        graph_path = os.path.join(self.objects, "info", "commit-graph")
+        self.graph = CommitGraph(graph_path) if os.path.exists(graph_path) else None
+        self.packed_refs: Optional[Dict[str, Tuple[str, Optional[str]]]] = None
+
+    def load_packs(self) -> bool:
+        """opens the packs added since the last call, tells if there are any"""
+        directory = os.path.join(self.objects, "pack")
+        paths = {
+            os.path.join(directory, name)
+            for name in (os.listdir(directory) if os.path.isdir(directory) else ())
+            if name.endswith(".pack")
+        } - self.pack_paths
+        for path in sorted(paths):
+            self.packs.append(Pack(path))
+        self.pack_paths |= paths
+        return bool(paths)
+
+    def _read(self, sha: bytes) -> Optional[Tuple[bytes, bytes]]:
+        for pack in self.packs:
+            offset = pack.index.offset(sha)
+            if offset is not None:
+                return pack.read(offset, self)
+        hexsha = sha.hex()
+        try:
+            with open(os.path.join(self.objects, hexsha[:2], hexsha[2:]), "rb") as file:
+                raw = zlib.decompress(file.read())
+        except FileNotFoundError:
+            return None
+        header, _, content = raw.partition(b"\0")
+        return header.split(b" ", 1)[0], content
+
+    def read(self, sha: bytes) -> Tuple[bytes, bytes]:
+        found = self._read(sha)
+        if found is None and self.load_packs():
+            found = self._read(sha)
+        if found is None:
+            raise NativeReaderError(f"missing object {sha.hex()}")
+        return found
+
+    def read_commit(self, sha: bytes) -> ParsedCommit:
+        object_type, content = self.read(sha)
+        if object_type != b"commit":
+            raise NativeReaderError(f"{sha.hex()} is a {object_type.decode()}")
+        return ParsedCommit(content)
+
+    def peel(self, sha: bytes) -> bytes:
+        """follows the annotated tags down to a commit"""
+        object_type, content = self.read(sha)
+        while object_type == b"tag":
+            sha = bytes.fromhex(content[7:47].decode("ascii"))
+            object_type, content = self.read(sha)
+        if object_type != b"commit":
+            raise NativeReaderError(f"{sha.hex()} is not a commit")
+        return sha
+
+    def _read_packed_refs(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        if self.packed_refs is None:
+            self.packed_refs = {}
+            last = None
+            try:
+                path = os.path.join(self.common_dir, "packed-refs")
+                with open(path, encoding="utf-8") as stream:
+                    for line in stream:
+                        line = line.rstrip("\n")
+                        if line.startswith("^") and last is not None:
+                            self.packed_refs[last] = (
+                                self.packed_refs[last][0],
+                                line[1:],
+                            )
+                        elif line and not line.startswith("#"):
+                            sha, last = line.split(" ", 1)
+                            self.packed_refs[last] = (sha, None)
+            except FileNotFoundError:
+                pass
+        return self.packed_refs
+
+    def read_ref(self, name: str, depth: int = 0) -> Optional[str]:
+        if depth > 5:
+            raise NativeReaderError(f"too deep symbolic ref {name}")
+        directory = self.common_dir if name.startswith("refs/") else self.git_dir
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as stream:
+                value = stream.read().strip()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            packed = self._read_packed_refs().get(name)
+            return packed and (packed[1] or packed[0])
+        if value.startswith("ref: "):
+            return self.read_ref(value[5:], depth + 1)
+        return value
+
+    def resolve(self, name: str) -> bytes:
+        """resolves a full sha, or a ref name as git does, to a commit"""
+        if name.endswith("^{commit}"):
+            name = name[: -len("^{commit}")]
+        if HEXSHA_RE.match(name):
+            return self.peel(bytes.fromhex(name))
+        if not name or re.search(r"[~^:@{}\s\\]|\.\.", name):
+            raise NativeReaderError(f"unsupported revision {name}")
+        for rule in REF_RULES:
+            value = self.read_ref(rule.format(name))
+            if value:
+                return self.peel(bytes.fromhex(value))
+        raise NativeReaderError(f"unknown revision {name}")
+
+    def parents_and_time(self, sha: bytes) -> Tuple[List[bytes], int]:
+        if self.graph is not None:
+            position = self.graph.position(sha)
+            if position >= 0:
+                return self.graph.parents_and_time(position)
+        commit = self.read_commit(sha)
+        return commit.parents, commit.time
+
+
+def split_revisions(
+    revision: Union[str, Sequence[str]],
+) -> Tuple[List[str], List[str]]:
+    """splits the revisions in the included and the excluded ones"""
+    included: List[str] = []
+    excluded: List[str] = []
+    for name in [revision] if isinstance(revision, str) else revision:
+        if "..." in name:
+            raise NativeReaderError(f"unsupported revision {name}")
+        if ".." in name:
+            start, end = name.split("..", 1)
+            excluded.append(start or "HEAD")
+            included.append(end or "HEAD")
+        elif name.startswith("^"):
+            excluded.append(name[1:])
+        else:
+            included.append(name)
+    return included, excluded
+
+
+class WalkQueue:
+    """
+    The commits to walk, newest commit date first, the first queued one first on a
+    tie, and whether each commit seen is uninteresting: reachable from an excluded one.
+    """
+
+    def __init__(self, store: ObjectStore) -> None:
+        self.store = store
+        self.queue: List[Tuple[int, int, bytes]] = []
+        self.queued: Set[bytes] = set()
+        self.uninteresting: Dict[bytes, bool] = {}
+        self.parents_of: Dict[bytes, List[bytes]] = {}
+        self.interesting_queued = 0
+
+    def mark_uninteresting(self, sha: bytes) -> None:
+        pending = [sha]
+        while pending:
+            current = pending.pop()
+            if self.uninteresting.get(current, True):
+                continue
+            self.uninteresting[current] = True
+            if current in self.queued:
+                self.interesting_queued -= 1
+            pending.extend(self.parents_of[current])
+
+    def push(self, sha: bytes, flag: bool) -> None:
+        """queues a commit seen for the first time, or marks an uninteresting one"""
+        if sha in self.uninteresting:
+            if flag:
+                self.mark_uninteresting(sha)
+            return
+        self.uninteresting[sha] = flag
+        parents, time = self.store.parents_and_time(sha)
+        self.parents_of[sha] = parents
+        heapq.heappush(self.queue, (-time, len(self.uninteresting), sha))
+        self.queued.add(sha)
+        self.interesting_queued += not flag
+
+    def pop(self) -> Tuple[bytes, bool]:
+        """pops the next commit, and tells if it is uninteresting"""
+        _, _, sha = heapq.heappop(self.queue)
+        self.queued.discard(sha)
+        flag = self.uninteresting[sha]
+        self.interesting_queued -= not flag
+        return sha, flag
+
+
+def walk(
+    store: ObjectStore, included: Sequence[bytes], excluded: Sequence[bytes]
+) -> List[bytes]:
+    """
+    Lists the non merge commits reachable from the included commits and not from the
+    excluded ones, in the `git log` order. The walk stops once only uninteresting
+    commits are queued.
+    """
+    queue = WalkQueue(store)
+    for sha in excluded:
+        queue.push(sha, True)
+    for sha in included:
+        queue.push(sha, False)
+
+    popped: List[bytes] = []
+    while queue.interesting_queued:
+        sha, flag = queue.pop()
+        if not flag:
+            popped.append(sha)
+        for parent in queue.parents_of[sha]:
+            queue.push(parent, flag)
+
+    return [
+        sha
+        for sha in popped
+        if not queue.uninteresting[sha] and len(queue.parents_of[sha]) <= 1
+    ]
+
+
+class NativeCommitReader(BaseCommitReader):
+    """
+    Lists the commits out of the object database of the repository, and falls back to
+    `git log` for whatever it does not support. The output is the same as with
+    GitLogCommitReader.
+    """
+
+    def __init__(self, repository: Repo) -> None:
+        super().__init__(repository)
+        self.fallback = GitLogCommitReader(repository)
+        self._store: Optional[ObjectStore] = None
+        self.supported = True
+
+    @property
+    def store(self) -> ObjectStore:
+        if self._store is None:
+            # an unsupported repository is not checked again on the next calls
+            self.supported = False
+            self._store = ObjectStore(
+                str(self.repository.git_dir), str(self.repository.common_dir)
+            )
+            self.supported = True
+        return self._store
+
+    def read_commits(self, revision: Union[str, Sequence[str]]) -> List[Commit]:
+        store = self.store
+        included, excluded = split_revisions(revision)
+        shas = walk(
+            store,
+            [store.resolve(name) for name in included],
+            [store.resolve(name) for name in excluded],
+        )
+        commits = []
+        for sha in shas:
+            message = store.read_commit(sha).message
+            commits.append(
+                Commit(
+                    hexsha=sha.hex(), summary=message.split("\n", 1)[0], message=message
+                )
+            )
+        return commits
+
+    def iter_commits(
+        self, revision: Union[str, Sequence[str]], paths: Sequence[str] = ()
+    ) -> Iterator[Commit]:
+        if paths or not self.supported:
+            return self.fallback.iter_commits(revision, paths)
+        try:
+            return iter(self.read_commits(revision))
+        except (NativeReaderError, OSError, ValueError, zlib.error, struct.error):
+            return self.fallback.iter_commits(revision, paths)
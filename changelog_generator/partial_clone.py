@@ -0,0 +1,182 @@
+"""
+Works in shallow and partial clones, like the ones of `actions/checkout`
+
+A shallow clone lacks the history, and the tags, beyond its depth: it is deepened step
+by step until the range of the changelog is complete, down to the previous release tag,
+and only the tags the changelog needs are fetched. A partial clone, like a blob-less
+one, lacks the content of the files: the blobs of a diff are fetched in a single batch
+when the diff is read, instead of one by one by git.
+"""
+
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from git import GitCommandError, Repo
+
+from .commit_cache import batched
+from .tag_manager import BaseTagManager
+
+REMOTE = "origin"
+DEEPEN_STEP = 64
+NULL_SHA = "0" * 40
+
+
+def get_config(repository: Repo, *arguments: str) -> List[str]:
+    try:
+        return repository.git.config(*arguments).splitlines()
+    except GitCommandError:
+        return []  # git config fails when nothing matches
+
+
+def is_shallow(repository: Repo) -> bool:
+    return repository.git.rev_parse("--is-shallow-repository") == "true"
+
+
+def is_partial(repository: Repo) -> bool:
+    return bool(
+        get_config(repository, "--get", "extensions.partialclone")
+        or get_config(repository, "--get-regexp", r"^remote\..*\.promisor$")
+    )
+
+
+def get_shallow_commits(repository: Repo) -> Set[str]:
+    """the boundary of a shallow clone, the commits without their parents"""
+    try:
+        path = os.path.join(repository.common_dir, "shallow")
+        with open(path, encoding="ascii") as stream:
+            return set(stream.read().split())
+    except FileNotFoundError:
+        return set()
+
+
+def list_local_tags(repository: Repo) -> Set[str]:
+    return set(
+        repository.git.for_each_ref("--format=%(refname:strip=2)", "refs/tags").split()
+    )
+
+
+def list_remote_tags(repository: Repo, remote: str = REMOTE) -> Dict[str, str]:
+    """the tags of the remote, and the commits they point to"""
+    tags: Dict[str, str] = {}
+    for line in repository.git.ls_remote("--tags", remote).splitlines():
+        sha, ref = line.split("\t", 1)
+        name = ref[len("refs/tags/") :]
+        if name.endswith("^{}"):
+            tags[name[:-3]] = sha  # the commit an annotated tag points to
+        else:
+            tags.setdefault(name, sha)
+    return tags
+
+
+def is_complete(repository: Repo, revisions: Sequence[str]) -> bool:
+    """tells if no commit of the revisions is cut from its parents by the clone"""
+    boundary = get_shallow_commits(repository)
+    return not boundary or not boundary.intersection(
+        repository.git.rev_list(*revisions).split()
+    )
+
+
+def deepen(repository: Repo, depth: int, remote: str = REMOTE) -> None:
+    logging.info("Deepening the shallow clone by %d commits", depth)
+    repository.git.fetch("--deepen", str(depth), "--no-tags", remote)
+
+
+def fetch_tags(repository: Repo, tags: Iterable[str], remote: str = REMOTE) -> None:
+    """fetches the tags missing from the clone"""
+    local_tags = list_local_tags(repository)
+    refspecs = [
+        f"+refs/tags/{tag}:refs/tags/{tag}" for tag in tags if tag not in local_tags
+    ]
+    if refspecs:
+        repository.git.fetch("--no-tags", remote, *refspecs)
+
+
+def fetch_release_tags(
+    repository: Repo,
+    tag_manager: BaseTagManager,
+    merged: str,
+    limit: Optional[int] = 2,
+    step: int = DEEPEN_STEP,
+) -> None:
+    """
+    Deepens a shallow clone until the `limit` newest release tags of the remote are in
+    the history of the merged revision, the range between the two last ones included,
+    and fetches those tags. The clone is fully deepened when there are fewer tags, or
+    without a limit.
+    """
+    remote_tags = list_remote_tags(repository)
+    candidates = tag_manager.get_release_tags(tags=remote_tags)
+    found: Sequence[str] = []
+    while is_shallow(repository):
+        history = set(repository.git.rev_list(merged).split())
+        found = [tag for tag in candidates if remote_tags[tag] in history][:limit]
+        if len(found) == limit and is_complete(
+            repository, [remote_tags[found[0]], f"^{remote_tags[found[-1]]}"]
+        ):
+            break
+        deepen(repository, step)
+        step *= 2
+    else:
+        history = set(repository.git.rev_list(merged).split())
+        found = [tag for tag in candidates if remote_tags[tag] in history]
+    fetch_tags(repository, found)
+
+
+def fetch_target(
+    repository: Repo, previous: str, current: str, step: int = DEEPEN_STEP
+) -> None:
+    """Fetches the tags of a `previous..current` target, and deepens its range"""
+    remote_tags = list_remote_tags(repository)
+    local_tags = list_local_tags(repository)
+    missing = [
+        tag
+        for tag in (previous, current)
+        if tag in remote_tags and tag not in local_tags
+    ]
+    if missing:
+        repository.git.fetch(
+            "--no-tags",
+            f"--depth={step}",
+            REMOTE,
+            *(f"+refs/tags/{tag}:refs/tags/{tag}" for tag in missing),
+        )
+    revisions = [current, f"^{previous}"] if previous else [current]
+    while is_shallow(repository) and not is_complete(repository, revisions):
+        deepen(repository, step)
+        step *= 2
+
+
+def prefetch_blobs(
+    repository: Repo, revision: str, paths: Sequence[str], remote: str = REMOTE
+) -> None:
+    """
+    Fetches the missing blobs of the diff of a revision in batches, where git would
+    fetch them one at a time while diffing.
+    """
+    needed = set()
+    for line in repository.git.diff(
+        "--raw", "--no-abbrev", "--no-renames", revision, "--", *paths
+    ).splitlines():
+        old, new = line.split(" ", 4)[2:4]
+        needed.update(sha for sha in (old, new) if sha != NULL_SHA)
+    if not needed:
+        return
+    ends = [end or "HEAD" for end in revision.split("..", 1)]
+    missing = [
+        line[1:]
+        for line in repository.git.rev_list(
+            "--objects", "--no-walk", "--missing=print", *ends
+        ).splitlines()
+        if line.startswith("?") and line[1:] in needed
+    ]
+    for batch in batched(missing):
+        logging.info("Fetching %d blobs of the diff", len(batch))
+        repository.git(c="fetch.negotiationAlgorithm=noop").fetch(
+            "--no-tags",
+            "--no-write-fetch-head",
+            "--recurse-submodules=no",
+            "--filter=blob:none",
+            remote,
+            *batch,
+        )
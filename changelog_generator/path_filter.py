@@ -0,0 +1,156 @@
+"""
+Matches paths against git pathspecs, in process
+
+The pathspecs follow the default git semantics, as in `git log -- pathspec`:
+    - a literal pathspec matches a path and everything under it: `core/cms` matches
+      `core/cms` and `core/cms/a.py` but not `core/cmsx`, `core/cms/` only matches
+      under the directory
+    - a pathspec with one of `*?[` is a glob matching the whole path, and its `*` and
+      `?` also match `/`: `tests/*/qa/*` matches `tests/a/b/qa/c/d.py`
+
+Only the paths are matched: the history simplification of `git log -- pathspec`, which
+leaves out the commits of a branch merged without changing the matched paths, is up to
+the walk of the commits, see `services.read_releases`.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Sequence, Set
+
+GLOB_CHARACTERS = frozenset("*?[")
+
+
+def translate_glob(pathspec: str) -> str:
+    """Translates a git glob pathspec to a regular expression, `*` matching `/`"""
+    parts = []
+    index = 0
+    while index < len(pathspec):
+        character = pathspec[index]
+        index += 1
+        if character == "*":
+            parts.append(".*")
+        elif character == "?":
+            parts.append(".")
+        elif character == "\\" and index < len(pathspec):
+            parts.append(re.escape(pathspec[index]))
+            index += 1
+        elif character == "[":
+            end = index + 1 if pathspec[index : index + 1] in ("!", "^") else index
+            end = pathspec.find("]", end + 1)
+            if end < 0:
+                parts.append(re.escape(character))
+                continue
+            content = pathspec[index:end]
+            if content[0] in "!^":
+                content = "^" + content[1:]
+            content = content.replace("\\", "\\\\").replace("[", "\\[")
+            parts.append(f"[{content}]")
+            index = end + 1
+        else:
+            parts.append(re.escape(character))
+    return "".join(parts)
+
+
+class TrieNode:
+    __slots__ = ("children", "labels", "directory_labels")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "TrieNode"] = {}
+        # the groups matching the path of the node and everything under it
+        self.labels: Set[int] = set()
+        # the groups only matching what is under the path of the node
+        self.directory_labels: Set[int] = set()
+
+
+class PathFilter:
+    """
+    Classifies paths in groups of pathspecs, like the path filters of several services.
+
+    The literal pathspecs of all the groups are compiled in a single trie of path
+    components, walked once per path. The globs are compiled in a single regular
+    expression which tells if any of them matches, and in one regular expression per
+    group to tell which ones. The groups of each path are memoized, as the same paths
+    are changed again and again through a history.
+    """
+
+    def __init__(self, *groups: Sequence[str]) -> None:
+        self.groups = [tuple(pathspecs) for pathspecs in groups]
+        self.root = TrieNode()
+        globs: Dict[int, List[str]] = {}
+        for group, pathspecs in enumerate(self.groups):
+            if not pathspecs:
+                self.root.labels.add(group)
+            for pathspec in pathspecs:
+                if GLOB_CHARACTERS.intersection(pathspec):
+                    globs.setdefault(group, []).append(translate_glob(pathspec))
+                else:
+                    self._insert(pathspec, group)
+
+        self.any_glob: Optional[Pattern[str]] = None
+        self.group_globs: Dict[int, Pattern[str]] = {}
+        if globs:
+            self.any_glob = re.compile(
+                "|".join(
+                    f"(?:{regex})" for regexes in globs.values() for regex in regexes
+                ),
+                re.DOTALL,
+            )
+            self.group_globs = {
+                group: re.compile(
+                    "|".join(f"(?:{regex})" for regex in regexes), re.DOTALL
+                )
+                for group, regexes in globs.items()
+            }
+        self.cache: Dict[str, FrozenSet[int]] = {}
+
+    def _insert(self, pathspec: str, group: int) -> None:
+        node = self.root
+        components = [part for part in pathspec.split("/") if part and part != "."]
+        for component in components:
+            node = node.children.setdefault(component, TrieNode())
+        if pathspec.endswith("/") and components:
+            node.directory_labels.add(group)
+        else:
+            node.labels.add(group)
+
+    def groups_of(self, path: str) -> FrozenSet[int]:
+        """Lists the groups with a pathspec matching the path"""
+        groups = self.cache.get(path)
+        if groups is not None:
+            return groups
+
+        matched = set(self.root.labels)
+        node = self.root
+        components = path.split("/")
+        for position, component in enumerate(components):
+            child = node.children.get(component)
+            if child is None:
+                break
+            node = child
+            matched.update(node.labels)
+            if position < len(components) - 1:
+                matched.update(node.directory_labels)
+
+        if self.any_glob is not None and self.any_glob.fullmatch(path):
+            matched.update(
+                group
+                for group, regex in self.group_globs.items()
+                if group not in matched and regex.fullmatch(path)
+            )
+
+        groups = self.cache[path] = frozenset(matched)
+        return groups
+
+    def classify(self, paths: Iterable[str]) -> Set[int]:
+        """Lists the groups with a pathspec matching any of the paths"""
+        matched: Set[int] = set()
+        for path in paths:
+            matched.update(self.groups_of(path))
+            if len(matched) == len(self.groups):
+                break
+        return matched
+
+    def match(self, path: str) -> bool:
+        return bool(self.groups_of(path))
+
+    def match_any(self, paths: Iterable[str]) -> bool:
+        return any(map(self.match, paths))
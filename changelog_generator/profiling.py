@@ -0,0 +1,162 @@
+"""
+Measures where the time of a changelog generation goes
+
+When enabled, the stages record a span each, with its wall and CPU time, the git calls
+and the bytes they output are counted, as well as the AI requests and their tokens, and
+the peak memory of the process and of its git children is reported as JSON.
+
+When disabled, `span` returns a shared no-op context manager and `count` returns at
+once: the stages pay a global lookup and a function call.
+"""
+
+import json
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import IO, Any, ContextManager, Dict, Iterable, Iterator, List, Optional
+
+PROFILER: Optional["Profiler"] = None
+NO_SPAN = nullcontext()
+
+
+class CountingReader:
+    """Counts the bytes read from the output of a git process"""
+
+    def __init__(self, stream: IO[bytes], profiler: "Profiler") -> None:
+        self.stream = stream
+        self.profiler = profiler
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.profiler.count("git.bytes", len(data))
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        line = self.stream.readline(size)
+        self.profiler.count("git.bytes", len(line))
+        return line
+
+    def __iter__(self) -> Iterator[bytes]:
+        for line in self.stream:
+            self.profiler.count("git.bytes", len(line))
+            yield line
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stream, name)
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Counter = Counter()
+        self.git_execute: Any = None
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            record = {
+                "name": name,
+                "thread": threading.current_thread().name,
+                "start": round(start - self.origin, 6),
+                "wall": round(time.perf_counter() - start, 6),
+                "cpu": round(time.thread_time() - cpu_start, 6),
+            }
+            with self.lock:
+                self.spans.append(record)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def install(self) -> None:
+        """Counts the git calls, and the bytes of their outputs"""
+        from git.cmd import Git  # pylint: disable=import-outside-toplevel
+
+        profiler = self
+        execute = self.git_execute = Git.execute
+
+        def counted_execute(git: Git, command: Any, *args: Any, **kwargs: Any) -> Any:
+            profiler.count("git.calls")
+            result = execute(git, command, *args, **kwargs)
+            if kwargs.get("as_process"):
+                result.proc.stdout = CountingReader(result.proc.stdout, profiler)
+            elif isinstance(result, (str, bytes)):
+                profiler.count("git.bytes", len(result))
+            return result
+
+        Git.execute = counted_execute  # type: ignore[assignment]
+
+    def uninstall(self) -> None:
+        from git.cmd import Git  # pylint: disable=import-outside-toplevel
+
+        Git.execute = self.git_execute  # type: ignore[assignment]
+
+    def report(self) -> Dict[str, Any]:
+        # ru_maxrss is in KiB on Linux
+        return {
+            "wall": round(time.perf_counter() - self.origin, 6),
+            "spans": sorted(self.spans, key=lambda span: span["start"]),
+            "counters": dict(self.counters),
+            "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "children_peak_rss_kib": resource.getrusage(
+                resource.RUSAGE_CHILDREN
+            ).ru_maxrss,
+        }
+
+
+def enable() -> Profiler:
+    global PROFILER  # pylint: disable=global-statement
+    PROFILER = Profiler()
+    PROFILER.install()
+    return PROFILER
+
+
+def disable() -> Optional[Dict[str, Any]]:
+    """Stops profiling, and returns the report"""
+    global PROFILER  # pylint: disable=global-statement
+    profiler, PROFILER = PROFILER, None
+    if profiler is None:
+        return None
+    profiler.uninstall()
+    return profiler.report()
+
+
+def span(name: str) -> ContextManager[None]:
+    profiler = PROFILER
+    return NO_SPAN if profiler is None else profiler.span(name)
+
+
+def count(name: str, value: int = 1) -> None:
+    profiler = PROFILER
+    if profiler is not None:
+        profiler.count(name, value)
+
+
+def profile_stream(name: str, chunks: Iterable[str]) -> Iterable[str]:
+    """Records the consumption of a lazy stream, like a rendering, in a span"""
+    if PROFILER is None:
+        return chunks
+    return _profiled_stream(name, chunks)
+
+
+def _profiled_stream(name: str, chunks: Iterable[str]) -> Iterator[str]:
+    with span(name):
+        yield from chunks
+
+
+def write_report(report: Dict[str, Any], destination: str) -> None:
+    """Writes the report to a file, or to the standard error if `-` or empty"""
+    text = json.dumps(report, indent=2)
+    if destination in ("", "-"):
+        sys.stderr.write(text + "\n")
+    else:
+        with open(destination, "w", encoding="utf-8") as stream:
+            stream.write(text + "\n")
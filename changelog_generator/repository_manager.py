@@ -1,10 +1,33 @@
+import os
 import re
-from functools import lru_cache
-from typing import List, Sequence
+from functools import cached_property
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 from git import Repo
 
 from .commit import Commit
+from .commit_cache import CachedCommitReader, CommitCache, batched
+from .commit_reader import BaseCommitReader, GitLogCommitReader
+from .diff_pruning import (
+    DiffPruning,
+    FileChange,
+    describe_left_out,
+    diff_path,
+    list_changed_paths,
+    literal,
+    read_numstat,
+    select_changes,
+)
+from .native_reader import NativeCommitReader
+from .partial_clone import (
+    fetch_release_tags,
+    fetch_target,
+    is_partial,
+    is_shallow,
+    prefetch_blobs,
+)
+from .path_filter import PathFilter
 from .tag_manager import PrefixedTagManager, SimpleTagManager
 
 remote_re = re.compile(
@@ -15,16 +38,41 @@ remote_re = re.compile(
 
 class RepositoryManager:
     repository: Repo
+    commit_reader: BaseCommitReader
     organization: str = ""
     name: str = ""
 
     def __init__(
-        self, uri: str, prefix: str = None, filter_paths: Sequence[str] = None
+        self,
+        uri: str,
+        prefix: str = None,
+        filter_paths: Sequence[str] = None,
+        commit_cache: Optional[str] = None,
+        commit_backend: Optional[str] = None,
     ) -> None:
+        """
+        The commit_cache is the path of the SQLite database to store the parsed commits
+        in, an empty path stores it in the `.git` directory. There is no cache if None.
+
+        The commit_backend reads the commits with `git log` by default, or out of the
+        object database with `native`, which falls back to `git log` when it can not.
+        """
         self.filter_paths = filter_paths or []
         self.prefix = prefix
         self.repository = Repo(uri)
         self.tag_names: List[str] = []
+        self.commits_by_target: Dict[str, Sequence[Commit]] = {}
+        if commit_cache is None and commit_backend == "native":
+            self.commit_reader = NativeCommitReader(self.repository)
+        elif commit_cache is None:
+            self.commit_reader = GitLogCommitReader(self.repository)
+        else:
+            cache = (
+                CommitCache(commit_cache)
+                if commit_cache
+                else CommitCache.for_repository(self.repository)
+            )
+            self.commit_reader = CachedCommitReader(self.repository, cache)
         if self.repository.bare:
             raise ValueError(f"Repository {self.repository.git_dir} is bare")
 
@@ -38,50 +86,251 @@ class RepositoryManager:
             else SimpleTagManager(self.repository)
         )
 
-    @property
-    @lru_cache()
+    @cached_property
+    def is_shallow(self) -> bool:
+        return is_shallow(self.repository)
+
+    @cached_property
+    def is_partial(self) -> bool:
+        return is_partial(self.repository)
+
+    @cached_property
     def tags(self) -> Sequence[str]:
+        if self.is_shallow:
+            fetch_release_tags(
+                self.repository, self.tag_manager, self.tag_manager.MERGED, limit=None
+            )
         return self.tag_manager.get_release_tags()
 
-    @property
-    @lru_cache()
+    @cached_property
+    def latest_tags(self) -> Sequence[str]:
+        """
+        The two newest release tags, without sorting all the other ones. A shallow clone
+        is only deepened down to the previous one.
+        """
+        if self.is_shallow:
+            fetch_release_tags(
+                self.repository, self.tag_manager, self.tag_manager.MERGED
+            )
+        return self.tag_manager.get_release_tags(limit=2)
+
+    @cached_property
     def current_tag(self) -> str:
-        return str(self.repository.tags[self.tags[0]]) if self.tags else "HEAD"
+        return self.latest_tags[0] if self.latest_tags else "HEAD"
 
-    @property
-    @lru_cache()
+    @cached_property
     def previous_tag(self) -> str:
-        return str(self.tags[1]) if self.current_tag and len(self.tags) > 1 else ""
+        return self.latest_tags[1] if len(self.latest_tags) > 1 else ""
 
-    @property
-    @lru_cache()
-    def commits_since_last_tag(self) -> Sequence[Commit]:
+    @cached_property
+    def revision_since_last_tag(self) -> str:
         if self.previous_tag:
-            revision = f"{self.previous_tag}..{self.current_tag}"
-        else:
-            revision = self.current_tag
-        return self._get_commits(revision)
+            return f"{self.previous_tag}..{self.current_tag}"
+        return self.current_tag
+
+    @cached_property
+    def commits_since_last_tag(self) -> Sequence[Commit]:
+        return self._get_commits(self.revision_since_last_tag)
 
-    @property
-    @lru_cache()
+    @cached_property
     def get_diff_since_last_tag(self) -> str | None:
         if not self.previous_tag:
             return None
 
         if self.filter_paths:
-            return self.repository.git.diff(f"{self.previous_tag}..{self.current_tag}", '--', *self.filter_paths)
+            return self.repository.git.diff(
+                f"{self.previous_tag}..{self.current_tag}", "--", *self.filter_paths
+            )
         else:
             return self.repository.git.diff(f"{self.previous_tag}..{self.current_tag}")
 
-    def _get_commits(self, revision: str) -> Sequence[Commit]:
-        options = {"no_merges": True}
-        if self.filter_paths:
-            options["paths"] = self.filter_paths
-        commits = self.repository.iter_commits(revision, **options)
-        return tuple(
-            Commit(hexsha=commit.hexsha, summary=commit.summary, message=commit.message)
-            for commit in commits
+    def iter_diff(
+        self,
+        revision: str,
+        paths: Optional[Sequence[str]] = None,
+        prefix: Optional[str] = None,
+        pruning: Optional[DiffPruning] = None,
+    ) -> Iterator[str]:
+        """
+        Streams the diff of a revision file by file, without holding the whole diff.
+        The diff is filtered on the filter paths, or on the given paths, and pruned for
+        the AI model, the files of the service of the prefix first: see diff_pruning.
+        The missing blobs of a partial clone are only fetched for the files not
+        excluded, once the diff is read.
+        """
+        paths = self.filter_paths if paths is None else paths
+        prefix = self.prefix if prefix is None else prefix
+        pruning = pruning or DiffPruning.from_environment()
+        groups, left_out = select_changes(
+            self._list_changes(revision, paths, pruning), prefix, pruning.max_size
+        )
+        size = 0
+        for change, file_diff in self._iter_change_diffs(revision, groups):
+            if pruning.max_size and size + len(file_diff) > pruning.max_size:
+                left_out.append(change._replace(reason="over the budget"))
+            else:
+                size += len(file_diff)
+                yield file_diff
+        if left_out:
+            yield describe_left_out(left_out)
+
+    def _list_changes(
+        self, revision: str, paths: Sequence[str], pruning: DiffPruning
+    ) -> List[FileChange]:
+        """
+        The changed files of a revision, with the size of their change unless they are
+        excluded: in a partial clone, the blobs of the files kept are fetched at once.
+        """
+        excluded = PathFilter(pruning.excluded)
+        changes: List[FileChange] = []
+        kept: List[str] = []
+        for path in list_changed_paths(self.repository, revision, paths):
+            if pruning.excluded and excluded.match(path):
+                changes.append(FileChange(path, reason="excluded"))
+            else:
+                kept.append(path)
+        if self.is_partial:
+            for path_batch in batched(kept):
+                prefetch_blobs(self.repository, revision, literal(path_batch))
+        changes.extend(read_numstat(self.repository, revision, kept))
+        return changes
+
+    def _iter_change_diffs(
+        self, revision: str, groups: Sequence[Sequence[FileChange]]
+    ) -> Iterator[Tuple[FileChange, str]]:
+        """Streams the file diffs of the groups in order, with the change of each file"""
+        for change_batch in chain.from_iterable(map(batched, groups)):
+            changes_by_path = {change.path: change for change in change_batch}
+            file_diffs = self._iter_file_diffs(revision, literal(list(changes_by_path)))
+            for path, file_diff in file_diffs:
+                yield changes_by_path.get(path, FileChange(path)), file_diff
+
+    def _iter_file_diffs(
+        self, revision: str, paths: Sequence[str]
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Streams the path and the diff of each file, the file being told by the header
+        of its diff: the renames are diffed as a deletion and an addition, as they are
+        listed, and neither a configured order, prefixes nor an external diff apply.
+        """
+        process = self.repository.git.diff(
+            "-w",
+            f"-O{os.devnull}",
+            "--src-prefix=a/",
+            "--dst-prefix=b/",
+            "--no-renames",
+            "--no-ext-diff",
+            revision,
+            "--",
+            *paths,
+            as_process=True,
         )
+        lines: List[bytes] = []
+        for line in process.stdout:
+            if line.startswith(b"diff --git ") and lines:
+                yield diff_path(lines[0]), b"".join(lines).decode("utf-8", "replace")
+                lines = []
+            lines.append(line)
+        if lines:
+            yield diff_path(lines[0]), b"".join(lines).decode("utf-8", "replace")
+        process.wait()
+
+    def iter_diff_since_last_tag(self) -> Optional[Iterator[str]]:
+        """the lazy counterpart of get_diff_since_last_tag, git only runs when read"""
+        if not self.previous_tag:
+            return None
+        return self.iter_diff(f"{self.previous_tag}..{self.current_tag}")
+
+    def _get_commits(self, revision: str) -> Sequence[Commit]:
+        return tuple(self.commit_reader.iter_commits(revision, self.filter_paths))
 
     def from_target(self, target: str) -> Sequence[Commit]:
-        return self._get_commits(target)
+        """the commits of a target, kept as long as the manager"""
+        if target not in self.commits_by_target:
+            self._complete_target(target)
+            self.commits_by_target[target] = self._get_commits(target)
+        return self.commits_by_target[target]
+
+    def iter_commits(self, target: Optional[str] = None) -> Iterator[Commit]:
+        """
+        Streams the commits of a target, or since the last tag, as they are read: unlike
+        from_target and commits_since_last_tag, they are not kept.
+        """
+        if target:
+            self._complete_target(target)
+        return self.commit_reader.iter_commits(
+            target or self.revision_since_last_tag, self.filter_paths
+        )
+
+    def _complete_target(self, target: str) -> None:
+        if self.is_shallow:
+            previous, _, current = target.rpartition("..")
+            fetch_target(self.repository, previous, current)
+
+    def get_parents(self, revisions: Sequence[str]) -> Dict[str, List[str]]:
+        """Reads the commit graph of some revisions, with the merges"""
+        graph = {}
+        for line in self.repository.git.rev_list("--parents", *revisions).splitlines():
+            sha, *parents = line.split()
+            graph[sha] = parents
+        return graph
+
+    def commits_by_interval(
+        self, tags: Sequence[str]
+    ) -> List[Optional[Sequence[Commit]]]:
+        """
+        Lists the commits of every `tags[i-1]..tags[i]` interval from a single
+        history walk. The tags are given from the oldest to the newest.
+
+        An interval is computed from the shared walk only while each tag is an ancestor
+        of the next one: otherwise `tags[i-1]..tags[i]` can not be told from the
+        commits already attributed to the older intervals, and `None` is returned for
+        it and for the following intervals.
+        """
+        if len(tags) < 2:
+            return []
+        shas = self.repository.git.rev_parse(
+            *(f"{tag}^{{commit}}" for tag in tags)
+        ).split()
+        revisions = [*tags[1:], f"^{tags[0]}"]
+        graph = self.get_parents(revisions)
+
+        interval_by_sha: Dict[str, int] = {}
+        intervals: List[List[Commit]] = []
+        for index in range(1, len(tags)):
+            boundaries = self._claim_interval(
+                graph, shas[index], index, interval_by_sha
+            )
+            if shas[index] != shas[index - 1] and shas[index - 1] not in boundaries:
+                break
+            intervals.append([])
+
+        for commit in self.commit_reader.iter_commits(revisions, self.filter_paths):
+            index = interval_by_sha.get(commit.sha1, len(tags))
+            if index <= len(intervals):
+                intervals[index - 1].append(commit)
+
+        return [*intervals, *[None] * (len(tags) - 1 - len(intervals))]
+
+    @staticmethod
+    def _claim_interval(
+        graph: Dict[str, List[str]],
+        head: str,
+        index: int,
+        interval_by_sha: Dict[str, int],
+    ) -> Set[str]:
+        """
+        Attributes to the interval all the commits reachable from its head which are not
+        attributed yet, and returns the attributed or excluded commits it stopped on.
+        """
+        boundaries = set()
+        pending = [head]
+        while pending:
+            sha = pending.pop()
+            if sha in interval_by_sha or sha not in graph:
+                if interval_by_sha.get(sha) != index:
+                    boundaries.add(sha)
+                continue
+            interval_by_sha[sha] = index
+            pending.extend(graph[sha])
+        return boundaries
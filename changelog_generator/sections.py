@@ -0,0 +1,145 @@
+"""
+Groups the commits of a range in the sections of the changelog, without the commits
+cancelled by a revert of the range
+"""
+
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .commit import Commit, get_reverted_sha1, unquote_summary
+from .commit_batch import CommitRow, ParsedCommits
+
+
+class CommitTree(NamedTuple):
+    commit_type: str
+    commits: Sequence[Union[Commit, CommitRow]]
+    # the commits left out of the changelog to fit its byte budget
+    more: int = 0
+
+
+# the sections of the changelog, in their order
+SECTION_TITLES = {
+    "docs": ":notebook_with_decorative_cover: Documentation",
+    "feat": ":rocket: Features",
+    "fix": ":bug: Fixes",
+    "revert": ":scream: Revert",
+    "others": ":nut_and_bolt: Others",
+}
+SECTION_TYPES = {"docs", "feat", "fix", "revert"}
+
+
+def get_section(commit_type: str) -> str:
+    """the section of a commit type, `others` for the types without their own"""
+    return commit_type if commit_type in SECTION_TYPES else "others"
+
+
+def get_cancelled_reverts(
+    commits: Union[Sequence[Commit], ParsedCommits],
+) -> Set[int]:
+    """
+    Lists the indices of the commits cancelled by a revert of the range, in one pass
+    from the oldest commit.
+
+    A revert is paired with the commit its message names, or else with the last older
+    commit of the summary it reverts. A commit and the reverts of its reverts form a
+    chain: the commit is kept if the chain has an odd length, and the reverts of the
+    chain are dropped.
+    """
+    if isinstance(commits, ParsedCommits):
+        if not commits.revert_summaries:
+            return set()
+        revert_summaries = commits.revert_summaries
+    else:
+        revert_summaries = {
+            index: commit.revert_summary
+            for index, commit in enumerate(commits)
+            if commit.revert_summary is not None
+        }
+        if not revert_summaries:
+            return set()
+
+    return cancel_chains(pair_reverts(commits, revert_summaries))
+
+
+def pair_reverts(
+    commits: Union[Sequence[Commit], ParsedCommits], revert_summaries: Dict[int, str]
+) -> Iterator[Tuple[int, int]]:
+    """yields the `(revert, reverted)` indices of the commits, from the oldest"""
+    index_by_sha1: Dict[str, int] = {}
+    index_by_summary: Dict[str, int] = {}
+    for index in reversed(range(len(commits))):
+        commit = commits[index]
+        if index in revert_summaries:
+            sha1 = get_reverted_sha1(commit.message)
+            target = index_by_sha1.get(sha1) if sha1 else None
+            if target is None:
+                target = index_by_summary.get(unquote_summary(revert_summaries[index]))
+            if target is not None:
+                yield index, target
+        index_by_sha1[commit.sha1] = index
+        index_by_summary[commit.summary] = index
+
+
+def cancel_chains(pairs: Iterable[Tuple[int, int]]) -> Set[int]:
+    """
+    Lists the commits cancelled by the `(revert, reverted)` pairs, given from the
+    oldest revert
+    """
+    # the first commit of the chain of each paired revert, and the length of the chains
+    chain_of: Dict[int, int] = {}
+    lengths: Dict[int, int] = {}
+    for revert, target in pairs:
+        first = chain_of[revert] = chain_of.get(target, target)
+        lengths[first] = lengths.get(first, 1) + 1
+    return {
+        *chain_of,
+        *(first for first, length in lengths.items() if length % 2 == 0),
+    }
+
+
+def get_commit_trees(
+    commits: Union[Sequence[Commit], ParsedCommits],
+) -> List[CommitTree]:
+    """
+    Groups the commits by section, without the commits cancelled by a revert of the
+    range.
+    """
+    cancelled = get_cancelled_reverts(commits)
+    commit_by_type: Dict[str, Sequence[Union[Commit, CommitRow]]] = {}
+    if isinstance(commits, ParsedCommits):
+        for commit_type in SECTION_TYPES:
+            commit_by_type[commit_type] = commits.rows(
+                [
+                    index
+                    for index in commits.indices_of_types({commit_type})
+                    if index not in cancelled
+                ]
+            )
+        commit_by_type["others"] = commits.rows(
+            [
+                index
+                for index in commits.indices_of_types(SECTION_TYPES, exclude=True)
+                if index not in cancelled
+            ]
+        )
+    else:
+        listed: Dict[str, List[Commit]] = {}
+        for index, commit in enumerate(commits):
+            if index not in cancelled:
+                listed.setdefault(get_section(commit.commit_type), []).append(commit)
+        commit_by_type.update(listed)
+
+    return [
+        CommitTree(commit_type=title, commits=commit_by_type[commit_type])
+        for commit_type, title in SECTION_TITLES.items()
+        if commit_by_type.get(commit_type)
+    ]
@@ -0,0 +1,212 @@
+"""
+Serves the changelogs over HTTP, from warm repositories
+
+    GET /changelog?target=1.0.0..1.1.0&prefix=cms&path_filters=core/cms&repository=name
+
+All the parameters are optional, as on the command line. The repository managers,
+with their tags and their parsed commits, are kept per repository, prefix and path
+filters, and reused by the next requests until the references of the repository
+change, on a fetch, a new tag or a new commit: they are then opened again. Only the
+`MAX_MANAGERS` last used managers of a repository are kept.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from git import GitCommandError, Repo
+
+from .generator import stream_repository
+from .repository_manager import RepositoryManager
+
+# the files and directories git updates, through a rename, when a reference changes
+REFERENCE_FILES = ("HEAD", "packed-refs", "FETCH_HEAD", "ORIG_HEAD")
+
+# the prefix and the path filters of a manager
+ManagerKey = Tuple[Optional[str], Tuple[str, ...]]
+# the managers kept per repository, the least recently used one being dropped first
+MAX_MANAGERS = 16
+
+
+class WarmRepository:
+    """The repository managers of a repository, until its references change"""
+
+    def __init__(
+        self,
+        path: str,
+        commit_cache: Optional[str] = None,
+        commit_backend: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.commit_cache = commit_cache
+        self.commit_backend = commit_backend
+        repository = Repo(path)
+        self.git_dir = repository.git_dir
+        self.common_dir = repository.common_dir
+        self.lock = threading.Lock()
+        self.fingerprint: Tuple[int, ...] = ()
+        self.managers: "OrderedDict[ManagerKey, RepositoryManager]" = OrderedDict()
+
+    def get_fingerprint(self) -> Tuple[int, ...]:
+        """the modification times of the reference files and of the ref directories"""
+        times = []
+        for directory, name in [
+            *((self.git_dir, name) for name in REFERENCE_FILES),
+            *((self.common_dir, name) for name in REFERENCE_FILES[1:]),
+        ]:
+            try:
+                times.append(os.stat(os.path.join(directory, name)).st_mtime_ns)
+            except FileNotFoundError:
+                times.append(0)
+        for directory, _, _ in os.walk(os.path.join(self.common_dir, "refs")):
+            times.append(os.stat(directory).st_mtime_ns)
+        return tuple(times)
+
+    def get_manager(
+        self, prefix: Optional[str], filter_paths: Sequence[str]
+    ) -> RepositoryManager:
+        key = (prefix or None, tuple(filter_paths))
+        with self.lock:
+            fingerprint = self.get_fingerprint()
+            if fingerprint != self.fingerprint:
+                if self.fingerprint:
+                    logging.info("The references of %s changed", self.path)
+                self.managers.clear()
+                self.fingerprint = fingerprint
+            manager = self.managers.get(key)
+            if manager is None:
+                manager = self.managers[key] = RepositoryManager(
+                    uri=self.path,
+                    prefix=prefix,
+                    filter_paths=list(filter_paths),
+                    commit_cache=self.commit_cache,
+                    commit_backend=self.commit_backend,
+                )
+                if len(self.managers) > MAX_MANAGERS:
+                    self.managers.popitem(last=False)
+            self.managers.move_to_end(key)
+            return manager
+
+
+class ChangelogServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        address: Tuple[str, int],
+        repositories: Dict[str, str],
+        commit_cache: Optional[str] = None,
+        commit_backend: Optional[str] = None,
+        template: Optional[str] = None,
+        ai_timeout: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        super().__init__(address, ChangelogHandler)
+        self.repositories = {
+            name: WarmRepository(path, commit_cache, commit_backend)
+            for name, path in repositories.items()
+        }
+        self.default_repository = next(iter(repositories), None)
+        self.template = template
+        self.ai_timeout = ai_timeout
+        self.max_bytes = max_bytes
+
+
+class ChangelogHandler(BaseHTTPRequestHandler):
+    server: ChangelogServer
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        url = urlsplit(self.path)
+        if url.path != "/changelog":
+            self.reply(HTTPStatus.NOT_FOUND, "Only /changelog is served\n")
+            return
+        query = parse_qs(url.query)
+        name = query.get("repository", [self.server.default_repository])[-1]
+        target = query.get("target", [None])[-1]
+        if name not in self.server.repositories:
+            self.reply(HTTPStatus.NOT_FOUND, f"Unknown repository {name}\n")
+            return
+        if target is not None and target.count("..") != 1:
+            self.reply(HTTPStatus.BAD_REQUEST, "The target must be a rev1..rev2\n")
+            return
+        if target is not None and any(
+            revision.startswith("-") for revision in target.split("..")
+        ):
+            # git would read them as options, like --output=<file>
+            self.reply(HTTPStatus.BAD_REQUEST, "A revision can not start with -\n")
+            return
+
+        try:
+            repository = self.server.repositories[name].get_manager(
+                query.get("prefix", [None])[-1], query.get("path_filters", [])
+            )
+            changelog = "".join(
+                stream_repository(
+                    repository,
+                    target=target,
+                    template=self.server.template,
+                    ai_timeout=self.server.ai_timeout,
+                    max_bytes=self.server.max_bytes,
+                )
+            )
+        except GitCommandError as error:
+            self.reply(HTTPStatus.UNPROCESSABLE_ENTITY, f"{error.stderr.strip()}\n")
+            return
+        except ValueError as error:
+            self.reply(HTTPStatus.UNPROCESSABLE_ENTITY, f"{error}\n")
+            return
+        self.reply(HTTPStatus.OK, changelog, "text/markdown; charset=utf-8")
+
+    def reply(
+        self, status: HTTPStatus, text: str, content_type: str = "text/plain"
+    ) -> None:
+        body = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=W0622
+        logging.info("%s %s", self.address_string(), format % args)
+
+
+def parse_repositories(repositories: Optional[Sequence[str]]) -> Dict[str, str]:
+    """`name=path` pairs, or the current directory as `default`"""
+    if not repositories:
+        return {"default": "./"}
+    parsed = {}
+    for repository in repositories:
+        name, _, path = repository.rpartition("=")
+        parsed[name or os.path.basename(os.path.abspath(path))] = path
+    return parsed
+
+
+def serve(  # pylint: disable=too-many-arguments
+    address: str,
+    repositories: Optional[Sequence[str]] = None,
+    commit_cache: Optional[str] = None,
+    commit_backend: Optional[str] = None,
+    template: Optional[str] = None,
+    ai_timeout: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+) -> None:
+    """serves on a `port` or a `host:port` address, the host being localhost by default"""
+    host, _, port = address.rpartition(":")
+    server = ChangelogServer(
+        (host or "127.0.0.1", int(port)),
+        parse_repositories(repositories),
+        commit_cache=commit_cache,
+        commit_backend=commit_backend,
+        template=template,
+        ai_timeout=ai_timeout,
+        max_bytes=max_bytes,
+    )
+    logging.info("Serving the changelogs on %s:%d", *server.server_address[:2])
+    with server:
+        server.serve_forever()
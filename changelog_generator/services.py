@@ -0,0 +1,309 @@
+"""
+Generates the changelogs of all the services of a monorepo at once
+
+The services are listed in a JSON manifest, with the tag prefix and the path filters
+of each one:
+
+    [
+        {"prefix": "cms", "path_filters": ["core/cms", "core/common"]},
+        {"prefix": "search", "path_filters": ["core/search"]}
+    ]
+
+The tags of all the services are listed with a single `git for-each-ref`, and the
+history of all their releases is read with a single `git log`, the changed files of
+each commit included: each commit is then routed to the services whose release it
+belongs to and whose path filters match one of its files, the files of a commit being
+classified once for all the services.
+
+The release of a service is walked as `git log -- <path filters>` walks it: at a merge
+which does not change the files of the service against one of its parents, only that
+parent is followed, and the commits of the other branches are left out. The files a
+merge changes against each of its parents are read with a single `git diff-tree`.
+"""
+
+import json
+from typing import (
+    AbstractSet,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from git import GitCommandError
+
+from .commit import Commit
+from .commit_reader import ChangedCommit, iter_log_changes, iter_merge_changes
+from .concurrency import ordered_map, run_in_background
+from .generator import (
+    get_commit_trees,
+    profiled_ai_summary,
+    render_changelog,
+    wait_ai_summary,
+)
+from .path_filter import PathFilter
+from .repository_manager import RepositoryManager
+from .tag_manager import PrefixedTagManager
+
+
+class Service(NamedTuple):
+    prefix: str
+    filter_paths: Sequence[str] = ()
+
+
+class ServiceRelease(NamedTuple):
+    service: Service
+    previous_tag: str
+    current_tag: str
+
+
+def load_manifest(path: str) -> List[Service]:
+    with open(path, encoding="utf-8") as stream:
+        return [
+            Service(service["prefix"], tuple(service.get("path_filters") or ()))
+            for service in json.load(stream)
+        ]
+
+
+def get_releases(
+    repository: RepositoryManager, services: Sequence[Service]
+) -> List[ServiceRelease]:
+    """The last release of each service, as generate would find it"""
+    tags = PrefixedTagManager.get_release_tags_by_prefix(
+        repository.repository, [service.prefix for service in services], limit=2
+    )
+    releases = []
+    for service in services:
+        latest_tags = tags[service.prefix]
+        releases.append(
+            ServiceRelease(
+                service,
+                latest_tags[1] if len(latest_tags) > 1 else "",
+                latest_tags[0] if latest_tags else "HEAD",
+            )
+        )
+    return releases
+
+
+def reachable(
+    graph: Dict[str, List[str]],
+    head: Optional[str],
+    excluded: AbstractSet[str] = frozenset(),
+    followed: Optional[Mapping[str, str]] = None,
+) -> Set[str]:
+    """
+    Lists the commits of the walked graph reachable from the head, only through the
+    followed parent of the merges which have one
+    """
+    reached: Set[str] = set()
+    pending = [head] if head else []
+    while pending:
+        sha = pending.pop()
+        if sha in reached or sha in excluded or sha not in graph:
+            continue
+        reached.add(sha)
+        pending.extend([followed[sha]] if followed and sha in followed else graph[sha])
+    return reached
+
+
+def get_followed_parents(
+    graph: Dict[str, List[str]],
+    groups_by_merge: Dict[str, List[Set[int]]],
+    group: int,
+    excluded: AbstractSet[str],
+    previous_sha: Optional[str],
+) -> Dict[str, str]:
+    """
+    The parent `git log -- paths` follows at each merge: the first one the merge does
+    not change the paths of the group against, unless the walk excludes it, the previous
+    tag aside.
+    """
+    followed = {}
+    for sha, groups in groups_by_merge.items():
+        for parent, parent_groups in zip(graph[sha], groups):
+            relevant = parent == previous_sha or (
+                parent in graph and parent not in excluded
+            )
+            if relevant and group not in parent_groups:
+                followed[sha] = parent
+                break
+    return followed
+
+
+class History(NamedTuple):
+    """The commits walked once for all the releases, classified in their groups"""
+
+    changes: List[ChangedCommit]
+    graph: Dict[str, List[str]]
+    groups_by_sha: Dict[str, Set[int]]
+    groups_by_merge: Dict[str, List[Set[int]]]
+
+
+def resolve_releases(
+    repository: RepositoryManager, releases: Sequence[ServiceRelease]
+) -> Tuple[List[str], List[Optional[str]]]:
+    """The commits of the current tags, and of the previous tags when there are some"""
+    git = repository.repository.git
+    current_shas = git.rev_parse(
+        *(f"{release.current_tag}^{{commit}}" for release in releases)
+    ).split()
+    previous_tags = [release.previous_tag for release in releases]
+    tagged = [tag for tag in previous_tags if tag]
+    shas = iter(
+        git.rev_parse(*(f"{tag}^{{commit}}" for tag in tagged)).split()
+        if tagged
+        else ()
+    )
+    return current_shas, [next(shas) if tag else None for tag in previous_tags]
+
+
+def read_history(
+    repository: RepositoryManager,
+    releases: Sequence[ServiceRelease],
+    revisions: Sequence[str],
+) -> History:
+    """
+    Walks the revisions, and classifies the files of each commit, and the ones each
+    merge changes against each of its parents, in the groups of the path filters
+    """
+    changes = list(iter_log_changes(repository.repository, revisions))
+    path_filter = PathFilter(*(release.service.filter_paths for release in releases))
+    merges = [
+        (change.commit.sha1, change.parents)
+        for change in changes
+        if len(change.parents) > 1
+    ]
+    groups_by_merge: Dict[str, List[Set[int]]] = {}
+    if merges and any(release.service.filter_paths for release in releases):
+        merge_changes = iter_merge_changes(repository.repository, merges)
+        groups_by_merge = {
+            sha: [path_filter.classify(next(merge_changes)) for _ in parents]
+            for sha, parents in merges
+        }
+    return History(
+        changes,
+        {change.commit.sha1: change.parents for change in changes},
+        {
+            change.commit.sha1: path_filter.classify(change.files)
+            for change in changes
+            if len(change.parents) <= 1
+        },
+        groups_by_merge,
+    )
+
+
+def route_release(
+    history: History,
+    group: int,
+    filtered: bool,
+    current_sha: str,
+    previous_sha: Optional[str],
+) -> List[Commit]:
+    """
+    The non merge commits of the release of a group: reachable from its current tag and
+    not from its previous one, through the parents `git log -- paths` follows.
+    """
+    excluded = reachable(history.graph, previous_sha)
+    followed = (
+        get_followed_parents(
+            history.graph, history.groups_by_merge, group, excluded, previous_sha
+        )
+        if filtered
+        else {}
+    )
+    included = reachable(history.graph, current_sha, excluded, followed)
+    return [
+        change.commit
+        for change in history.changes
+        if change.commit.sha1 in included
+        and change.commit.sha1 in history.groups_by_sha
+        and (not filtered or group in history.groups_by_sha[change.commit.sha1])
+    ]
+
+
+def read_releases(
+    repository: RepositoryManager, releases: Sequence[ServiceRelease]
+) -> List[List[Commit]]:
+    """
+    Lists the non merge commits of each release, from a single history walk.
+
+    The walk goes from all the current tags down to the merge base of all the previous
+    ones, which is an ancestor of all the excluded commits: the commits of a release are
+    the ones reachable from its current tag and not from its previous one.
+    """
+    current_shas, previous_shas = resolve_releases(repository, releases)
+    revisions = list(current_shas)
+    if all(previous_shas):
+        try:
+            merge_base = repository.repository.git.merge_base(
+                "--octopus", *previous_shas
+            )
+            revisions.append(f"^{merge_base}")
+        except GitCommandError:
+            pass  # unrelated histories, the whole history is read
+
+    history = read_history(repository, releases, revisions)
+    return [
+        route_release(
+            history,
+            group,
+            bool(release.service.filter_paths),
+            current_sha,
+            previous_sha,
+        )
+        for group, (release, current_sha, previous_sha) in enumerate(
+            zip(releases, current_shas, previous_shas)
+        )
+    ]
+
+
+def generate_services(  # pylint: disable=too-many-arguments
+    repository_path: str,
+    services: Sequence[Service],
+    jobs: int = 1,
+    template: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    ai_timeout: Optional[float] = None,
+) -> Iterator[Tuple[Service, str]]:
+    """
+    Generates the changelog of the last release of each service, in the order of the
+    services. The output is the same as calling `generate` with the prefix and the path
+    filters of each service, the changelogs are rendered by `jobs` threads, each one
+    without its AI summary if it is not ready after `ai_timeout` seconds.
+    """
+    repository = RepositoryManager(uri=repository_path)
+    releases = get_releases(repository, services)
+    commits_by_release = read_releases(repository, releases)
+
+    def generate_release(
+        release_commits: Tuple[ServiceRelease, List[Commit]],
+    ) -> Tuple[Service, str]:
+        release, commits = release_commits
+        service = release.service
+        diff = (
+            repository.iter_diff(
+                f"{release.previous_tag}..{release.current_tag}",
+                service.filter_paths,
+                prefix=service.prefix,
+            )
+            if release.previous_tag
+            else None
+        )
+        ai_summary = run_in_background(profiled_ai_summary, service.prefix, diff)
+        return service, render_changelog(
+            organization=repository.organization,
+            repository=repository.name,
+            previous_tag=release.previous_tag,
+            current_tag=release.current_tag,
+            commit_trees=get_commit_trees(commits),
+            ai_summary=wait_ai_summary(ai_summary, ai_timeout),
+            template=template,
+            max_bytes=max_bytes,
+        )
+
+    yield from ordered_map(generate_release, zip(releases, commits_by_release), jobs)
@@ -0,0 +1,188 @@
+"""
+Spools the commits of a range to a temporary SQLite database, section by section
+
+The commits are written as they are read from git, and read back section by section
+while the changelog is rendered: the memory of the generation does not depend on the
+size of the range, the database keeping a few pages in memory and the rest on disk. The
+commits cancelled by a revert are paired with queries, only the reverts are held.
+"""
+
+import json
+import sqlite3
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union, overload
+
+from .commit import Commit, get_reverted_sha1, unquote_summary
+from .commit_batch import CommitRow
+from .commit_cache import BATCH_SIZE, commit_from_row
+from .sections import SECTION_TITLES, CommitTree, cancel_chains, get_section
+
+SCHEMA = """
+CREATE TABLE commits (
+    position INTEGER PRIMARY KEY,
+    section TEXT NOT NULL,
+    sha1 TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    message TEXT NOT NULL,
+    commit_type TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    revert_summary TEXT,
+    jiras TEXT NOT NULL,
+    cancelled INTEGER NOT NULL DEFAULT 0
+);
+"""
+INDICES = """
+CREATE INDEX commits_section ON commits (section, cancelled, position);
+CREATE INDEX commits_sha1 ON commits (sha1);
+CREATE INDEX commits_summary ON commits (summary, position);
+"""
+COLUMNS = "sha1, summary, message, commit_type, scope, subject, revert_summary, jiras"
+
+
+def commit_row(
+    position: int, commit: Union[Commit, CommitRow]
+) -> Tuple[Union[int, str, None], ...]:
+    return (
+        position,
+        get_section(commit.commit_type),
+        commit.sha1,
+        commit.summary,
+        commit.message,
+        commit.commit_type,
+        commit.scope,
+        commit.subject,
+        commit.revert_summary,
+        json.dumps(commit.jiras),
+    )
+
+
+class SpooledSection(Sequence[Commit]):
+    """The commits of a section, read from the spool each time they are iterated"""
+
+    def __init__(self, spool: "CommitSpool", section: str, length: int) -> None:
+        self.spool = spool
+        self.section = section
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    @overload
+    def __getitem__(self, position: int) -> Commit: ...
+
+    @overload
+    def __getitem__(self, position: slice) -> "SpooledSection": ...
+
+    def __getitem__(
+        self, position: Union[int, slice]
+    ) -> Union[Commit, "SpooledSection"]:
+        if isinstance(position, slice):
+            start, stop, step = position.indices(self.length)
+            if start != 0 or step != 1:
+                raise IndexError("Only the first commits of a section can be sliced")
+            return SpooledSection(self.spool, self.section, stop)
+        if not -self.length <= position < self.length:
+            raise IndexError(position)
+        return next(self.spool.iter_section(self.section, 1, position % self.length))
+
+    def __iter__(self) -> Iterator[Commit]:
+        return self.spool.iter_section(self.section, self.length)
+
+
+class CommitSpool:
+    def __init__(self) -> None:
+        # an empty path is a private database, deleted once closed, which pages out to
+        # a temporary file once larger than its cache
+        self.connection = sqlite3.connect("", check_same_thread=False)
+        self.connection.executescript(
+            "PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + SCHEMA
+        )
+        self.count = 0
+
+    def add(self, commits: Iterable[Union[Commit, CommitRow]]) -> None:
+        """Spools the commits, given in the git log order"""
+        batch = []
+        for commit in commits:
+            batch.append(commit_row(self.count, commit))
+            self.count += 1
+            if len(batch) == BATCH_SIZE:
+                self._insert(batch)
+                batch = []
+        self._insert(batch)
+
+    def _insert(self, rows: List[Tuple[Union[int, str, None], ...]]) -> None:
+        self.connection.executemany(
+            f"INSERT INTO commits (position, section, {COLUMNS}) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def cancel_reverts(self) -> None:
+        """Marks the commits cancelled by a revert of the range, as get_commit_trees"""
+        cancelled = cancel_chains(self._pair_reverts())
+        self.connection.executemany(
+            "UPDATE commits SET cancelled = 1 WHERE position = ?",
+            [(position,) for position in cancelled],
+        )
+
+    def _pair_reverts(self) -> Iterator[Tuple[int, int]]:
+        reverts = self.connection.execute(
+            "SELECT position, message, revert_summary FROM commits "
+            "WHERE revert_summary IS NOT NULL ORDER BY position DESC"
+        )
+        for position, message, revert_summary in reverts:
+            target = None
+            sha1 = get_reverted_sha1(message)
+            if sha1:
+                target = self.connection.execute(
+                    "SELECT position FROM commits WHERE sha1 = ? AND position > ?",
+                    (sha1, position),
+                ).fetchone()
+            if target is None:
+                target = self.connection.execute(
+                    "SELECT position FROM commits WHERE summary = ? AND position > ? "
+                    "ORDER BY position LIMIT 1",
+                    (unquote_summary(revert_summary), position),
+                ).fetchone()
+            if target is not None:
+                yield position, target[0]
+
+    def get_commit_trees(self) -> List[CommitTree]:
+        """The sections of the changelog, their commits being read when rendered"""
+        self.connection.executescript(INDICES)
+        self.cancel_reverts()
+        counts = dict(
+            self.connection.execute(
+                "SELECT section, COUNT(*) FROM commits WHERE cancelled = 0 "
+                "GROUP BY section"
+            )
+        )
+        return [
+            CommitTree(
+                commit_type=title,
+                commits=SpooledSection(self, section, counts[section]),
+            )
+            for section, title in SECTION_TITLES.items()
+            if counts.get(section)
+        ]
+
+    def iter_section(
+        self, section: str, limit: int, offset: int = 0
+    ) -> Iterator[Commit]:
+        rows = self.connection.execute(
+            f"SELECT {COLUMNS} FROM commits WHERE section = ? AND cancelled = 0 "
+            "ORDER BY position LIMIT ? OFFSET ?",
+            (section, limit, offset),
+        )
+        for row in rows:
+            yield commit_from_row(row)
+
+    def stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Streams the chunks rendered from the spool, and closes it once they are"""
+        try:
+            yield from chunks
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.connection.close()
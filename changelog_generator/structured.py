@@ -0,0 +1,135 @@
+"""
+The changelog as structured records, for the tools which would parse the markdown
+
+With the `ndjson` format, a record is written per line: a `commit` record for each
+commit, as soon as it is read from git, then a trailing `summary` record, with the tags,
+the AI summary and the sections of the changelog:
+
+    {"record": "commit", "sha1": "…", "type": "feat", "scope": "cms", …}
+    {"record": "summary", "current_tag": "1.1.0", "sections": [{"type": "feat", …}], …}
+
+The `json` format writes the same records as a single `{"commits": [...], "summary":
+{...}}` document, streamed as well. Only the counts of the sections are kept while the
+commits are streamed, the memory does not grow with the range: unlike in the markdown,
+the commits cancelled by a revert of the range are kept, a revert naming the commit it
+reverts in its `reverted_sha1`.
+"""
+
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Union
+
+from .commit import Commit, get_reverted_sha1
+from .commit_batch import CommitRow
+from .concurrency import run_in_background
+from .generator import profiled_ai_summary, wait_ai_summary
+from .profiling import span
+from .repository_manager import RepositoryManager
+from .sections import SECTION_TITLES, get_section
+
+FORMATS = ("json", "ndjson")
+
+
+def commit_record(commit: Union[Commit, CommitRow]) -> Dict[str, Any]:
+    return {
+        "record": "commit",
+        "sha1": commit.sha1,
+        "short": commit.short,
+        "summary": commit.summary,
+        "type": commit.commit_type,
+        "scope": commit.scope,
+        "subject": commit.subject,
+        "revert_summary": commit.revert_summary,
+        "reverted_sha1": (
+            get_reverted_sha1(commit.message) if commit.revert_summary else None
+        ),
+        "jiras": commit.jiras,
+        "section": get_section(commit.commit_type),
+    }
+
+
+def iter_records(
+    repository: RepositoryManager,
+    target: Optional[str] = None,
+    ai_timeout: Optional[float] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields a record per commit of the target, or since the last tag, and the summary
+    record. The AI summary is generated while the commits are streamed.
+    """
+    with span("tags"):
+        if target:
+            previous_tag, current_tag = target.split("..")
+            diff = None
+        else:
+            previous_tag, current_tag = repository.previous_tag, repository.current_tag
+            diff = repository.iter_diff_since_last_tag()
+    ai_summary = run_in_background(profiled_ai_summary, repository.prefix, diff)
+
+    sections: Counter = Counter()
+    with span("commits"):
+        for commit in repository.iter_commits(target):
+            record = commit_record(commit)
+            sections[record["section"]] += 1
+            yield record
+    with span("ai_wait"):
+        summary = wait_ai_summary(ai_summary, ai_timeout)
+
+    yield {
+        "record": "summary",
+        "organization": repository.organization,
+        "repository": repository.name,
+        "previous_tag": previous_tag,
+        "current_tag": current_tag,
+        "ai_summary": summary,
+        "commits": sum(sections.values()),
+        "sections": [
+            {"type": section, "title": title, "commits": sections[section]}
+            for section, title in SECTION_TITLES.items()
+            if sections[section]
+        ],
+    }
+
+
+def stream_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record) + "\n"
+
+
+def stream_json(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Writes the commit records in a `commits` list, and the last one as `summary`"""
+    yield '{"commits": ['
+    separator = "\n"
+    summary = None
+    for record in records:
+        if record["record"] == "summary":
+            summary = record
+            continue
+        yield separator + json.dumps(record)
+        separator = ",\n"
+    yield f'\n], "summary": {json.dumps(summary)}}}\n'
+
+
+def generate_structured(  # pylint: disable=too-many-arguments
+    repository_path: str,
+    output_format: str,
+    target: Optional[str] = None,
+    prefix: Optional[str] = None,
+    filter_paths: Optional[Sequence[str]] = None,
+    commit_cache: Optional[str] = None,
+    ai_timeout: Optional[float] = None,
+    commit_backend: Optional[str] = None,
+) -> Iterator[str]:
+    """Streams the records of the changelog in the `json` or the `ndjson` format"""
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown format {output_format}, not one of {FORMATS}")
+    with span("repository"):
+        repository = RepositoryManager(
+            uri=repository_path,
+            prefix=prefix,
+            filter_paths=filter_paths,
+            commit_cache=commit_cache,
+            commit_backend=commit_backend,
+        )
+    records = iter_records(repository, target=target, ai_timeout=ai_timeout)
+    return stream_json(records) if output_format == "json" else stream_ndjson(records)
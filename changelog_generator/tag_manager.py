@@ -1,18 +1,41 @@
+import heapq
 import re
 from abc import ABC, abstractmethod
-from typing import ClassVar, Pattern, Sequence, Tuple
+from typing import (
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Match,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+)
 
 from git import Repo
 
 
 class BaseTagManager(ABC):
     PATTERN: ClassVar[Pattern[str]]
+    # the release tags are the ones merged in this revision
+    MERGED: ClassVar[str]
+    repository: Repo
+    # the matches of the tags, which only live as long as the manager
+    matches: Dict[str, Optional[Match[str]]]
+
+    def match(self, tag: str) -> Optional[Match[str]]:
+        """Matches each tag once, for the filtering and for the sort key"""
+        if tag not in self.matches:
+            self.matches[tag] = self.PATTERN.match(tag)
+        return self.matches[tag]
 
     def get_semver_from_tag(self, tag: str) -> Tuple[int, ...]:
         """
         Splits a tag in a semantic versioning tuple of integers (major,minor,bug,patch).
         """
-        res = self.PATTERN.match(tag)
+        res = self.match(tag)
         if not res:
             raise ValueError(f"Not a valid tag: {tag}")
         return tuple(
@@ -32,18 +55,39 @@ class BaseTagManager(ABC):
         """validates a tag"""
 
     @abstractmethod
-    def get_tags(self):
+    def get_tags(self) -> Iterator[str]:
         """list the tags"""
 
-    def get_release_tags(self) -> Sequence[str]:
-        """Lists only the release tags"""
-        return tuple(
-            sorted(
-                filter(self.is_release_tag, self.get_tags()),
-                key=self.get_semver_from_tag,
-                reverse=True,
-            )
+    def iter_merged_tags(self, merged: str, *patterns: str) -> Iterator[str]:
+        """
+        Streams the names of the tags merged in a revision and matching the patterns,
+        in which `*` does not match a `/`, from a single `git for-each-ref`.
+        """
+        process = self.repository.git.for_each_ref(
+            f"--merged={merged}",
+            "--format=%(refname:strip=2)",
+            *(f"refs/tags/{pattern}" for pattern in patterns),
+            as_process=True,
+        )
+        for line in process.stdout:
+            yield line.decode().rstrip("\n")
+        process.wait()
+
+    def get_release_tags(
+        self, limit: Optional[int] = None, tags: Optional[Iterable[str]] = None
+    ) -> Sequence[str]:
+        """
+        Lists only the release tags, from the newest, or the `limit` newest ones. The
+        tags are listed from the repository, unless already listed.
+        """
+        release_tags = filter(
+            self.is_release_tag, self.get_tags() if tags is None else tags
         )
+        if limit is None:
+            return tuple(
+                sorted(release_tags, key=self.get_semver_from_tag, reverse=True)
+            )
+        return tuple(heapq.nlargest(limit, release_tags, key=self.get_semver_from_tag))
 
 
 class SimpleTagManager(BaseTagManager):
@@ -58,16 +102,19 @@ class SimpleTagManager(BaseTagManager):
     PATTERN = re.compile(
         r"^v?(?P<major>\d+)[-.](?P<minor>\d+)[-.]((?P<bug>\d+)|rc(?P<rc>\d+))?$"
     )
+    MERGED = "HEAD"
 
     def __init__(self, repository: Repo) -> None:
         self.repository = repository
+        self.matches = {}
 
     def is_release_tag(self, tag: str) -> bool:
-        res = self.PATTERN.match(tag)
-        return res and not res.group("rc")
+        res = self.match(tag)
+        return res is not None and not res.group("rc")
 
-    def get_tags(self):
-        return self.repository.git.tag("--merged").split("\n")
+    def get_tags(self) -> Iterator[str]:
+        """the tags out of a `/` directory, which can not be simple release tags"""
+        return self.iter_merged_tags(self.MERGED, "[0-9]*", "v[0-9]*")
 
 
 class PrefixedTagManager(BaseTagManager):
@@ -80,17 +127,38 @@ class PrefixedTagManager(BaseTagManager):
     PATTERN = re.compile(
         r"^(?P<prefix>[\w-]+)/(?P<major>\d+)\.(?P<minor>\d+)\.((?P<bug>\d+)|rc(?P<rc>\d+))?$"
     )
+    MERGED = "origin/master"
 
     def __init__(self, repository: Repo, prefix: str):
         self.repository = repository
         self.prefix = prefix
+        self.matches = {}
 
     def is_release_tag(self, tag: str) -> bool:
         """making sure that only the tags with the prefix are listed"""
-        res = self.PATTERN.match(tag)
-        return res and res.group("prefix") == self.prefix and not res.group("rc")
+        res = self.match(tag)
+        return (
+            res is not None
+            and res.group("prefix") == self.prefix
+            and not res.group("rc")
+        )
 
-    def get_tags(self):
-        return self.repository.git.tag(
-            "--merged", "origin/master", f"{self.prefix}/*"
-        ).split("\n")
+    def get_tags(self) -> Iterator[str]:
+        return self.iter_merged_tags(self.MERGED, f"{self.prefix}/*")
+
+    @classmethod
+    def get_release_tags_by_prefix(
+        cls, repository: Repo, prefixes: Sequence[str], limit: Optional[int] = None
+    ) -> Dict[str, Sequence[str]]:
+        """Lists the release tags of several prefixes from a single `git for-each-ref`"""
+        if not prefixes:
+            return {}
+        managers = {prefix: cls(repository, prefix) for prefix in prefixes}
+        tags: Dict[str, List[str]] = {prefix: [] for prefix in prefixes}
+        patterns = [f"{prefix}/*" for prefix in managers]
+        for tag in managers[prefixes[0]].iter_merged_tags(cls.MERGED, *patterns):
+            tags[tag.split("/", 1)[0]].append(tag)
+        return {
+            prefix: manager.get_release_tags(limit, tags[prefix])
+            for prefix, manager in managers.items()
+        }
@@ -1,10 +1,13 @@
 from argparse import ArgumentParser
 from collections import deque
+from functools import partial
 from itertools import islice
-from typing import Iterator, Tuple, TypeVar
+from typing import Iterator, Optional, Sequence, Tuple, TypeVar
 
+from changelog_generator.concurrency import ordered_map
+from changelog_generator.generator import generate, generate_all
 from changelog_generator.repository_manager import RepositoryManager
-from rewrite_existing import update_release_note
+from rewrite_existing import MAX_RELEASE_NOTE_LENGTH, publish_release_note
 
 Item = TypeVar("Item")
 
@@ -24,6 +27,29 @@ def sliding_window_iter(it: Iterator[Item], size: int) -> Iterator[Tuple[Item, .
         yield tuple(window)
 
 
+def generate_target(
+    path: str,
+    filter_paths: Sequence[str],
+    commit_cache: Optional[str],
+    commit_backend: Optional[str],
+    target: str,
+) -> Tuple[str, str]:
+    return target, generate(
+        path,
+        target=target,
+        filter_paths=filter_paths,
+        commit_cache=commit_cache,
+        max_bytes=MAX_RELEASE_NOTE_LENGTH,
+        commit_backend=commit_backend,
+    )
+
+
+def publish_target(path: str, generated: Tuple[str, str]) -> None:
+    target, changelog = generated
+    print("Will rewrite the release with the commits between ", *target.split(".."))
+    publish_release_note(path, target.split("..")[1], changelog)
+
+
 def rewrite_all_release_notes_by_prefix():
     parser = ArgumentParser()
     parser.add_argument(
@@ -40,6 +66,37 @@ def rewrite_all_release_notes_by_prefix():
         help="A space separated list of path to be used to the commits that edited files within "
         "them",
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Read the history once for all the tags instead of once per release",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="The number of release notes generated concurrently",
+    )
+    parser.add_argument(
+        "--gh_jobs",
+        type=int,
+        default=1,
+        help="The number of concurrent `gh` calls. The releases are published in order "
+        "only with a single one",
+    )
+    parser.add_argument(
+        "--commit_cache",
+        nargs="?",
+        const="",
+        help="Cache the parsed commits in this SQLite file, in the .git directory if "
+        "no file is given",
+    )
+    parser.add_argument(
+        "--commit_backend",
+        choices=["git", "native"],
+        help="Reads the commits with `git log`, the default, or out of the object "
+        "database with `native`",
+    )
     args = parser.parse_args()
 
     filter_paths = args.filter_paths
@@ -49,9 +106,33 @@ def rewrite_all_release_notes_by_prefix():
         path, prefix=prefix, filter_paths=filter_paths
     ).tags
 
-    for chunk in sliding_window_iter(reversed(all_tags_descending), 2):
-        n, n1 = chunk
-        update_release_note(filter_paths, path, f"{n}..{n1}")
+    tags = tuple(reversed(all_tags_descending))
+    if args.batch:
+        changelogs = generate_all(
+            path,
+            tags,
+            filter_paths,
+            jobs=args.jobs,
+            commit_cache=args.commit_cache,
+            max_bytes=MAX_RELEASE_NOTE_LENGTH,
+            commit_backend=args.commit_backend,
+        )
+    else:
+        targets = (f"{n}..{n1}" for n, n1 in sliding_window_iter(iter(tags), 2))
+        changelogs = ordered_map(
+            partial(
+                generate_target,
+                path,
+                filter_paths,
+                args.commit_cache,
+                args.commit_backend,
+            ),
+            targets,
+            args.jobs,
+        )
+
+    for _ in ordered_map(partial(publish_target, path), changelogs, args.gh_jobs):
+        pass
 
 
 if __name__ == "__main__":
@@ -8,8 +8,11 @@ How To Use:
 
 import subprocess
 from argparse import ArgumentParser
+from typing import Iterable, Union
 
-from changelog_generator.generator import generate
+from changelog_generator.generator import generate_stream
+
+MAX_RELEASE_NOTE_LENGTH = 125000
 
 
 def run():
@@ -39,8 +42,20 @@ def run():
 def update_release_note(filter_paths, path, target, create: bool = True):
     tag_n, tag_n1 = target.split("..")
     print("Will rewrite the release with the commits between ", tag_n, tag_n1)
-    changelog = generate(path, target=target, filter_paths=filter_paths)
-    changelog = changelog[:125000]
+    changelog = generate_stream(
+        path,
+        target=target,
+        filter_paths=filter_paths,
+        max_bytes=MAX_RELEASE_NOTE_LENGTH,
+    )
+    publish_release_note(path, tag_n1, changelog, create)
+
+
+def publish_release_note(
+    path, tag_n1, changelog: Union[str, Iterable[str]], create: bool = True
+):
+    """The changelog is expected to be generated within MAX_RELEASE_NOTE_LENGTH"""
+    changelog = "".join(changelog)
     try:
         # checking if the release exists
         subprocess.check_output(
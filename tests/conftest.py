@@ -7,8 +7,11 @@ from git import Repo
 
 from changelog_generator.repository_manager import RepositoryManager
 
+from .local_repository import LocalRepository
+from .synthetic_repository import RepositoryShape, build_synthetic_repository
 
-@pytest.fixture(scope="session", autouse=True)
+
+@pytest.fixture(scope="session")
 def core_repo() -> Repo:
     tempdir = Path(tempfile.gettempdir()) / "changelog_generator" / "core"
     try:
@@ -19,7 +22,7 @@ def core_repo() -> Repo:
     return repo
 
 
-@pytest.fixture(scope="session", autouse=True)
+@pytest.fixture(scope="session")
 def organization_repo() -> Repo:
     tempdir = Path(tempfile.gettempdir()) / "changelog_generator" / "organization"
     try:
@@ -28,3 +31,14 @@ def organization_repo() -> Repo:
     except OSError:
         repo = Repo(tempdir)
     return repo
+
+
+@pytest.fixture
+def local_repo(tmp_path: Path) -> LocalRepository:
+    return LocalRepository(tmp_path / "repository")
+
+
+@pytest.fixture(scope="session")
+def synthetic_repo(tmp_path_factory: pytest.TempPathFactory) -> Repo:
+    path = tmp_path_factory.mktemp("synthetic") / "repository"
+    return Repo(build_synthetic_repository(path, RepositoryShape()))
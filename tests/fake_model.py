@@ -0,0 +1,32 @@
+import threading
+import time
+from typing import List
+
+from changelog_generator.ai_generator import BaseModel
+
+
+class FakeModel(BaseModel):
+    """
+    answers each prompt with its length, padded with lines up to the answer size, and
+    records the concurrent requests
+    """
+
+    def __init__(self, delay: float = 0.0, answer_size: int = 0) -> None:
+        self.delay = delay
+        self.answer_size = answer_size
+        self.prompts: List[str] = []
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def generate(self, prompt: str) -> str:
+        with self.lock:
+            self.prompts.append(prompt)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        answer = f"summary of {len(prompt)} characters"
+        padding = max(self.answer_size - len(answer), 0) // 10
+        return answer + "\n- padding" * padding
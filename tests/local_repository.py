@@ -0,0 +1,64 @@
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from git import Repo
+
+ORIGIN_URL = "git@github.com:lumapps/local-repository.git"
+START_TIMESTAMP = 1_600_000_000
+
+
+class LocalRepository:
+    """
+    Builds a local git repository, commit by commit, with strictly increasing dates.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.repository = Repo.init(path, initial_branch="master")
+        self.repository.git.config("user.name", "Changelog Generator")
+        self.repository.git.config("user.email", "changelog@example.com")
+        self.repository.create_remote("origin", ORIGIN_URL)
+        self.timestamp = START_TIMESTAMP
+
+    def commit(self, message: str, files: Optional[Dict[str, str]] = None) -> str:
+        for name, content in (files or {}).items():
+            file_path = self.path / name
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(content)
+            self.repository.git.add(name)
+        self.timestamp += 60
+        date = f"{self.timestamp} +0000"
+        self.repository.git.commit(
+            "--allow-empty",
+            "--cleanup=verbatim",
+            "-m",
+            message,
+            env={**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date},
+        )
+        return self.repository.head.commit.hexsha
+
+    def tag(self, name: str, revision: str = "HEAD") -> None:
+        self.repository.git.tag(name, revision)
+
+    def checkout(self, branch: str, create: bool = False) -> None:
+        if create:
+            self.repository.git.checkout("-b", branch)
+        else:
+            self.repository.git.checkout(branch)
+
+    def merge(self, branch: str) -> str:
+        self.timestamp += 60
+        date = f"{self.timestamp} +0000"
+        self.repository.git.merge(
+            "--no-ff",
+            "-m",
+            f"Merge branch '{branch}'",
+            branch,
+            env={**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date},
+        )
+        return self.repository.head.commit.hexsha
+
+    def publish(self) -> None:
+        """points origin/master on master, it is used to list the prefixed tags"""
+        self.repository.git.update_ref("refs/remotes/origin/master", "master")
@@ -0,0 +1,182 @@
+"""
+Builds local git repositories of any size, with `git fast-import`
+
+The history is generated from a RepositoryShape: conventional commits spread over the
+services of a monorepo (`core/<service>/`) and a common layer (`core/common/`), Jira
+references, reverts, merged branches, and release tags, both simple (`1.2.0`) and
+prefixed by service (`cms/1.2.0`). The same shape and seed always give the same
+repository.
+"""
+
+import random
+import subprocess
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+ORIGIN_URL = "git@github.com:lumapps/synthetic-repository.git"
+START_TIMESTAMP = 1_600_000_000
+COMMIT_TYPES = ("feat", "fix", "docs", "chore", "refactor", "test")
+
+
+class RepositoryShape(NamedTuple):
+    commits: int = 200
+    # a release is tagged every `tag_every` commits of the main line
+    tag_every: int = 20
+    simple_tags: bool = True
+    services: Tuple[str, ...] = ("cms", "search", "auth")
+    # part of the commits changing the common layer instead of a service
+    common_ratio: float = 0.2
+    jira_ratio: float = 0.5
+    revert_ratio: float = 0.05
+    unconventional_ratio: float = 0.05
+    # a branch of `branch_size` commits is merged every `merge_every` commits
+    merge_every: int = 10
+    branch_size: int = 2
+    # lines rewritten by each commit, in a file of its service
+    diff_lines: int = 10
+    files_per_service: int = 5
+    seed: int = 0
+
+
+class FastImportWriter:
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+        self.mark = 0
+        self.timestamp = START_TIMESTAMP
+
+    def data(self, content: str) -> None:
+        encoded = content.encode()
+        self.chunks.append(b"data %d\n" % len(encoded))
+        self.chunks.append(encoded)
+        self.chunks.append(b"\n")
+
+    def commit(  # pylint: disable=too-many-arguments
+        self,
+        branch: str,
+        message: str,
+        files: List[Tuple[str, str]],
+        parent: int = 0,
+        merge: int = 0,
+    ) -> int:
+        self.mark += 1
+        self.timestamp += 60
+        identity = f"Synthetic <synthetic@example.com> {self.timestamp} +0000"
+        self.chunks.append(
+            f"commit refs/heads/{branch}\nmark :{self.mark}\n"
+            f"author {identity}\ncommitter {identity}\n".encode()
+        )
+        self.data(message)
+        if parent:
+            self.chunks.append(b"from :%d\n" % parent)
+        if merge:
+            self.chunks.append(b"merge :%d\n" % merge)
+        for path, content in files:
+            self.chunks.append(f"M 100644 inline {path}\n".encode())
+            self.data(content)
+        self.chunks.append(b"\n")
+        return self.mark
+
+    def reference(self, name: str, mark: int) -> None:
+        self.chunks.append(f"reset {name}\nfrom :{mark}\n\n".encode())
+
+
+class HistoryGenerator:
+    def __init__(self, shape: RepositoryShape) -> None:
+        self.shape = shape
+        self.random = random.Random(shape.seed)
+        self.writer = FastImportWriter()
+        # a revert cancels a former commit of the same scope
+        self.summaries: Dict[str, List[str]] = {}
+        self.count = 0
+
+    def message(self) -> Tuple[str, str]:
+        """returns the message and the directory of the next commit"""
+        shape = self.shape
+        self.count += 1
+        if self.random.random() < shape.common_ratio:
+            scope = "common"
+        else:
+            scope = self.random.choice(shape.services)
+
+        summaries = self.summaries.setdefault(scope, [])
+        draw = self.random.random()
+        if summaries and draw < shape.revert_ratio:
+            summary = f'Revert "{self.random.choice(summaries)}"'
+        elif draw < shape.revert_ratio + shape.unconventional_ratio:
+            summary = f"update {scope} number {self.count}"
+        else:
+            commit_type = self.random.choice(COMMIT_TYPES)
+            summary = f"{commit_type}({scope}): change number {self.count}"
+        summaries.append(summary)
+
+        body = [f"Details about the change {self.count} of {scope}."]
+        if self.random.random() < shape.jira_ratio:
+            project = "".join(self.random.choices("ABCDEFGH", k=3))
+            body.append(f"Refs: {project}-{self.random.randint(1, 9999)}")
+        return f"{summary}\n\n" + "\n\n".join(body) + "\n", f"core/{scope}"
+
+    def files(self, directory: str) -> List[Tuple[str, str]]:
+        name = f"module_{self.random.randrange(self.shape.files_per_service)}.py"
+        content = "".join(
+            f"value_{line} = {self.random.randint(0, 1_000_000)}\n"
+            for line in range(self.shape.diff_lines)
+        )
+        return [(f"{directory}/{name}", content)]
+
+    def commit(self, branch: str, parent: int = 0, merge: int = 0) -> int:
+        message, directory = self.message()
+        return self.writer.commit(
+            branch, message, self.files(directory), parent=parent, merge=merge
+        )
+
+    def generate(self) -> FastImportWriter:
+        shape = self.shape
+        head = self.commit("master")
+        release = 0
+        for index in range(1, shape.commits):
+            if shape.merge_every and index % shape.merge_every == 0:
+                tip = head
+                for _ in range(shape.branch_size):
+                    tip = self.commit(f"branch-{index}", parent=tip)
+                self.writer.chunks.append(f"reset refs/heads/branch-{index}\n".encode())
+                self.writer.chunks.append(b"\n")
+                head = self.writer.commit(
+                    "master",
+                    f"Merge branch 'branch-{index}'\n",
+                    [],
+                    parent=head,
+                    merge=tip,
+                )
+            else:
+                head = self.commit("master", parent=head)
+
+            if index % shape.tag_every == 0:
+                release += 1
+                self.tag(release, head)
+
+        self.writer.reference("refs/remotes/origin/master", head)
+        return self.writer
+
+    def tag(self, release: int, mark: int) -> None:
+        if self.shape.simple_tags:
+            self.writer.reference(f"refs/tags/1.{release}.0", mark)
+        for service in self.shape.services:
+            self.writer.reference(f"refs/tags/{service}/1.{release}.0", mark)
+
+
+def build_synthetic_repository(path: Path, shape: RepositoryShape) -> Path:
+    """Creates the repository described by the shape in path, and returns path"""
+    path.mkdir(parents=True, exist_ok=True)
+    subprocess.run(
+        ["git", "init", "--quiet", "--initial-branch=master", str(path)], check=True
+    )
+    subprocess.run(["git", "remote", "add", "origin", ORIGIN_URL], cwd=path, check=True)
+    writer = HistoryGenerator(shape).generate()
+    subprocess.run(
+        ["git", "fast-import", "--quiet"],
+        input=b"".join(writer.chunks),
+        cwd=path,
+        check=True,
+    )
+    subprocess.run(["git", "reset", "--quiet", "--hard"], cwd=path, check=True)
+    return path
@@ -0,0 +1,98 @@
+import json
+
+from changelog_generator.ai_cache import DirectorySummaryStore, FileSummaryStore
+from changelog_generator.ai_generator import (
+    SAFETY_SETTINGS,
+    CachedModel,
+    VertexModel,
+    generate_ai_summary,
+)
+
+from .fake_model import FakeModel
+
+DIFF = "diff --git a/cms/a.txt b/cms/a.txt\n+a change\n"
+
+
+def test_same_diff_is_summarized_once(tmp_path, monkeypatch):
+    # GIVEN
+    monkeypatch.setenv("VERTEX_CACHE", str(tmp_path / "summaries"))
+    model = FakeModel()
+
+    # WHEN
+    first = generate_ai_summary("cms", DIFF, model=model)
+    second = generate_ai_summary("cms", DIFF, model=model)
+    other = generate_ai_summary("cms", DIFF + "+another change\n", model=model)
+
+    # THEN
+    assert first == second
+    assert other != first
+    assert len(model.prompts) == 2
+
+
+def test_file_store_is_persisted(tmp_path):
+    # GIVEN
+    path = str(tmp_path / "cache" / "summaries.json")
+    model = FakeModel()
+    store = FileSummaryStore(path)
+    CachedModel(model, store).generate("a prompt")
+    store.flush()
+
+    # WHEN
+    cached_model = CachedModel(model, FileSummaryStore(path))
+    answer = cached_model.generate("a prompt")
+
+    # THEN
+    assert answer == "summary of 8 characters"
+    assert len(model.prompts) == 1
+    assert cached_model.stats() == {"hits": 1, "misses": 0}
+
+
+def test_file_stores_merged_once_flushed(tmp_path):
+    # GIVEN
+    path = tmp_path / "summaries.json"
+    first = FileSummaryStore(str(path))
+    second = FileSummaryStore(str(path))
+    first.put("first", "a summary")
+    second.put("second", "another summary")
+    assert not path.exists()
+
+    # WHEN
+    first.flush()
+    second.flush()
+
+    # THEN
+    assert json.loads(path.read_text()) == {
+        "first": "a summary",
+        "second": "another summary",
+    }
+    assert second.get("first") == "a summary"
+
+
+def test_key_depends_on_the_model(tmp_path, monkeypatch):
+    # GIVEN
+    store = DirectorySummaryStore(str(tmp_path))
+    flash = VertexModel("project", "location", "flash", "{}")
+    pro = VertexModel("project", "location", "pro", "{}")
+
+    # THEN
+    assert CachedModel(flash, store).key("prompt") != CachedModel(pro, store).key(
+        "prompt"
+    )
+    key = CachedModel(flash, store).key("prompt")
+    monkeypatch.setitem(SAFETY_SETTINGS, "HARM_CATEGORY_HARASSMENT", "BLOCK_NONE")
+    assert CachedModel(flash, store).key("prompt") != key
+
+
+def test_hit_does_not_build_the_client(tmp_path):
+    # GIVEN
+    store = DirectorySummaryStore(str(tmp_path))
+    model = VertexModel("project", "location", "flash", "not a service account key")
+    cached_model = CachedModel(model, store)
+    store.put(cached_model.key("a prompt"), "a cached summary")
+
+    # WHEN
+    answer = cached_model.generate("a prompt")
+
+    # THEN
+    assert answer == "a cached summary"
+    assert cached_model.stats() == {"hits": 1, "misses": 0}
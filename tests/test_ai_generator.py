@@ -0,0 +1,135 @@
+from changelog_generator.ai_generator import (
+    CHARS_PER_TOKEN,
+    generate_ai_summary,
+    get_reduce_prompt,
+    pack_chunks,
+    summarize,
+)
+from changelog_generator.repository_manager import RepositoryManager
+
+from .fake_model import FakeModel
+from .local_repository import LocalRepository
+
+
+def file_diff(name: str, lines: int) -> str:
+    header = f"diff --git a/{name} b/{name}\n"
+    return header + "".join(f"+line {line} of {name}\n" for line in range(lines))
+
+
+def test_pack_chunks_by_file():
+    # GIVEN
+    diffs = [file_diff(f"file_{index}", 10) for index in range(10)]
+    max_tokens = 3 * len(diffs[0]) // CHARS_PER_TOKEN + 1
+
+    # WHEN
+    chunks = list(pack_chunks(diffs, max_tokens))
+
+    # THEN
+    assert "".join(chunks) == "".join(diffs)
+    assert len(chunks) == 4
+    assert all(len(chunk) <= max_tokens * CHARS_PER_TOKEN for chunk in chunks)
+
+
+def test_pack_chunks_splits_a_large_file():
+    # GIVEN
+    diff = file_diff("large", 1000)
+
+    # WHEN
+    chunks = list(pack_chunks([diff], 100))
+
+    # THEN
+    assert "".join(chunks) == diff
+    assert len(chunks) > 1
+    assert all(chunk.endswith("\n") for chunk in chunks)
+
+
+def test_small_diff_in_a_single_prompt():
+    # GIVEN
+    model = FakeModel()
+    diff = file_diff("small", 5)
+
+    # WHEN
+    summary = summarize(model, "PROMPT", [diff])
+
+    # THEN
+    assert model.prompts == [f"PROMPT {diff}"]
+    assert summary == f"summary of {len(diff) + 7} characters"
+
+
+def test_large_diff_map_reduce():
+    # GIVEN
+    model = FakeModel(delay=0.01)
+    diffs = [file_diff(f"file_{index}", 50) for index in range(40)]
+
+    # WHEN
+    summary = summarize(model, "PROMPT", diffs, max_tokens=500, workers=3)
+
+    # THEN
+    assert len(model.prompts) > 2
+    assert 1 < model.max_running <= 3
+    reduce_prompt = model.prompts[-1]
+    assert reduce_prompt.startswith("PROMPT\n")
+    assert "summaries of its parts" in reduce_prompt
+    assert summary == f"summary of {len(reduce_prompt)} characters"
+    assert not any("PROMPT" in prompt for prompt in model.prompts[:-1])
+
+
+def test_summaries_merged_within_the_budget():
+    # GIVEN
+    max_tokens = 500
+    # each summary fills a chunk: none could be merged without being cut
+    model = FakeModel(answer_size=max_tokens * CHARS_PER_TOKEN)
+    diffs = [file_diff(f"file_{index}", 50) for index in range(10)]
+
+    # WHEN
+    summarize(model, "PROMPT", diffs, max_tokens=max_tokens)
+
+    # THEN
+    merge_prompts = [prompt for prompt in model.prompts if "Merge them" in prompt]
+    assert merge_prompts
+    prompt_size = len(get_reduce_prompt("PROMPT")) + 1
+    assert len(model.prompts[-1]) <= prompt_size + max_tokens * CHARS_PER_TOKEN
+    assert model.prompts[-1].startswith("PROMPT\n")
+
+
+def test_diff_not_read_without_model(monkeypatch):
+    # GIVEN
+    monkeypatch.delenv("VERTEX_PROJECT", raising=False)
+
+    def diffs():
+        raise AssertionError("the diff should not be read")
+        yield  # pylint: disable=unreachable
+
+    # WHEN
+    summary = generate_ai_summary("cms", diffs())
+
+    # THEN
+    assert summary is None
+
+
+def test_empty_diff():
+    # WHEN
+    summary = generate_ai_summary("cms", iter([]), model=FakeModel())
+
+    # THEN
+    assert summary == "No changes were provided in the diff"
+
+
+def test_repository_diff_by_file(local_repo: LocalRepository):
+    # GIVEN
+    local_repo.commit("feat(cms): initial", {"cms/a.txt": "1\n"})
+    local_repo.tag("1.0.0")
+    local_repo.commit("feat(cms): change", {"cms/a.txt": "2\n", "cms/b.txt": "1\n"})
+    local_repo.commit("feat(auth): change", {"auth/c.txt": "1\n"})
+    local_repo.tag("1.1.0")
+    repository = RepositoryManager(str(local_repo.path), filter_paths=["cms"])
+
+    # WHEN
+    diffs = list(repository.iter_diff_since_last_tag())
+
+    # THEN
+    assert [diff.split("\n", 1)[0] for diff in diffs] == [
+        "diff --git a/cms/a.txt b/cms/a.txt",
+        "diff --git a/cms/b.txt b/cms/b.txt",
+    ]
+    assert "".join(diffs) == repository.get_diff_since_last_tag + "\n"
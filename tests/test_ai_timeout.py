@@ -0,0 +1,57 @@
+import threading
+import time
+
+from changelog_generator import generator
+from changelog_generator.generator import generate
+
+from .local_repository import LocalRepository
+
+
+def build_release(local_repo: LocalRepository) -> None:
+    local_repo.commit("feat(cms): initial", {"cms/a.txt": "1"})
+    local_repo.tag("1.0.0")
+    local_repo.commit("fix(cms): a fix", {"cms/a.txt": "2"})
+    local_repo.tag("1.1.0")
+
+
+def test_summary_generated_while_reading_commits(local_repo, monkeypatch):
+    # GIVEN
+    build_release(local_repo)
+    threads = []
+
+    def generate_ai_summary(prefix, diff):
+        threads.append(threading.current_thread())
+        return f"summary of {len(''.join(diff))} characters"
+
+    monkeypatch.setattr(generator, "generate_ai_summary", generate_ai_summary)
+
+    # WHEN
+    changelog = generate(str(local_repo.path), ai_timeout=10)
+
+    # THEN
+    assert threads[0] is not threading.main_thread()
+    assert "## AI generated summary" in changelog
+    assert "summary of" in changelog
+
+
+def test_render_without_summary_on_timeout(local_repo, monkeypatch):
+    # GIVEN
+    build_release(local_repo)
+    released = threading.Event()
+
+    def generate_ai_summary(prefix, diff):
+        released.wait(10)
+        return "a late summary"
+
+    monkeypatch.setattr(generator, "generate_ai_summary", generate_ai_summary)
+
+    # WHEN
+    start = time.perf_counter()
+    changelog = generate(str(local_repo.path), ai_timeout=0.2)
+    duration = time.perf_counter() - start
+    released.set()
+
+    # THEN
+    assert duration < 5
+    assert "AI generated summary" not in changelog
+    assert "a fix" in changelog
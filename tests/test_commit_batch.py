@@ -0,0 +1,72 @@
+from changelog_generator.commit import Commit
+from changelog_generator.commit_batch import parse_commits
+from changelog_generator.generator import get_commit_trees, render_changelog
+
+SUMMARIES = [
+    "feat(cms): a feature",
+    "fix(cms): a fix with ABC-1 in the summary",
+    "revert: fix(cms): a fix",
+    'Revert "docs(readme): typo"',
+    "Revert something without header",
+    "revert(api): not a revert header",
+    "a random commit (with parentheses)",
+    "",
+    "chore(ci)): double parenthesis",
+]
+
+
+def make_records():
+    return [
+        (f"{index:040x}", summary, f"{summary}\n\nbody AB-{index} and FOO2-1\nXY-9\n")
+        for index, summary in enumerate(SUMMARIES)
+    ]
+
+
+def test_same_fields_as_commit():
+    # GIVEN
+    records = make_records()
+
+    # WHEN
+    parsed = parse_commits(records)
+
+    # THEN
+    for index, record in enumerate(records):
+        commit = Commit(*record)
+        row = parsed[index]
+        assert (
+            row.commit_type,
+            row.scope,
+            row.subject,
+            row.revert_summary,
+            row.jiras,
+        ) == (
+            commit.commit_type,
+            commit.scope,
+            commit.subject,
+            commit.revert_summary,
+            commit.jiras,
+        )
+        assert parsed.reverts[index] == (commit.revert_summary is not None)
+
+
+def test_same_changelog_as_commits():
+    # GIVEN
+    records = make_records()
+    context = {
+        "organization": "lumapps",
+        "repository": "changelog-generator",
+        "previous_tag": "1.0.0",
+        "current_tag": "1.1.0",
+        "ai_summary": None,
+    }
+
+    # WHEN
+    changelog = render_changelog(
+        commit_trees=get_commit_trees(parse_commits(records)), **context
+    )
+
+    # THEN
+    assert changelog == render_changelog(
+        commit_trees=get_commit_trees([Commit(*record) for record in records]),
+        **context,
+    )
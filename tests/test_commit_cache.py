@@ -0,0 +1,125 @@
+import sqlite3
+
+from changelog_generator import commit as commit_module
+from changelog_generator.commit_cache import CachedCommitReader, CommitCache
+from changelog_generator.commit_reader import GitLogCommitReader
+
+from .local_repository import LocalRepository
+
+
+def build_history(local_repo: LocalRepository) -> None:
+    local_repo.commit("feat(cms): first JIRA-1", {"cms/a.txt": "1"})
+    local_repo.commit('Revert "feat(cms): first JIRA-1"', {"cms/a.txt": "0"})
+    local_repo.commit("fix(common): second", {"common/b.txt": "1"})
+    local_repo.commit("chore: third\n\nrefs ABC-2", {"cms/a.txt": "2"})
+
+
+def to_tuples(commits):
+    return [
+        (
+            commit.sha1,
+            commit.summary,
+            commit.message,
+            commit.commit_type,
+            commit.scope,
+            commit.subject,
+            commit.revert_summary,
+            commit.jiras,
+        )
+        for commit in commits
+    ]
+
+
+def test_same_commits_with_the_cache(local_repo: LocalRepository, tmp_path):
+    # GIVEN
+    build_history(local_repo)
+    expected = to_tuples(
+        GitLogCommitReader(local_repo.repository).iter_commits("HEAD", ["cms/"])
+    )
+    cache = CommitCache(str(tmp_path / "cache.sqlite"))
+    reader = CachedCommitReader(local_repo.repository, cache)
+
+    # WHEN
+    first = to_tuples(reader.iter_commits("HEAD", ["cms/"]))
+    second = to_tuples(reader.iter_commits("HEAD", ["cms/"]))
+
+    # THEN
+    assert first == expected
+    assert second == expected
+    assert cache.get_paths(expected[0][0]) == [("cms/",)]
+
+
+def test_known_commits_are_not_parsed(local_repo, tmp_path, monkeypatch):
+    # GIVEN
+    build_history(local_repo)
+    path = str(tmp_path / "cache.sqlite")
+    reader = CachedCommitReader(local_repo.repository, CommitCache(path))
+    list(reader.iter_commits("HEAD"))
+    local_repo.commit("feat(cms): fourth", {"cms/a.txt": "3"})
+    parsed = []
+    get_jira_data = commit_module.Commit.get_jira_data
+
+    def track_parsing(commit):
+        parsed.append(commit.summary)
+        get_jira_data(commit)
+
+    monkeypatch.setattr(commit_module.Commit, "get_jira_data", track_parsing)
+
+    # WHEN
+    reader = CachedCommitReader(local_repo.repository, CommitCache(path))
+    commits = list(reader.iter_commits("HEAD"))
+
+    # THEN
+    assert len(commits) == 5
+    assert parsed == ["feat(cms): fourth"]
+
+
+def test_eviction(local_repo: LocalRepository, tmp_path):
+    # GIVEN
+    build_history(local_repo)
+    cache = CommitCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+
+    # WHEN
+    commits = list(
+        CachedCommitReader(local_repo.repository, cache).iter_commits("HEAD")
+    )
+
+    # THEN
+    assert len(commits) == 4
+    assert len(cache.get_many([commit.sha1 for commit in commits])) == 2
+
+
+def test_schema_version_reset(tmp_path):
+    # GIVEN
+    path = str(tmp_path / "cache.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE commits (sha1 TEXT)")
+    connection.execute("PRAGMA user_version=0")
+    connection.commit()
+    connection.close()
+
+    # WHEN
+    cache = CommitCache(path)
+
+    # THEN
+    assert cache.get_many(["0" * 40]) == {}
+
+
+def test_reads_do_not_wait_for_a_writer(local_repo: LocalRepository, tmp_path):
+    # GIVEN
+    build_history(local_repo)
+    path = str(tmp_path / "cache.sqlite")
+    cache = CommitCache(path, timeout=0.1)
+    reader = CachedCommitReader(local_repo.repository, cache)
+    shas = [commit.sha1 for commit in reader.iter_commits("HEAD")]
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+
+    # WHEN
+    commits = cache.get_many(shas)
+    writer.execute("ROLLBACK")
+    writer.close()
+
+    # THEN
+    assert set(commits) == set(shas)
+    assert cache.used == set(shas)
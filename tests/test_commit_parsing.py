@@ -0,0 +1,46 @@
+import pytest
+
+from changelog_generator.commit import Commit
+
+
+@pytest.mark.parametrize(
+    "summary, commit_type, scope, subject, revert_summary",
+    [
+        ("feat(cms): a feature", "feat", "cms", "a feature", None),
+        ("a random commit", "unknown", "any", "a random commit", None),
+        ("revert: fix(cms): a fix", "revert", "cms", "revert a fix", "fix(cms): a fix"),
+        (
+            'Revert "fix(cms): a fix"',
+            "revert",
+            "cms",
+            'revert a fix"',
+            '"fix(cms): a fix"',
+        ),
+    ],
+)
+def test_header(summary, commit_type, scope, subject, revert_summary):
+    # WHEN
+    commit = Commit("a" * 40, summary, summary)
+
+    # THEN
+    assert (commit.commit_type, commit.scope, commit.subject) == (
+        commit_type,
+        scope,
+        subject,
+    )
+    assert commit.revert_summary == revert_summary
+    assert (commit.revert and commit.revert.summary) == revert_summary
+
+
+def test_fields_are_parsed_on_first_access():
+    # GIVEN
+    commit = Commit("a" * 40, "feat(cms): a feature", "feat(cms): a feature\n\nAB-1")
+
+    # THEN
+    assert commit._header is None and commit._jiras is None
+    assert commit.short == "aaaaaaaa"
+    assert commit.jiras == ["AB-1"]
+    assert commit._header is None
+    assert commit.scope == "cms"
+    assert commit.revert is None
+    assert not hasattr(commit, "__dict__")
@@ -0,0 +1,50 @@
+from changelog_generator.commit_reader import GitLogCommitReader, GitPythonCommitReader
+
+from .local_repository import LocalRepository
+
+
+def build_history(local_repo: LocalRepository) -> None:
+    local_repo.commit("feat(cms): first", {"cms/a.txt": "a"})
+    local_repo.tag("1.0.0")
+    local_repo.checkout("feature", create=True)
+    local_repo.commit("fix(common): on a branch\n\nfixes ABC-12", {"common/b.txt": "b"})
+    local_repo.checkout("master")
+    local_repo.commit(
+        "feat(cms): multi\n\nline body\n\n\nwith trailing lines\n\n",
+        {"cms/a.txt": "b"},
+    )
+    local_repo.merge("feature")
+    local_repo.commit("docs(any): an empty commit é")
+    local_repo.tag("1.1.0")
+
+
+def to_tuples(commits):
+    return [(commit.sha1, commit.summary, commit.message) for commit in commits]
+
+
+def test_same_commits_as_gitpython(local_repo: LocalRepository):
+    # GIVEN
+    build_history(local_repo)
+
+    # WHEN
+    expected = GitPythonCommitReader(local_repo.repository).iter_commits("1.1.0")
+    commits = GitLogCommitReader(local_repo.repository).iter_commits("1.1.0")
+
+    # THEN
+    assert to_tuples(commits) == to_tuples(expected)
+
+
+def test_same_commits_as_gitpython_with_paths(local_repo: LocalRepository):
+    # GIVEN
+    build_history(local_repo)
+    reader = GitLogCommitReader(local_repo.repository)
+
+    # WHEN
+    expected = GitPythonCommitReader(local_repo.repository).iter_commits(
+        "1.0.0..1.1.0", ["cms/"]
+    )
+    commits = list(reader.iter_commits("1.0.0..1.1.0", ["cms/"]))
+
+    # THEN
+    assert to_tuples(commits) == to_tuples(expected)
+    assert [commit.subject for commit in commits] == ["multi"]
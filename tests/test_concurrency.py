@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from changelog_generator.concurrency import ordered_map, run_in_background
+
+
+def test_results_in_order():
+    # GIVEN
+    def slow_square(value: int) -> int:
+        time.sleep(0.01 * (5 - value % 5))
+        return value * value
+
+    # WHEN
+    results = list(ordered_map(slow_square, range(20), workers=4))
+
+    # THEN
+    assert results == [value * value for value in range(20)]
+
+
+def test_bounded_lookahead():
+    # GIVEN
+    consumed = []
+
+    def items():
+        for value in range(30):
+            consumed.append(value)
+            yield value
+
+    # WHEN
+    results = ordered_map(abs, items(), workers=3)
+    first = next(results)
+    # the consumer pauses, while the workers are done with the submitted items
+    time.sleep(0.05)
+    paused = len(consumed)
+    second = next(results)
+
+    # THEN
+    assert (first, second) == (0, 1)
+    assert paused == 2 * 3
+    assert len(consumed) == 2 * 3 + 1
+    assert list(results) == list(range(2, 30))
+
+
+def test_run_in_background():
+    # GIVEN
+    def fail() -> None:
+        raise ValueError("failed")
+
+    # WHEN
+    result = run_in_background(pow, 2, 10)
+    failure = run_in_background(fail)
+
+    # THEN
+    assert result.result(timeout=1) == 1024
+    with pytest.raises(ValueError):
+        failure.result(timeout=1)
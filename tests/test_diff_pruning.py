@@ -0,0 +1,151 @@
+from changelog_generator.diff_pruning import (
+    DEFAULT_EXCLUDED,
+    DiffPruning,
+    FileChange,
+    select_changes,
+)
+from changelog_generator.repository_manager import RepositoryManager
+
+from .local_repository import LocalRepository
+
+CODE = "".join(f"value_{line} = {line}\n" for line in range(20))
+
+
+def build_release(local_repo: LocalRepository) -> None:
+    local_repo.commit(
+        "feat(cms): initial",
+        {
+            "core/cms/a.py": CODE,
+            "core/cms/spaces.py": CODE,
+            "core/common/b.py": CODE,
+            "package-lock.json": "{}\n",
+        },
+    )
+    local_repo.tag("1.0.0")
+    local_repo.commit(
+        "feat(cms): change",
+        {
+            "core/cms/a.py": CODE.replace("= 1\n", "= 2\n"),
+            "core/cms/spaces.py": CODE.replace(" = ", "  =  "),
+            "core/common/b.py": CODE.replace("= 3\n", "= 4\n"),
+            "core/cms/logo.png": "\0\1\2",
+            "package-lock.json": '{"lockfileVersion": 3}\n',
+        },
+    )
+    local_repo.tag("1.1.0")
+
+
+def file_of(file_diff: str) -> str:
+    return file_diff.split("\n", 1)[0].rsplit(" b/", 1)[-1]
+
+
+def test_excluded_binary_and_whitespace_changes_left_out(
+    local_repo: LocalRepository, monkeypatch
+):
+    # GIVEN
+    build_release(local_repo)
+    monkeypatch.delenv("VERTEX_DIFF_EXCLUDE", raising=False)
+    monkeypatch.delenv("VERTEX_DIFF_MAX_TOKENS", raising=False)
+    repository = RepositoryManager(str(local_repo.path))
+
+    # WHEN
+    *file_diffs, note = repository.iter_diff("1.0.0..1.1.0", prefix="cms")
+
+    # THEN
+    assert [file_of(file_diff) for file_diff in file_diffs] == [
+        "core/cms/a.py",
+        "core/common/b.py",
+    ]
+    assert note == (
+        "\nFiles left out of this diff:\n"
+        "- core/cms/logo.png: binary\n"
+        "- package-lock.json: excluded\n"
+    )
+
+
+def test_files_of_the_prefix_first_within_the_budget(local_repo: LocalRepository):
+    # GIVEN
+    build_release(local_repo)
+    repository = RepositoryManager(str(local_repo.path))
+    revision = "1.0.0..1.1.0"
+
+    # WHEN
+    common_first = list(repository.iter_diff(revision, pruning=DiffPruning(())))
+    budgeted = list(
+        repository.iter_diff(
+            revision, prefix="common", pruning=DiffPruning((), max_tokens=100)
+        )
+    )
+
+    # THEN
+    assert [file_of(file_diff) for file_diff in common_first[:-1]] == [
+        "core/cms/a.py",
+        "core/common/b.py",
+        "package-lock.json",
+    ]
+    assert [file_of(file_diff) for file_diff in budgeted[:-1]] == ["core/common/b.py"]
+    assert "- core/cms/a.py (+1 -1): over the budget\n" in budgeted[-1]
+
+
+def test_renamed_file_diffed_as_listed(local_repo: LocalRepository):
+    # GIVEN
+    local_repo.commit("feat(cms): initial", {"a.txt": CODE})
+    local_repo.tag("1.0.0")
+    local_repo.repository.git.mv("a.txt", "b.txt")
+    # few lines, but long ones: the estimation keeps it and its diff is over the budget
+    local_repo.commit("feat(cms): renamed", {"zzz.txt": f"{'z' * 500}\n" * 10})
+    local_repo.tag("1.1.0")
+    local_repo.repository.git.config("diff.renames", "copies")
+    order_file = local_repo.path / ".git" / "order"
+    order_file.write_text("zzz.txt\n")
+    local_repo.repository.git.config("diff.orderFile", str(order_file))
+    local_repo.repository.git.config("diff.noprefix", "true")
+    repository = RepositoryManager(str(local_repo.path))
+
+    # WHEN
+    *file_diffs, note = repository.iter_diff(
+        "1.0.0..1.1.0", pruning=DiffPruning((), max_tokens=1000)
+    )
+
+    # THEN
+    assert [file_of(file_diff) for file_diff in file_diffs] == ["a.txt", "b.txt"]
+    assert file_diffs[0].count("\n-value_") == 20
+    assert (
+        note == "\nFiles left out of this diff:\n- zzz.txt (+10 -0): over the budget\n"
+    )
+
+
+def test_select_changes_ranks_the_service_before_the_common_layer():
+    # GIVEN
+    changes = [
+        FileChange("core/common/small.py", 1, 0),
+        FileChange("core/cms/large.py", 30, 10),
+        FileChange("core/cms/small.py", 2, 1),
+        FileChange("core/search/medium.py", 10, 0),
+        FileChange("yarn.lock", reason="excluded"),
+    ]
+
+    # WHEN
+    (own, common), left_out = select_changes(changes, "cms", max_size=3200)
+
+    # THEN
+    assert [change.path for change in own] == ["core/cms/large.py", "core/cms/small.py"]
+    assert [change.path for change in common] == ["core/common/small.py"]
+    assert [(change.path, change.reason) for change in left_out] == [
+        ("yarn.lock", "excluded"),
+        ("core/search/medium.py", "over the budget"),
+    ]
+
+
+def test_pruning_from_environment(monkeypatch):
+    # GIVEN
+    monkeypatch.setenv("VERTEX_DIFF_MAX_TOKENS", "1000")
+    monkeypatch.delenv("VERTEX_DIFF_EXCLUDE", raising=False)
+
+    # THEN
+    assert DiffPruning.from_environment() == DiffPruning(DEFAULT_EXCLUDED, 1000)
+    assert DiffPruning.from_environment().max_size == 4000
+    monkeypatch.setenv("VERTEX_DIFF_EXCLUDE", "*.lock,docs/")
+    assert DiffPruning.from_environment().excluded == ("*.lock", "docs/")
+    monkeypatch.setenv("VERTEX_DIFF_EXCLUDE", "")
+    assert DiffPruning.from_environment().excluded == ()
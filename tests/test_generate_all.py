@@ -0,0 +1,75 @@
+import pytest
+
+from changelog_generator.generator import generate, generate_all
+
+from .local_repository import LocalRepository
+
+
+def build_releases(local_repo: LocalRepository) -> None:
+    local_repo.commit("feat(cms): initial", {"cms/a.txt": "1"})
+    local_repo.tag("1.0.0")
+    local_repo.commit("fix(cms): first fix JIRA-1", {"cms/a.txt": "2"})
+    local_repo.checkout("feature", create=True)
+    local_repo.commit("feat(common): shared", {"common/b.txt": "1"})
+    local_repo.commit("docs(cms): documented", {"cms/README": "1"})
+    local_repo.checkout("master")
+    local_repo.commit("feat(other): elsewhere", {"other/c.txt": "1"})
+    local_repo.merge("feature")
+    local_repo.tag("1.1.0")
+    local_repo.tag("1.1.1")
+    local_repo.commit('Revert "fix(cms): first fix"', {"cms/a.txt": "1"})
+    local_repo.tag("1.2.0")
+
+
+@pytest.mark.parametrize("filter_paths", [[], ["cms/"], ["common", "other/"]])
+def test_same_output_as_one_generate_per_pair(local_repo, filter_paths):
+    # GIVEN
+    build_releases(local_repo)
+    path = str(local_repo.path)
+    tags = ["1.0.0", "1.1.0", "1.1.1", "1.2.0"]
+
+    # WHEN
+    changelogs = list(generate_all(path, tags, filter_paths))
+
+    # THEN
+    assert changelogs == [
+        (target, generate(path, target=target, filter_paths=filter_paths))
+        for target in ("1.0.0..1.1.0", "1.1.0..1.1.1", "1.1.1..1.2.0")
+    ]
+
+
+def test_tags_out_of_the_main_line(local_repo: LocalRepository):
+    # GIVEN
+    build_releases(local_repo)
+    local_repo.checkout("hotfix", create=True)
+    local_repo.commit("fix(cms): hotfix", {"cms/a.txt": "3"})
+    local_repo.tag("1.2.1")
+    local_repo.checkout("master")
+    local_repo.commit("feat(cms): next", {"cms/a.txt": "4"})
+    local_repo.tag("1.3.0")
+    path = str(local_repo.path)
+    tags = ["1.1.0", "1.2.0", "1.2.1", "1.3.0"]
+
+    # WHEN
+    changelogs = list(generate_all(path, tags))
+
+    # THEN
+    assert changelogs == [
+        (target, generate(path, target=target))
+        for target in ("1.1.0..1.2.0", "1.2.0..1.2.1", "1.2.1..1.3.0")
+    ]
+    assert "next" in changelogs[2][1]
+    assert "hotfix" not in changelogs[2][1]
+
+
+def test_concurrent_generation(local_repo: LocalRepository):
+    # GIVEN
+    build_releases(local_repo)
+    path = str(local_repo.path)
+    tags = ["1.0.0", "1.1.0", "1.1.1", "1.2.0"]
+
+    # WHEN
+    changelogs = list(generate_all(path, tags, jobs=3))
+
+    # THEN
+    assert changelogs == list(generate_all(path, tags))
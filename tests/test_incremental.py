@@ -0,0 +1,129 @@
+import json
+
+from changelog_generator.generator import generate
+from changelog_generator.incremental import (
+    generate_incremental,
+    patch_changelog,
+    write_changelog_file,
+)
+
+from .local_repository import LocalRepository
+
+TARGET = "1.0.0..HEAD"
+
+
+def build_release(local_repo: LocalRepository) -> None:
+    local_repo.commit("feat(cms): initial", {"cms/a.txt": "1"})
+    local_repo.tag("1.0.0")
+    local_repo.commit("fix(cms): a fix JIRA-1", {"cms/a.txt": "2"})
+    local_repo.commit("feat(auth): a feature", {"auth/b.txt": "1"})
+
+
+def test_same_output_as_generate(local_repo, tmp_path):
+    # GIVEN
+    build_release(local_repo)
+    path = str(local_repo.path)
+    state = str(tmp_path / "state.json")
+    generate_incremental(path, state, target=TARGET)
+    local_repo.commit('Revert "fix(cms): a fix"', {"cms/a.txt": "1"})
+
+    # WHEN
+    target, changelog = generate_incremental(path, state, target=TARGET)
+
+    # THEN
+    assert target == TARGET
+    assert changelog == generate(path, target=TARGET)
+
+
+def test_only_new_commits_are_read(local_repo, tmp_path):
+    # GIVEN
+    build_release(local_repo)
+    path = str(local_repo.path)
+    state_path = tmp_path / "state.json"
+    generate_incremental(path, str(state_path), target=TARGET)
+    state = json.loads(state_path.read_text())
+    state["entries"][0][5] = "a feature, as recorded in the state"
+    state_path.write_text(json.dumps(state))
+    local_repo.commit("feat(cms): a new feature", {"cms/a.txt": "3"})
+
+    # WHEN
+    _, changelog = generate_incremental(path, str(state_path), target=TARGET)
+
+    # THEN
+    assert "a new feature" in changelog
+    assert "a feature, as recorded in the state" in changelog
+
+
+def test_native_commit_backend(local_repo, tmp_path):
+    # GIVEN
+    build_release(local_repo)
+    path = str(local_repo.path)
+    state = str(tmp_path / "state.json")
+    generate_incremental(path, state, target=TARGET, commit_backend="native")
+    local_repo.commit("feat(cms): a new feature", {"cms/a.txt": "3"})
+
+    # WHEN
+    _, changelog = generate_incremental(
+        path, state, target=TARGET, commit_backend="native"
+    )
+
+    # THEN
+    assert changelog == generate(path, target=TARGET)
+
+
+def test_rewritten_history_is_rebuilt(local_repo, tmp_path):
+    # GIVEN
+    build_release(local_repo)
+    path = str(local_repo.path)
+    state = str(tmp_path / "state.json")
+    generate_incremental(path, state, target=TARGET)
+    local_repo.repository.git.reset("--hard", "HEAD~1")
+    local_repo.commit("feat(auth): rewritten", {"auth/b.txt": "2"})
+
+    # WHEN
+    _, changelog = generate_incremental(path, state, target=TARGET)
+
+    # THEN
+    assert changelog == generate(path, target=TARGET)
+    assert "a feature" not in changelog
+
+
+def test_patch_changelog_file(local_repo, tmp_path):
+    # GIVEN
+    build_release(local_repo)
+    path = str(local_repo.path)
+    state = str(tmp_path / "state.json")
+    changelog_file = tmp_path / "CHANGELOG.md"
+    changelog_file.write_text("# Older releases\n")
+
+    # WHEN
+    write_changelog_file(
+        str(changelog_file), *generate_incremental(path, state, TARGET)
+    )
+    local_repo.commit("feat(cms): a new feature", {"cms/a.txt": "3"})
+    write_changelog_file(
+        str(changelog_file), *generate_incremental(path, state, TARGET)
+    )
+
+    # THEN
+    text = changelog_file.read_text()
+    assert text.count("<!-- changelog-generator 1.0.0..HEAD -->") == 1
+    assert "a new feature" in text
+    assert text.endswith(" -->\n\n# Older releases\n")
+
+
+def test_patch_changelog():
+    # GIVEN
+    text = patch_changelog("", "1.0.0..1.1.0", "# 1.1.0\n")
+
+    # WHEN
+    text = patch_changelog(text, "1.1.0..1.2.0", "# 1.2.0\n")
+    text = patch_changelog(text, "1.0.0..1.1.0", "# 1.1.0 again\n")
+
+    # THEN
+    assert text == (
+        "<!-- changelog-generator 1.1.0..1.2.0 -->\n# 1.2.0\n"
+        "<!-- /changelog-generator 1.1.0..1.2.0 -->\n\n"
+        "<!-- changelog-generator 1.0.0..1.1.0 -->\n# 1.1.0 again\n"
+        "<!-- /changelog-generator 1.0.0..1.1.0 -->\n"
+    )
@@ -0,0 +1,149 @@
+import pytest
+from git import Repo
+
+from changelog_generator.commit_reader import GitLogCommitReader
+from changelog_generator.native_reader import (
+    NativeCommitReader,
+    NativeReaderError,
+    apply_delta,
+)
+from changelog_generator.repository_manager import RepositoryManager
+
+from .local_repository import START_TIMESTAMP, LocalRepository
+from .test_commit_reader import build_history, to_tuples
+
+REVISIONS = [
+    "1.1.0",
+    "HEAD",
+    "master",
+    "1.0.0..1.1.0",
+    "1.0.0..",
+    ["1.1.0", "^1.0.0"],
+    ["1.1.0", "^feature"],
+    "feature..master",
+]
+
+
+def assert_same_commits(repository: Repo, revisions) -> None:
+    for revision in revisions:
+        expected = GitLogCommitReader(repository).iter_commits(revision)
+        commits = NativeCommitReader(repository).read_commits(revision)
+        assert to_tuples(commits) == to_tuples(expected), revision
+
+
+def test_same_commits_as_git_log_from_loose_objects(local_repo: LocalRepository):
+    # GIVEN
+    build_history(local_repo)
+    local_repo.repository.git.tag("-a", "annotated", "-m", "an annotated tag", "1.1.0")
+
+    # THEN
+    assert_same_commits(local_repo.repository, [*REVISIONS, "annotated"])
+
+
+def test_same_commits_as_git_log_from_packs(local_repo: LocalRepository):
+    # GIVEN
+    build_history(local_repo)
+    local_repo.repository.git.gc("--aggressive", "--quiet")
+
+    # THEN
+    assert_same_commits(local_repo.repository, REVISIONS)
+
+
+def test_same_commits_as_git_log_with_commit_graph(synthetic_repo, tmp_path):
+    # GIVEN
+    repository = Repo.clone_from(synthetic_repo.working_dir, tmp_path / "clone")
+    repository.git.commit_graph("write", "--reachable")
+    tags = [f"1.{minor}.0" for minor in range(1, 10)]
+
+    # THEN
+    assert_same_commits(
+        repository,
+        [
+            "HEAD",
+            "origin/master",
+            "cms/1.3.0..search/1.8.0",
+            [tags[-1], f"^{tags[2]}", "^cms/1.5.0"],
+            *(f"{previous}..{current}" for previous, current in zip(tags, tags[1:])),
+        ],
+    )
+
+
+def test_same_order_on_equal_commit_dates(local_repo: LocalRepository):
+    # GIVEN
+    local_repo.commit("feat(cms): first")
+    local_repo.tag("1.0.0")
+    for branch in ("one", "two"):
+        local_repo.checkout(branch, create=True)
+        for index in range(3):
+            local_repo.timestamp = START_TIMESTAMP
+            local_repo.commit(f"fix(cms): {branch} {index}")
+        local_repo.checkout("master")
+    for branch in ("one", "two"):
+        local_repo.timestamp = START_TIMESTAMP - 60
+        local_repo.merge(branch)
+    local_repo.tag("1.1.0")
+
+    # THEN
+    assert_same_commits(local_repo.repository, REVISIONS[:4])
+
+
+def test_fallback_to_git_log(local_repo: LocalRepository):
+    # GIVEN
+    build_history(local_repo)
+    reader = NativeCommitReader(local_repo.repository)
+    cli_reader = GitLogCommitReader(local_repo.repository)
+
+    # WHEN
+    with pytest.raises(NativeReaderError):
+        reader.read_commits("1.1.0~1")
+    with pytest.raises(NativeReaderError):
+        reader.read_commits("1.0.0...1.1.0")
+
+    # THEN
+    for revision, paths in [("1.1.0~1", ()), ("1.0.0..1.1.0", ["cms/"])]:
+        assert to_tuples(reader.iter_commits(revision, paths)) == to_tuples(
+            cli_reader.iter_commits(revision, paths)
+        )
+
+
+def test_fallback_on_shallow_clone(local_repo: LocalRepository, tmp_path):
+    # GIVEN
+    build_history(local_repo)
+    repository = Repo.clone_from(
+        f"file://{local_repo.path}", tmp_path / "shallow", depth=2
+    )
+    reader = NativeCommitReader(repository)
+
+    # WHEN
+    commits = list(reader.iter_commits("HEAD"))
+
+    # THEN
+    assert not reader.supported
+    assert to_tuples(commits) == to_tuples(
+        GitLogCommitReader(repository).iter_commits("HEAD")
+    )
+
+
+def test_apply_delta():
+    # GIVEN
+    base = b"tree abc\n\nfeat(cms): a feature"
+    # target size 28: copy 21 bytes at 0, insert 7 bytes
+    delta = bytes([len(base), 28, 0x90, 21, 7]) + b"a fixes"
+
+    # THEN
+    assert apply_delta(base, delta) == b"tree abc\n\nfeat(cms): a fixes"
+
+
+def test_repository_manager_backend(local_repo: LocalRepository):
+    # GIVEN
+    build_history(local_repo)
+
+    # WHEN
+    native = RepositoryManager(str(local_repo.path), commit_backend="native")
+    default = RepositoryManager(str(local_repo.path))
+
+    # THEN
+    assert isinstance(native.commit_reader, NativeCommitReader)
+    assert to_tuples(native.commits_since_last_tag) == to_tuples(
+        default.commits_since_last_tag
+    )
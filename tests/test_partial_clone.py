@@ -0,0 +1,86 @@
+from git import Repo
+
+from changelog_generator.partial_clone import is_partial, is_shallow
+from changelog_generator.repository_manager import RepositoryManager
+
+from .local_repository import LocalRepository
+
+
+def build_releases(local_repo: LocalRepository, releases: int = 4) -> None:
+    for release in range(releases):
+        for index in range(30):
+            local_repo.commit(
+                f"feat(cms): feature {release}.{index}",
+                {"cms/a.txt": f"{release}.{index}\n", f"cms/{index}.txt": f"{release}"},
+            )
+        local_repo.tag(f"1.{release}.0")
+    local_repo.repository.git.config("uploadpack.allowFilter", "true")
+
+
+def clone(local_repo: LocalRepository, path, **options) -> Repo:
+    return Repo.clone_from(f"file://{local_repo.path}", path, **options)
+
+
+def count_commits(repository: Repo) -> int:
+    return int(repository.git.rev_list("--count", "HEAD"))
+
+
+def test_shallow_clone_deepened_to_the_previous_tag(local_repo, tmp_path):
+    # GIVEN
+    build_releases(local_repo)
+    repository = clone(local_repo, tmp_path / "shallow", depth=1)
+    assert is_shallow(repository)
+    expected = RepositoryManager(str(local_repo.path))
+
+    # WHEN
+    manager = RepositoryManager(str(tmp_path / "shallow"))
+
+    # THEN
+    assert (manager.previous_tag, manager.current_tag) == ("1.2.0", "1.3.0")
+    assert [commit.sha1 for commit in manager.commits_since_last_tag] == [
+        commit.sha1 for commit in expected.commits_since_last_tag
+    ]
+    assert is_shallow(repository)
+    assert count_commits(repository) < count_commits(local_repo.repository)
+    assert "1.1.0" not in repository.git.tag("--list").split()
+
+
+def test_shallow_clone_deepened_to_the_target(local_repo, tmp_path):
+    # GIVEN
+    build_releases(local_repo)
+    clone(local_repo, tmp_path / "shallow", depth=1)
+    expected = RepositoryManager(str(local_repo.path))
+
+    # WHEN
+    manager = RepositoryManager(str(tmp_path / "shallow"))
+    commits = manager.from_target("1.1.0..1.2.0")
+
+    # THEN
+    assert len(commits) == 30
+    assert [commit.sha1 for commit in commits] == [
+        commit.sha1 for commit in expected.from_target("1.1.0..1.2.0")
+    ]
+
+
+def test_blobs_fetched_when_the_diff_is_read(local_repo, tmp_path):
+    # GIVEN
+    build_releases(local_repo)
+    repository = clone(local_repo, tmp_path / "partial", filter="blob:none")
+    assert is_partial(repository)
+    expected = RepositoryManager(str(local_repo.path))
+
+    def count_missing() -> int:
+        return repository.git.rev_list("--objects", "--missing=print", "1.0.0").count(
+            "?"
+        )
+
+    missing = count_missing()
+
+    # WHEN
+    manager = RepositoryManager(str(tmp_path / "partial"))
+    diff = manager.iter_diff("1.0.0..1.1.0")
+    assert count_missing() == missing
+
+    # THEN
+    assert list(diff) == list(expected.iter_diff("1.0.0..1.1.0"))
+    assert count_missing() < missing
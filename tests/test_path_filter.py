@@ -0,0 +1,99 @@
+import pytest
+
+from changelog_generator.path_filter import PathFilter
+
+from .local_repository import LocalRepository
+
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+FILES = [
+    "src/main.py",
+    "src/lib/util.py",
+    "srcx/other.py",
+    "doc/index.md",
+    "docs",
+    "tests/unit/qa/test_a.py",
+    "tests/unit/deep/qa/test_b.py",
+    "tests/qa/test_c.py",
+    "core/cms/api/views.py",
+    "core/cms.py",
+    "core/common/models.py",
+    "core/search/index.py",
+    "README.md",
+    "a[b]/weird.txt",
+    "setup.cfg",
+]
+PATHSPECS = [
+    "src/",
+    "src",
+    "doc/",
+    "docs",
+    "tests/*/qa/*",
+    "tests/*",
+    "core/cms",
+    "core/cm?",
+    "core/c*s/*.py",
+    "core/c*",
+    "*.md",
+    "*.py",
+    "co*_b.py",
+    "core/[cs]*/*",
+    "core/[!c]*",
+    "core/[^c]*",
+    "README.md",
+    "core",
+    "core/",
+    ".",
+]
+
+
+@pytest.fixture(scope="module")
+def files_repo(tmp_path_factory) -> LocalRepository:
+    local_repo = LocalRepository(tmp_path_factory.mktemp("path_filter") / "repository")
+    local_repo.commit("feat: files", {name: name for name in FILES})
+    return local_repo
+
+
+def git_matches(local_repo: LocalRepository, pathspec: str) -> set:
+    """the files of the first commit as `git log -- pathspec` filters them"""
+    output = local_repo.repository.git.diff(
+        "--name-only", "--no-renames", EMPTY_TREE, "HEAD", "--", pathspec
+    )
+    return set(output.splitlines())
+
+
+@pytest.mark.parametrize("pathspec", PATHSPECS)
+def test_same_matches_as_git(files_repo, pathspec):
+    # GIVEN
+    path_filter = PathFilter([pathspec])
+
+    # WHEN
+    matches = {path for path in FILES if path_filter.match(path)}
+
+    # THEN
+    assert matches == git_matches(files_repo, pathspec)
+
+
+def test_same_matches_as_git_for_several_pathspecs(files_repo):
+    # GIVEN
+    pathspecs = ["src/", "doc/", "tests/*/qa/*"]
+    path_filter = PathFilter(pathspecs)
+
+    # WHEN
+    matches = {path for path in FILES if path_filter.match(path)}
+
+    # THEN
+    expected = set.union(*(git_matches(files_repo, spec) for spec in pathspecs))
+    assert matches == expected
+
+
+def test_classify_in_groups():
+    # GIVEN
+    path_filter = PathFilter(["core/cms", "core/common"], ["core/search"], ["*.md"], [])
+
+    # WHEN
+    groups = path_filter.classify(["core/common/models.py", "README.md"])
+
+    # THEN
+    assert groups == {0, 2, 3}
+    assert path_filter.classify(["core/search/index.py"]) == {1, 3}
+    assert path_filter.classify([]) == set()
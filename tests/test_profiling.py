@@ -0,0 +1,119 @@
+import json
+import sys
+
+import pytest
+from git.cmd import Git
+
+from changelog_generator import __main__, generator, profiling
+from changelog_generator.generator import generate
+
+from .local_repository import LocalRepository
+
+
+def build_release(local_repo: LocalRepository) -> None:
+    local_repo.commit("feat(cms): initial", {"cms/a.txt": "1"})
+    local_repo.tag("1.0.0")
+    local_repo.commit("fix(cms): a fix", {"cms/a.txt": "2"})
+    local_repo.tag("1.1.0")
+
+
+def test_disabled_profiling_is_a_no_op():
+    # GIVEN
+    execute = Git.execute
+
+    # WHEN
+    with profiling.span("stage"):
+        profiling.count("calls")
+    chunks = ["a", "b"]
+
+    # THEN
+    assert profiling.PROFILER is None
+    assert profiling.span("stage") is profiling.NO_SPAN
+    assert profiling.profile_stream("render", chunks) is chunks
+    assert profiling.disable() is None
+    assert Git.execute is execute
+
+
+def test_spans_and_git_calls_recorded(local_repo, monkeypatch):
+    # GIVEN
+    build_release(local_repo)
+    monkeypatch.setattr(
+        generator, "generate_ai_summary", lambda prefix, diff: "".join(diff or "")
+    )
+    execute = Git.execute
+
+    # WHEN
+    profiling.enable()
+    try:
+        changelog = generate(str(local_repo.path))
+    finally:
+        report = profiling.disable()
+
+    # THEN
+    assert "a fix" in changelog
+    assert Git.execute is execute
+    names = {span["name"] for span in report["spans"]}
+    assert {"repository", "tags", "commits", "grouping", "ai_summary", "ai_wait"} <= (
+        names
+    )
+    assert "render" in names
+    for span in report["spans"]:
+        assert span["wall"] >= 0 and span["cpu"] >= 0
+    assert report["counters"]["git.calls"] > 0
+    assert report["counters"]["git.bytes"] > 0
+    assert report["peak_rss_kib"] > 0
+
+
+def test_main_writes_the_report(local_repo, monkeypatch, capsys):
+    # GIVEN
+    build_release(local_repo)
+    monkeypatch.chdir(local_repo.path)
+    monkeypatch.setattr(generator, "generate_ai_summary", lambda prefix, diff: None)
+    monkeypatch.setattr(sys, "argv", ["changelog_generator", "--profile", "-"])
+
+    # WHEN
+    __main__.main()
+
+    # THEN
+    captured = capsys.readouterr()
+    assert "a fix" in captured.out
+    report = json.loads(captured.err)
+    assert report["spans"][0]["name"] == "total"
+    assert profiling.PROFILER is None
+
+
+def test_main_dumps_the_cprofile(local_repo, monkeypatch, tmp_path):
+    # GIVEN
+    build_release(local_repo)
+    monkeypatch.chdir(local_repo.path)
+    monkeypatch.setattr(generator, "generate_ai_summary", lambda prefix, diff: None)
+    monkeypatch.setattr(sys, "argv", ["changelog_generator"])
+    monkeypatch.setenv("CHANGELOG_PROFILE", str(tmp_path / "profile.json"))
+    monkeypatch.setenv("CHANGELOG_CPROFILE", str(tmp_path / "profile.prof"))
+
+    # WHEN
+    __main__.main()
+
+    # THEN
+    with open(tmp_path / "profile.json") as stream:
+        assert json.load(stream)["counters"]["git.calls"] > 0
+    assert (tmp_path / "profile.prof").stat().st_size > 0
+
+
+@pytest.mark.parametrize("value", ["0", "false", "No", "off"])
+def test_main_without_profile(local_repo, monkeypatch, capsys, value):
+    # GIVEN
+    build_release(local_repo)
+    monkeypatch.chdir(local_repo.path)
+    monkeypatch.setattr(generator, "generate_ai_summary", lambda prefix, diff: None)
+    monkeypatch.setattr(sys, "argv", ["changelog_generator"])
+    monkeypatch.setenv("CHANGELOG_PROFILE", value)
+    monkeypatch.delenv("CHANGELOG_CPROFILE", raising=False)
+
+    # WHEN
+    __main__.main()
+
+    # THEN
+    assert "a fix" in capsys.readouterr().out
+    assert not (local_repo.path / value).exists()
+    assert profiling.PROFILER is None
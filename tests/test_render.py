@@ -0,0 +1,117 @@
+import os
+
+from changelog_generator.commit import Commit
+from changelog_generator.generator import (
+    get_commit_trees,
+    get_template,
+    limit_bytes,
+    render_changelog,
+    stream_changelog,
+)
+
+COMMITS = [
+    Commit("a" * 40, "feat(cms): a feature ABC-1", "feat(cms): a feature ABC-1"),
+    Commit("b" * 40, "fix(cms): a fix", "fix(cms): a fix\n\nfixes DEF-2"),
+    Commit("c" * 40, "a random commit", "a random commit"),
+]
+CONTEXT = {
+    "organization": "lumapps",
+    "repository": "changelog-generator",
+    "previous_tag": "1.0.0",
+    "current_tag": "1.1.0",
+    "commit_trees": get_commit_trees(COMMITS),
+    "ai_summary": None,
+}
+
+
+def test_stream_is_the_rendered_changelog():
+    # WHEN
+    changelog = render_changelog(**CONTEXT)
+    chunks = list(stream_changelog(**CONTEXT))
+
+    # THEN
+    assert len(chunks) > 1
+    assert "".join(chunks) == changelog
+    assert "[ABC-1](https://lumapps.atlassian.net/browse/ABC-1)" in changelog
+
+
+def test_templates_are_compiled_once(tmp_path):
+    # GIVEN
+    template = tmp_path / "custom.jinja"
+    template.write_text(
+        "{{ current_tag }}:{% for tree in commit_trees %} {{ tree.commits|length }}"
+        "{% endfor %}"
+    )
+
+    # WHEN
+    changelog = render_changelog(**CONTEXT, template=str(template))
+
+    # THEN
+    assert changelog == "1.1.0: 1 1 1"
+    assert get_template(str(template)) is get_template(str(template))
+    assert get_template() is get_template(None)
+
+
+def test_edited_template_is_reloaded(tmp_path):
+    # GIVEN
+    template = tmp_path / "custom.jinja"
+    template.write_text("first {{ current_tag }}")
+    assert render_changelog(**CONTEXT, template=str(template)) == "first 1.1.0"
+
+    # WHEN
+    template.write_text("second {{ current_tag }}")
+    mtime = template.stat().st_mtime + 10
+    os.utime(template, (mtime, mtime))
+
+    # THEN
+    assert render_changelog(**CONTEXT, template=str(template)) == "second 1.1.0"
+
+
+def test_budget_shares_the_bytes_between_sections():
+    # GIVEN
+    commits = (
+        [
+            Commit(f"{index:040x}", f"feat(cms): feature {index}", "")
+            for index in range(200)
+        ]
+        + [
+            Commit(f"{index:040x}", f"fix(cms): fix {index} é", "")
+            for index in range(300)
+        ]
+        + [COMMITS[2]]
+    )
+    context = {**CONTEXT, "commit_trees": get_commit_trees(commits)}
+
+    # WHEN
+    full = render_changelog(**context)
+    changelog = render_changelog(**context, max_bytes=10_000)
+
+    # THEN
+    assert len(full.encode()) > 50_000
+    assert len(changelog.encode()) <= 10_000
+    assert "a random commit" in changelog
+    features = changelog.count("feature ")
+    fixes = changelog.count("**: fix ")
+    assert 10 < features and 10 < fixes and abs(features - fixes) <= 2
+    assert (
+        f"* +{200 - features} more commits ([compare](https://github.com" in changelog
+    )
+    assert f"* +{300 - fixes} more commits" in changelog
+    assert render_changelog(**context, max_bytes=len(full.encode())) == full
+
+
+def test_limit_bytes_cuts_at_a_line():
+    # GIVEN
+    read = []
+
+    def chunks():
+        for chunk in ("abc\n", "dé\nfé", "ghi"):
+            read.append(chunk)
+            yield chunk
+
+    # WHEN
+    changelog = "".join(limit_bytes(chunks(), 8))
+
+    # THEN
+    assert changelog == "abc\ndé\n"
+    assert read == ["abc\n", "dé\nfé"]
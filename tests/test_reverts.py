@@ -0,0 +1,78 @@
+from changelog_generator.commit import Commit
+from changelog_generator.commit_batch import parse_commits
+from changelog_generator.sections import get_cancelled_reverts, get_commit_trees
+
+FIX = "fix(cms): a fix"
+
+
+def make_commits(*summaries: str, messages=None):
+    """the commits of the summaries, given from the oldest, in the git log order"""
+    messages = messages or {}
+    return [
+        Commit(f"{index:040x}", summary, messages.get(index, summary))
+        for index, summary in reversed(list(enumerate(summaries)))
+    ]
+
+
+def kept_summaries(commits) -> list:
+    trees = get_commit_trees(commits)
+    parsed_trees = get_commit_trees(
+        parse_commits(
+            [(commit.sha1, commit.summary, commit.message) for commit in commits]
+        )
+    )
+    summaries = [commit.summary for tree in trees for commit in tree.commits]
+    assert summaries == [
+        commit.summary for tree in parsed_trees for commit in tree.commits
+    ]
+    return summaries
+
+
+def test_revert_cancels_the_commit_of_its_summary():
+    # GIVEN
+    commits = make_commits("feat(cms): a feature", FIX, f'Revert "{FIX}"')
+
+    # THEN
+    assert kept_summaries(commits) == ["feat(cms): a feature"]
+
+
+def test_revert_cancels_the_commit_of_its_message():
+    # GIVEN
+    commits = make_commits(
+        FIX,
+        "revert: the fix",
+        messages={1: f"revert: the fix\n\nThis reverts commit {0:040x}.\n"},
+    )
+
+    # THEN
+    assert kept_summaries(commits) == []
+
+
+def test_chains_of_reverts():
+    # GIVEN
+    reverts = [FIX]
+    for _ in range(3):
+        reverts.append(f'Revert "{reverts[-1]}"')
+
+    # THEN
+    assert kept_summaries(make_commits(*reverts[:2])) == []
+    assert kept_summaries(make_commits(*reverts[:3])) == [FIX]
+    assert kept_summaries(make_commits(*reverts)) == []
+
+
+def test_revert_pairs_with_the_last_older_commit():
+    # GIVEN
+    commits = make_commits(FIX, f'Revert "{FIX}"', FIX)
+
+    # THEN
+    assert get_cancelled_reverts(commits) == {1, 2}
+    assert kept_summaries(commits) == [FIX]
+
+
+def test_revert_out_of_the_range_is_kept():
+    # GIVEN
+    commits = make_commits("feat(cms): a feature", f'Revert "{FIX}"')
+
+    # THEN
+    assert get_cancelled_reverts(commits) == set()
+    assert kept_summaries(commits) == ["feat(cms): a feature", f'Revert "{FIX}"']
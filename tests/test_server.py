@@ -0,0 +1,134 @@
+import gc
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from changelog_generator.generator import generate
+from changelog_generator.server import MAX_MANAGERS, ChangelogServer
+
+from .local_repository import LocalRepository
+
+
+@pytest.fixture
+def server(local_repo: LocalRepository):
+    local_repo.commit("feat(cms): initial", {"cms/a.txt": "1"})
+    local_repo.tag("1.0.0")
+    local_repo.commit("fix(cms): a fix", {"cms/a.txt": "2"})
+    local_repo.commit("feat(search): a search", {"search/a.txt": "1"})
+    local_repo.tag("1.1.0")
+    server = ChangelogServer(("127.0.0.1", 0), {"local": str(local_repo.path)})
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server: ChangelogServer, query: str = "") -> str:
+    host, port = server.server_address[:2]
+    with urlopen(f"http://{host}:{port}/changelog{query}") as response:
+        return response.read().decode()
+
+
+def test_same_changelog_as_generate(server, local_repo):
+    # WHEN
+    changelog = get(server)
+    filtered = get(server, "?target=1.0.0..1.1.0&path_filters=search")
+
+    # THEN
+    assert changelog == generate(str(local_repo.path))
+    assert filtered == generate(
+        str(local_repo.path), target="1.0.0..1.1.0", filter_paths=["search"]
+    )
+    assert "a fix" not in filtered
+
+
+def test_managers_kept_until_the_references_change(server, local_repo):
+    # GIVEN
+    warm = server.repositories["local"]
+    get(server)
+    manager = warm.get_manager(None, [])
+
+    # WHEN
+    get(server)
+    kept = warm.get_manager(None, [])
+    local_repo.commit("fix(cms): another fix", {"cms/a.txt": "3"})
+    local_repo.tag("1.2.0")
+    changelog = get(server)
+
+    # THEN
+    assert kept is manager
+    assert warm.get_manager(None, []) is not manager
+    assert "[1.2.0]" in changelog
+    assert "another fix" in changelog
+
+
+def test_dropped_managers_are_released(server, local_repo):
+    # GIVEN
+    warm = server.repositories["local"]
+    get(server, "?target=1.0.0..1.1.0")
+    manager = weakref.ref(warm.get_manager(None, []))
+    for index in range(MAX_MANAGERS + 1):
+        warm.get_manager(None, [f"path_{index}"])
+
+    # WHEN
+    local_repo.commit("fix(cms): another fix", {"cms/a.txt": "3"})
+    get(server)
+    gc.collect()
+
+    # THEN
+    assert manager() is None
+    assert len(warm.managers) <= MAX_MANAGERS
+
+
+def test_concurrent_requests(server, local_repo):
+    # GIVEN
+    queries = ["", "?target=1.0.0..1.1.0", "?path_filters=cms"] * 4
+
+    # WHEN
+    with ThreadPoolExecutor(6) as executor:
+        changelogs = list(executor.map(lambda query: get(server, query), queries))
+
+    # THEN
+    assert changelogs[:3] * 4 == changelogs
+    assert changelogs[0] == generate(str(local_repo.path))
+
+
+@pytest.mark.parametrize(
+    "path, status",
+    [
+        ("/other", 404),
+        ("/changelog?repository=unknown", 404),
+        ("/changelog?target=1.0.0", 400),
+        ("/changelog?target=0.1.0..1.1.0", 422),
+    ],
+)
+def test_errors(server, path, status):
+    # GIVEN
+    host, port = server.server_address[:2]
+
+    # WHEN
+    with pytest.raises(HTTPError) as error:
+        urlopen(f"http://{host}:{port}{path}")
+
+    # THEN
+    assert error.value.code == status
+
+
+@pytest.mark.parametrize("target", ["--output={}..1.1.0", "1.0.0..--output={}"])
+def test_no_git_option_in_the_target(server, tmp_path, target):
+    # GIVEN
+    host, port = server.server_address[:2]
+    output = tmp_path / "injected"
+
+    # WHEN
+    with pytest.raises(HTTPError) as error:
+        urlopen(f"http://{host}:{port}/changelog?target={target.format(output)}")
+
+    # THEN
+    assert error.value.code == 400
+    assert not list(tmp_path.glob("injected*"))
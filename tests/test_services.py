@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from git import Repo
+
+from changelog_generator import generator
+from changelog_generator.generator import generate
+from changelog_generator.services import Service, generate_services, load_manifest
+
+from .local_repository import LocalRepository
+
+SERVICES = [
+    Service("cms", ("cms/", "common")),
+    Service("auth", ("auth",)),
+    Service("search", ("search/*.txt",)),
+    Service("all"),
+]
+
+
+def build_services(local_repo: LocalRepository) -> None:
+    local_repo.commit("feat(cms): initial", {"cms/a.txt": "1", "auth/a.txt": "1"})
+    local_repo.tag("cms/1.0.0")
+    local_repo.tag("all/1.0.0")
+    local_repo.commit("feat(auth): first", {"auth/a.txt": "2"})
+    local_repo.tag("auth/1.0.0")
+    local_repo.checkout("feature", create=True)
+    local_repo.commit("feat(common): shared JIRA-1", {"common/b.txt": "1"})
+    local_repo.commit("feat(search): indexed", {"search/c.txt": "1"})
+    local_repo.checkout("master")
+    local_repo.commit("fix(cms): a fix", {"cms/a.txt": "2"})
+    local_repo.commit("chore: nothing changed")
+    local_repo.merge("feature")
+    local_repo.tag("search/1.0.0")
+    local_repo.commit("fix(auth): second", {"auth/a.txt": "3"})
+    local_repo.tag("auth/1.1.0")
+    local_repo.tag("all/1.1.0")
+    local_repo.commit('Revert "fix(cms): a fix"', {"cms/a.txt": "1"})
+    local_repo.commit("docs(search): documented", {"search/README": "1"})
+    local_repo.tag("cms/1.1.0")
+    local_repo.tag("search/1.1.0")
+    local_repo.commit("feat(cms): unreleased", {"cms/a.txt": "3"})
+    local_repo.publish()
+
+
+def test_same_output_as_one_generate_per_service(local_repo):
+    # GIVEN
+    build_services(local_repo)
+    path = str(local_repo.path)
+
+    # WHEN
+    changelogs = list(generate_services(path, SERVICES, jobs=2))
+
+    # THEN
+    assert changelogs == [
+        (
+            service,
+            generate(path, prefix=service.prefix, filter_paths=service.filter_paths),
+        )
+        for service in SERVICES
+    ]
+
+
+def test_commits_hidden_behind_a_treesame_merge_left_out(local_repo):
+    # GIVEN
+    local_repo.commit("feat(cms): initial", {"cms/a.txt": "1", "auth/a.txt": "1"})
+    local_repo.tag("cms/1.0.0")
+    local_repo.checkout("feature", create=True)
+    local_repo.commit("fix(cms): on the branch", {"cms/a.txt": "2"})
+    local_repo.commit("fix(auth): on the branch", {"auth/a.txt": "2"})
+    local_repo.checkout("master")
+    local_repo.commit("fix(cms): on master", {"cms/a.txt": "2"})
+    local_repo.merge("feature")
+    local_repo.tag("cms/1.1.0")
+    local_repo.publish()
+    path = str(local_repo.path)
+    service = Service("cms", ("cms",))
+
+    # WHEN
+    ((_, changelog),) = generate_services(path, [service])
+
+    # THEN
+    assert "on master" in changelog
+    assert "on the branch" not in changelog
+    assert changelog == generate(path, prefix="cms", filter_paths=["cms"])
+
+
+@pytest.mark.parametrize("prefix", ["cms", "search", "auth"])
+def test_synthetic_services(synthetic_repo: Repo, prefix):
+    # GIVEN
+    path = str(Path(synthetic_repo.git_dir).parent)
+    services = [
+        Service(name, (f"core/{name}", "core/common"))
+        for name in ("cms", "search", "auth")
+    ]
+
+    # WHEN
+    changelogs = dict(generate_services(path, services))
+
+    # THEN
+    service = next(service for service in services if service.prefix == prefix)
+    assert changelogs[service] == generate(
+        path, prefix=prefix, filter_paths=service.filter_paths
+    )
+
+
+def test_services_rendered_without_summary_on_timeout(local_repo, monkeypatch):
+    # GIVEN
+    build_services(local_repo)
+    released = threading.Event()
+
+    def generate_ai_summary(prefix, diff):
+        released.wait(10)
+        return "a late summary"
+
+    monkeypatch.setattr(generator, "generate_ai_summary", generate_ai_summary)
+
+    # WHEN
+    start = time.perf_counter()
+    changelogs = dict(
+        generate_services(str(local_repo.path), SERVICES[:2], ai_timeout=0.2)
+    )
+    duration = time.perf_counter() - start
+    released.set()
+
+    # THEN
+    assert duration < 5
+    assert "shared" in changelogs[SERVICES[0]]
+    assert not any("AI generated summary" in text for text in changelogs.values())
+
+
+def test_load_manifest(tmp_path):
+    # GIVEN
+    manifest = tmp_path / "services.json"
+    manifest.write_text(
+        json.dumps([{"prefix": "cms", "path_filters": ["cms/"]}, {"prefix": "all"}])
+    )
+
+    # WHEN
+    services = load_manifest(str(manifest))
+
+    # THEN
+    assert services == [Service("cms", ("cms/",)), Service("all", ())]
@@ -0,0 +1,133 @@
+import tracemalloc
+
+import pytest
+from git import Repo
+
+from changelog_generator.__main__ import parse_flag
+from changelog_generator.commit import Commit
+from changelog_generator.generator import generate, generate_stream, get_commit_trees
+from changelog_generator.spool import CommitSpool
+
+from .local_repository import LocalRepository
+from .synthetic_repository import RepositoryShape, build_synthetic_repository
+
+# the peak of the Python allocations of a range 4 times larger may only grow by this
+# ratio when spooled, the buffers of git log and of the inserted batches being constant
+SPOOL_GROWTH_RATIO = 1.25
+
+
+def peak_memory(repository_path: str, spool: bool) -> int:
+    """the peak of the allocations while the changelog is streamed, and not kept"""
+    tracemalloc.start()
+    try:
+        for _ in generate_stream(repository_path, spool=spool):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_same_changelog_as_without_spool(synthetic_repo: Repo):
+    # GIVEN
+    path = synthetic_repo.working_dir
+
+    # THEN
+    for options in [
+        {},
+        {"target": "1.2.0..1.8.0"},
+        {"target": "1.2.0..1.8.0", "max_bytes": 2000},
+        {"prefix": "cms", "filter_paths": ["core/cms"]},
+    ]:
+        assert generate(path, spool=True, **options) == generate(path, **options)
+
+
+def test_same_reverts_cancelled(local_repo: LocalRepository):
+    # GIVEN
+    local_repo.commit("feat(cms): first")
+    local_repo.tag("1.0.0")
+    fix = local_repo.commit("fix(cms): a fix")
+    local_repo.commit(f"revert: the fix\n\nThis reverts commit {fix}.\n")
+    local_repo.commit("fix(search): another fix")
+    local_repo.commit('Revert "fix(search): another fix"')
+    local_repo.commit('Revert "Revert "fix(search): another fix""')
+    local_repo.tag("1.1.0")
+    commits = [
+        Commit(commit.hexsha, commit.summary, commit.message)
+        for commit in Repo(local_repo.path).iter_commits("1.0.0..1.1.0")
+    ]
+
+    # WHEN
+    spool = CommitSpool()
+    spool.add(iter(commits))
+    trees = spool.get_commit_trees()
+
+    # THEN
+    assert [(tree.commit_type, [c.sha1 for c in tree.commits]) for tree in trees] == [
+        (tree.commit_type, [c.sha1 for c in tree.commits])
+        for tree in get_commit_trees(commits)
+    ]
+    assert [commit.summary for tree in trees for commit in tree.commits] == [
+        "fix(search): another fix"
+    ]
+
+
+def test_spooled_section_is_a_sequence():
+    # GIVEN
+    commits = [
+        Commit(f"{index:040x}", f"feat(cms): feature {index}", f"ABC-{index}")
+        for index in range(1, 1200)
+    ]
+    spool = CommitSpool()
+    spool.add(commits)
+
+    # WHEN
+    (tree,) = spool.get_commit_trees()
+
+    # THEN
+    assert len(tree.commits) == len(commits)
+    assert [commit.sha1 for commit in tree.commits[:3]] == [
+        commit.sha1 for commit in commits[:3]
+    ]
+    assert tree.commits[-1].jiras == commits[-1].jiras == ["ABC-1199"]
+    with pytest.raises(IndexError):
+        tree.commits[1:]  # pylint: disable=pointless-statement
+    spool.close()
+
+
+def test_memory_does_not_grow_with_the_range(tmp_path):
+    # GIVEN
+    small, large = (
+        str(
+            build_synthetic_repository(
+                tmp_path / str(commits),
+                RepositoryShape(commits=commits, tag_every=commits // 2, diff_lines=1),
+            )
+        )
+        for commits in (1500, 6000)
+    )
+    peak_memory(small, spool=True)  # the templates and modules are loaded once
+
+    # WHEN
+    spooled = peak_memory(small, spool=True), peak_memory(large, spool=True)
+    held = peak_memory(small, spool=False), peak_memory(large, spool=False)
+
+    # THEN
+    assert spooled[1] < spooled[0] * SPOOL_GROWTH_RATIO
+    assert held[1] > held[0] * 2
+
+
+@pytest.mark.parametrize(
+    "value, enabled",
+    [
+        (None, False),
+        ("", False),
+        ("0", False),
+        ("false", False),
+        ("Off", False),
+        ("1", True),
+        ("true", True),
+    ],
+)
+def test_spool_environment_flag(value, enabled):
+    # THEN
+    assert parse_flag(value) is enabled
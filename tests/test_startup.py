@@ -0,0 +1,59 @@
+import re
+import subprocess
+import sys
+
+# the cumulative import time of the command line, in microseconds, about 10ms when the
+# subsystems are lazily imported and 650ms when the AI libraries are imported eagerly
+MAIN_IMPORT_THRESHOLD = 150_000
+
+
+def import_in_subprocess(module: str, *arguments: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [
+            sys.executable,
+            *arguments,
+            "-c",
+            f"import sys, {module}; print(*sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def cumulative_import_time(importtime: str, module: str) -> int:
+    match = re.search(rf"\|\s*(\d+) \|\s*{re.escape(module)}$", importtime, re.M)
+    assert match, importtime
+    return int(match.group(1))
+
+
+def test_cold_start_imports_no_subsystem():
+    # WHEN
+    modules = import_in_subprocess("changelog_generator.__main__").stdout.split()
+
+    # THEN
+    for module in ("git", "jinja2", "google.genai", "changelog_generator.generator"):
+        assert module not in modules
+
+
+def test_generator_imports_no_template_engine_nor_ai_backend():
+    # WHEN
+    modules = import_in_subprocess("changelog_generator.generator").stdout.split()
+
+    # THEN
+    assert "git" in modules
+    for module in ("jinja2", "google.genai", "google.oauth2"):
+        assert module not in modules
+
+
+def test_cold_start_import_time():
+    # WHEN
+    importtime = import_in_subprocess(
+        "changelog_generator.__main__", "-X", "importtime"
+    )
+
+    # THEN
+    assert (
+        cumulative_import_time(importtime.stderr, "changelog_generator.__main__")
+        < MAIN_IMPORT_THRESHOLD
+    )
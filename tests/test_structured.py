@@ -0,0 +1,132 @@
+import json
+import sys
+
+from changelog_generator import __main__
+from changelog_generator.generator import get_commit_trees
+from changelog_generator.repository_manager import RepositoryManager
+from changelog_generator.structured import generate_structured
+
+from .local_repository import LocalRepository
+from .test_services import build_services
+
+
+def read_ndjson(text: str) -> list:
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_a_record_per_commit_and_the_sections(local_repo: LocalRepository):
+    # GIVEN
+    build_services(local_repo)
+    path = str(local_repo.path)
+    target = "auth/1.0.0..search/1.0.0"
+    commit_trees = get_commit_trees(RepositoryManager(path).from_target(target))
+
+    # WHEN
+    *commits, summary = read_ndjson(
+        "".join(generate_structured(path, "ndjson", target=target))
+    )
+
+    # THEN
+    assert [commit["record"] for commit in commits] == ["commit"] * len(commits)
+    assert summary["record"] == "summary"
+    assert summary["commits"] == len(commits)
+    assert [
+        (section["title"], section["commits"]) for section in summary["sections"]
+    ] == [(tree.commit_type, len(tree.commits)) for tree in commit_trees]
+    by_section = {section["type"]: [] for section in summary["sections"]}
+    for commit in commits:
+        by_section[commit["section"]].append(commit["sha1"])
+    assert list(by_section.values()) == [
+        [commit.sha1 for commit in tree.commits] for tree in commit_trees
+    ]
+
+
+def test_reverted_commits_are_kept(local_repo: LocalRepository):
+    # GIVEN
+    build_services(local_repo)
+
+    # WHEN
+    *commits, summary = read_ndjson(
+        "".join(generate_structured(str(local_repo.path), "ndjson", prefix="cms"))
+    )
+
+    # THEN
+    assert (summary["previous_tag"], summary["current_tag"]) == (
+        "cms/1.0.0",
+        "cms/1.1.0",
+    )
+    assert [
+        commit["summary"] for commit in commits if "a fix" in commit["summary"]
+    ] == [
+        'Revert "fix(cms): a fix"',
+        "fix(cms): a fix",
+    ]
+
+
+def test_commit_fields(local_repo: LocalRepository):
+    # GIVEN
+    build_services(local_repo)
+
+    # WHEN
+    records = read_ndjson(
+        "".join(
+            generate_structured(
+                str(local_repo.path), "ndjson", target="auth/1.0.0..search/1.0.0"
+            )
+        )
+    )
+
+    # THEN
+    common = next(record for record in records if record.get("scope") == "common")
+    assert common["type"] == "feat"
+    assert common["subject"] == "shared JIRA-1"
+    assert common["jiras"] == ["JIRA-1"]
+    assert common["short"] == common["sha1"][:8]
+    assert records[-1]["previous_tag"] == "auth/1.0.0"
+
+
+def test_json_document_has_the_ndjson_records(local_repo: LocalRepository):
+    # GIVEN
+    build_services(local_repo)
+    path = str(local_repo.path)
+
+    # WHEN
+    document = json.loads("".join(generate_structured(path, "json", prefix="cms")))
+
+    # THEN
+    assert [*document["commits"], document["summary"]] == read_ndjson(
+        "".join(generate_structured(path, "ndjson", prefix="cms"))
+    )
+
+
+def test_json_document_without_commits(local_repo: LocalRepository):
+    # GIVEN
+    build_services(local_repo)
+
+    # WHEN
+    document = json.loads(
+        "".join(
+            generate_structured(
+                str(local_repo.path), "json", target="cms/1.1.0..search/1.1.0"
+            )
+        )
+    )
+
+    # THEN
+    assert document["commits"] == []
+    assert document["summary"]["sections"] == []
+
+
+def test_main_streams_ndjson(local_repo: LocalRepository, monkeypatch, capsys):
+    # GIVEN
+    build_services(local_repo)
+    monkeypatch.chdir(local_repo.path)
+    monkeypatch.setattr(sys, "argv", ["changelog_generator", "--format", "ndjson"])
+
+    # WHEN
+    __main__.main()
+
+    # THEN
+    records = read_ndjson(capsys.readouterr().out)
+    assert records[-1]["record"] == "summary"
+    assert records[-1]["commits"] == len(records) - 1 > 0
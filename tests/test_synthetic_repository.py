@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from git import Repo
+
+from changelog_generator.repository_manager import RepositoryManager
+
+from .synthetic_repository import RepositoryShape, build_synthetic_repository
+
+
+def test_build_is_reproducible(tmp_path: Path):
+    # GIVEN
+    shape = RepositoryShape(commits=30, tag_every=10)
+
+    # WHEN
+    first = Repo(build_synthetic_repository(tmp_path / "first", shape))
+    second = Repo(build_synthetic_repository(tmp_path / "second", shape))
+
+    # THEN
+    assert first.head.commit.hexsha == second.head.commit.hexsha
+    assert first.git.tag() == second.git.tag()
+
+
+def test_simple_tag_changelog(synthetic_repo: Repo):
+    # GIVEN
+    path = str(Path(synthetic_repo.git_dir).parent)
+
+    # WHEN
+    repository = RepositoryManager(path)
+
+    # THEN
+    assert repository.current_tag == "1.9.0"
+    assert repository.previous_tag == "1.8.0"
+    commits = repository.commits_since_last_tag
+    assert len(commits) == 22
+    assert repository.get_diff_since_last_tag
+    history = repository.from_target("master")
+    assert {commit.commit_type for commit in history} >= {"feat", "revert", "unknown"}
+    assert any(commit.jiras for commit in history)
+
+
+def test_prefixed_tag_changelog(synthetic_repo: Repo):
+    # GIVEN
+    path = str(Path(synthetic_repo.git_dir).parent)
+
+    # WHEN
+    repository = RepositoryManager(path, "cms", ["core/cms", "core/common"])
+
+    # THEN
+    assert repository.current_tag == "cms/1.9.0"
+    assert repository.previous_tag == "cms/1.8.0"
+    commits = repository.commits_since_last_tag
+    assert commits
+    assert {commit.scope for commit in commits} <= {"cms", "common", "any"}
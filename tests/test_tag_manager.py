@@ -0,0 +1,90 @@
+from collections import Counter
+
+from changelog_generator.repository_manager import RepositoryManager
+from changelog_generator.tag_manager import PrefixedTagManager, SimpleTagManager
+
+from .local_repository import LocalRepository
+
+
+def build_tags(local_repo: LocalRepository) -> None:
+    local_repo.commit("feat(cms): initial")
+    for tag in ("1.2.0", "v1.9.0", "1-10-0", "1.10.1rc1", "cms/1.2.0", "cms/1.10.0"):
+        local_repo.tag(tag)
+    local_repo.commit("feat(cms): next")
+    for tag in ("1.10.1", "not-a-release", "cms/1.11.0", "cms/2.0.0rc1", "auth/3.0.0"):
+        local_repo.tag(tag)
+    local_repo.checkout("unmerged", create=True)
+    local_repo.commit("feat(cms): unmerged")
+    local_repo.tag("9.0.0")
+    local_repo.tag("cms/9.0.0")
+    local_repo.checkout("master")
+    local_repo.publish()
+
+
+def test_simple_release_tags(local_repo):
+    # GIVEN
+    build_tags(local_repo)
+    manager = SimpleTagManager(local_repo.repository)
+
+    # WHEN
+    tags = manager.get_release_tags()
+
+    # THEN
+    assert tags == ("1.10.1", "1-10-0", "v1.9.0", "1.2.0")
+    assert manager.get_release_tags(limit=2) == tags[:2]
+
+
+def test_prefixed_release_tags(local_repo):
+    # GIVEN
+    build_tags(local_repo)
+    manager = PrefixedTagManager(local_repo.repository, "cms")
+
+    # WHEN
+    tags = manager.get_release_tags()
+
+    # THEN
+    assert tags == ("cms/1.11.0", "cms/1.10.0", "cms/1.2.0")
+    assert manager.get_release_tags(limit=1) == tags[:1]
+
+
+class CountingPattern:
+    """a tag pattern counting the times each tag is matched"""
+
+    def __init__(self, pattern) -> None:
+        self.pattern = pattern
+        self.calls: Counter = Counter()
+
+    def match(self, tag: str):
+        self.calls[tag] += 1
+        return self.pattern.match(tag)
+
+
+def test_each_tag_is_parsed_once(local_repo, monkeypatch):
+    # GIVEN
+    build_tags(local_repo)
+    pattern = CountingPattern(SimpleTagManager.PATTERN)
+    monkeypatch.setattr(SimpleTagManager, "PATTERN", pattern)
+
+    # WHEN
+    tags = SimpleTagManager(local_repo.repository).get_release_tags()
+
+    # THEN
+    assert len(pattern.calls) == 5
+    assert set(pattern.calls.values()) == {1}
+    SimpleTagManager(local_repo.repository).get_release_tags()
+    assert set(pattern.calls.values()) == {2}
+    assert SimpleTagManager(local_repo.repository).get_release_tags() == tags
+
+
+def test_current_and_previous_tags(local_repo):
+    # GIVEN
+    build_tags(local_repo)
+
+    # WHEN
+    repository = RepositoryManager(str(local_repo.path), "cms")
+
+    # THEN
+    assert (repository.current_tag, repository.previous_tag) == (
+        "cms/1.11.0",
+        "cms/1.10.0",
+    )